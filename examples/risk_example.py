@@ -1,4 +1,6 @@
 from risk_model.risk_model import RiskModel
+from risk_model.trajectory_index import TrajectoryRiskIndex
+from risk_model.plotting import plot_risk_profile
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -7,11 +9,12 @@ config_path = "ship_config.json"
 risk_model = RiskModel(config_path)
 
 
-case_example = 3 #1, 2, 3
+case_example = 3 #1, 2, 3, 4
 """ 
     case 1: For getting risk for a single ttg value
     case 2: For getting total risk given a couple of ttg values like in case of a trajectory
     case 3: To display the Risk profile given a large enough timeframe until the decline phases off
+    case 4: For streaming the risk of a long trajectory chunk by chunk, e.g. from a log file or live feed
 """
 
 match case_example:
@@ -25,29 +28,32 @@ match case_example:
     case 2:
         # Gets total risk for a couple of TTGs - like risk for a trajectory
         ttgs = np.random.randint(0, 100, 50) #replace with TTGs of trajectory/path
-        total_risk = 0
-
-        for ttg in ttgs:
-            mode = risk_model.select_mso_mode(ttg)
-            risk = risk_model.compute_total_risk(ttg, mode)
-            # print(mode, risk)
-            total_risk += risk
-            
+
+        # Select the mode and its risk for every TTG in one vectorized call
+        mode_indices, risks = risk_model.select_mso_mode_batch(ttgs)
+        total_risk = risks.sum()
+
         print(f"Total Risk: {total_risk}")
 
+        # For many queries on sub-legs, index the trajectory once (times default to one second per waypoint)
+        index = TrajectoryRiskIndex(risk_model, ttgs)
+        print(f"Risk between waypoints 10 and 20: {index.total(10, 20)}, peak at waypoint {index.argmax(10, 20)}")
+
     case 3:
         # Risk value for a timeframe, it shows the risk profile across all time
-        ttgs = np.linspace(0, 600, 300)
-        risk_list = []
+        ttgs = np.linspace(0, 600, 300) #long profiles (10^7 points) are decimated to the plot width
+        mode_indices, risk_list = risk_model.select_mso_mode_batch(ttgs)
+
+        # Shades the optimal mode of every TTG range from the breakpoint table
+        plot_risk_profile(ttgs, risk_list, schedule=risk_model.mode_schedule().rows(), mode_names=risk_model.mode_names)
+        plt.show()
 
-        for ttg in ttgs:
-            mode = risk_model.select_mso_mode(ttg)
-            risk = risk_model.compute_total_risk(ttg, mode)
-            # print(mode, risk)
-            risk_list.append(risk)
+    case 4:
+        # TTGs arrive block by block, only one chunk is held in memory
+        ttg_source = (np.random.uniform(0, 1000, 10000) for _ in range(100)) #replace with file/socket reader
 
+        for chunk in risk_model.stream_risk(ttg_source, chunk_size=100000):
+            for position, previous_mode, new_mode in chunk.mode_changes[:3]:
+                print(f"Waypoint {position}: {previous_mode} -> {new_mode}")
 
-        plt.plot(ttgs, risk_list)
-        plt.ylabel('Risk')
-        plt.xlabel('TTG (seconds)')
-        plt.show()
\ No newline at end of file
+        print(f"Total Risk: {chunk.total_risk}")
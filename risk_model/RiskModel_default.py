@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 class RiskModel:
     def __init__(self, machinery_modes, 
@@ -126,52 +125,56 @@ class RiskModel:
 
 
 
-# Initialize the RiskModel with parameters
-risk_model = RiskModel( 
-    machinery_modes=['PTO', 'MEC', 'PTI'], cost_ship=100000, cost_environment=50000, 
-    cost_cargo=200000, cost_infrastructure=150000, cost_reputation=10000, 
-    failure_rate_me=3e-9, failure_rate_dg1=6e-9, failure_rate_dg2=6e-9, failure_rate_hsg=2e-9, 
-    start_me_time=50, restart_me_probability=0.4, start_dg1_time=35, restart_dg1_probability=0.5, 
-    start_dg2_time=35, restart_dg2_probability=0.5, restart_hsg_time=12,
-)
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt  # Only the example below plots
+    try:
+        from .plotting import plot_risk_profile
+    except ImportError:  # Run as a script, which makes plotting.py a top-level module
+        from plotting import plot_risk_profile
 
+    # Initialize the RiskModel with parameters
+    risk_model = RiskModel( 
+        machinery_modes=['PTO', 'MEC', 'PTI'], cost_ship=100000, cost_environment=50000, 
+        cost_cargo=200000, cost_infrastructure=150000, cost_reputation=10000, 
+        failure_rate_me=3e-9, failure_rate_dg1=6e-9, failure_rate_dg2=6e-9, failure_rate_hsg=2e-9, 
+        start_me_time=50, restart_me_probability=0.4, start_dg1_time=35, restart_dg1_probability=0.5, 
+        start_dg2_time=35, restart_dg2_probability=0.5, restart_hsg_time=12,
+    )
 
 
 
 
-ttgs = np.linspace(0, 2000, 100)
-# ttgs = []
 
-""" Evaluates the total risk for the entire path, across all waypoints """
-total_risk = 0
-risk_list = []
+    ttgs = np.linspace(0, 2000, 100)
+    # ttgs = []
 
+    """ Evaluates the total risk for the entire path, across all waypoints """
+    total_risk = 0
+    risk_list = []
+    mode_list = []
 
 
 
-for ttg in ttgs:
-    mode = risk_model.select_mso_mode(ttg)
-    risk = risk_model.compute_total_risk(ttg, mode)
-    risk_list.append(risk)
-    total_risk += risk_model.compute_total_risk(ttg, mode)
-    # print(mode)
 
-print(f"Total Risk: {total_risk}")
-# print(len(risk_list))
+    for ttg in ttgs:
+        mode = risk_model.select_mso_mode(ttg)
+        risk = risk_model.compute_total_risk(ttg, mode)
+        risk_list.append(risk)
+        mode_list.append(risk_model.machinery_modes.index(mode))
+        total_risk += risk_model.compute_total_risk(ttg, mode)
+        # print(mode)
 
+    print(f"Total Risk: {total_risk}")
+    # print(len(risk_list))
 
-plt.plot(ttgs, risk_list)
-plt.ylabel('Risk')
-plt.xlabel('TTG (seconds)')
-plt.show()
 
+    plot_risk_profile(ttgs, risk_list, mode_indices=mode_list, mode_names=risk_model.machinery_modes)
+    plt.show()
 
 
-#     mode = self.select_mso_mode(waypoint)
-#     total_risk += self.compute_total_risk(waypoint, mode)
-
-
-# return total_risk
 
+    #     mode = self.select_mso_mode(waypoint)
+    #     total_risk += self.compute_total_risk(waypoint, mode)
 
 
+    # return total_risk
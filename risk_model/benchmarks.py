@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import RiskModel_default
+from .raster import evaluate_raster
+from .risk_model import RiskModel
+
+SIZES = (1, 10 ** 3, 10 ** 6, 10 ** 8)
+TTG_RANGE = (0.0, 2000.0)
+
+# Parameters of the hard-coded model matching data/ship_config.json, so the implementations can be compared
+DEFAULT_MODEL_PARAMETERS = dict(
+    machinery_modes=["PTO", "MEC", "PTI"], cost_ship=100000, cost_environment=50000, cost_cargo=30000,
+    cost_infrastructure=150000, cost_reputation=10000, failure_rate_me=3e-9, failure_rate_dg1=6e-9,
+    failure_rate_dg2=6e-9, failure_rate_hsg=2e-9, start_me_time=50, restart_me_probability=0.4, start_dg1_time=35,
+    restart_dg1_probability=0.5, start_dg2_time=35, restart_dg2_probability=0.5, restart_hsg_time=12,
+)
+
+
+def _measure(function, n):
+    """ Runs function twice, traced for its peak memory and then timed. Returns the result row """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    began = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - began
+    return {"n": n, "seconds": seconds, "throughput": n / seconds if seconds > 0 else float("inf"),
+            "peak_bytes": peak}
+
+
+def _ttg_chunks(n, chunk_size, seed=0):
+    """ n uniform TTGs in chunks, generated on the fly so 10^8 TTGs never sit in memory at once """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk_size):
+        yield rng.uniform(*TTG_RANGE, size=min(chunk_size, n - start))
+
+
+def _json_workload(model, n, chunk_size):
+    def run():
+        for ttgs in _ttg_chunks(n, chunk_size):
+            model.select_mso_mode_batch(ttgs)
+    return run
+
+
+def _scalar_workload(model, n):
+    """ Mode selection and risk one TTG at a time, the way the hard-coded model is used """
+    def run():
+        for ttgs in _ttg_chunks(n, 1 << 16):
+            for ttg in ttgs.tolist():
+                model.compute_total_risk(ttg, model.select_mso_mode(ttg))
+    return run
+
+
+def _process_seconds(code, repeats, environment=None):
+    """ Best wall time of a fresh interpreter running code, which prints its own measured seconds """
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                                env={**os.environ, **(environment or {})}).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return min(times)
+
+
+def startup_benchmarks(repeats=5):
+    """ Fresh-process costs: importing risk_model, and then a model with its mode schedule, parsed or cached """
+    timed = "import time\n{}\nbegan = time.perf_counter()\n{}\nprint(time.perf_counter() - began)"
+    build = ("from risk_model.risk_model import RiskModel", "RiskModel().mode_schedule()")
+    cached = ("from risk_model.config_cache import load_model", "load_model().mode_schedule()")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        environment = {"UTCRISK_CACHE_DIR": cache_dir}
+        _process_seconds(timed.format(*cached), 1, environment)  # Writes the artifact
+        seconds = {"risk_model.import": _process_seconds(timed.format("", "import risk_model"), repeats),
+                   "risk_model.startup_parse": _process_seconds(timed.format(*build), repeats),
+                   "risk_model.startup_cached": _process_seconds(timed.format(*cached), repeats, environment)}
+    return {name: {"n": 1, "seconds": value, "throughput": 1 / value, "peak_bytes": 0}
+            for name, value in seconds.items()}
+
+
+def run_benchmarks(sizes=SIZES, max_scalar=10 ** 4, chunk_size=1 << 20, startup_repeats=5, raster_size=2000):
+    """ Benchmarks both implementations, returning a JSON-serializable dict of results.
+
+    Every result holds n, seconds, throughput (TTGs or calls per second) and the traced peak_bytes. The
+    hard-coded model only evaluates scalars, so workloads above max_scalar TTGs are measured on max_scalar
+    of them and marked "sampled"; their seconds are extrapolated to the full size. Import and startup times
+    are the best of startup_repeats fresh interpreters (0 skips them), and the risk map is computed on a
+    raster_size x raster_size TTG raster (0 skips it).
+    """
+    default_model = RiskModel_default.RiskModel(**DEFAULT_MODEL_PARAMETERS)
+    model = RiskModel()
+    results = startup_benchmarks(startup_repeats) if startup_repeats else {}
+    results.update({
+        "risk_model.config_load": _measure(lambda: RiskModel(), 1),
+        "RiskModel_default.construct": _measure(lambda: RiskModel_default.RiskModel(**DEFAULT_MODEL_PARAMETERS), 1),
+        "risk_model.select_mso_mode": _measure(lambda: [model.select_mso_mode(ttg) for ttg in range(1000)], 1000),
+        "RiskModel_default.select_mso_mode": _measure(
+            lambda: [default_model.select_mso_mode(ttg) for ttg in range(1000)], 1000),
+    })
+    for n in sizes:
+        if n == 1:
+            results["risk_model.scalar"] = _measure(_scalar_workload(model, 1000), 1000)
+            results["RiskModel_default.scalar"] = _measure(_scalar_workload(default_model, 1000), 1000)
+            continue
+        results[f"risk_model.batch_{n}"] = _measure(_json_workload(model, n, chunk_size), n)
+        sample = min(n, max_scalar)
+        row = _measure(_scalar_workload(default_model, sample), sample)
+        if sample < n:
+            row.update(n=n, seconds=row["seconds"] * n / sample, sampled=sample)
+        results[f"RiskModel_default.batch_{n}"] = row
+    if raster_size:
+        raster = np.random.default_rng(0).uniform(*TTG_RANGE, size=(raster_size, raster_size))
+        results[f"risk_model.raster_{raster_size}x{raster_size}"] = _measure(lambda: evaluate_raster(model, raster),
+                                                                            raster.size)
+
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                 "cpu_count": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+        "agreement": compare_implementations(model, default_model),
+    }
+
+
+def compare_implementations(model, default_model, ttgs=None):
+    """ Numerical agreement of the two implementations over TTGs.
+
+    Grounding probabilities are compared (the hard-coded model scales risk by 100 instead of 1000), per mode
+    as the largest absolute and relative difference, together with the fraction of TTGs where both select
+    the same mode.
+    """
+    if ttgs is None:
+        ttgs = np.linspace(*TTG_RANGE, 1001)
+    agreement = {}
+    for mode in default_model.machinery_modes:
+        ours = model.compute_grounding_probability_batch(ttgs, mode)
+        theirs = np.array([default_model.compute_grounding_probability(ttg, mode) for ttg in ttgs], dtype=float)
+        difference = np.abs(ours - theirs)
+        scale = np.maximum(np.abs(theirs), np.finfo(float).tiny)
+        agreement[mode] = {"max_abs_difference": float(difference.max()),
+                           "max_rel_difference": float(np.max(difference / scale))}
+    modes = [model.mode_names[i] for i in model.select_mso_mode_batch(ttgs)[0]]
+    agreement["mode_agreement"] = float(np.mean([ours == default_model.select_mso_mode(ttg)
+                                                 for ttg, ours in zip(ttgs, modes)]))
+    return agreement
+
+
+def compare_to_baseline(report, baseline, throughput_tolerance=0.25, memory_tolerance=0.25):
+    """ Regressions of a report against a baseline report, as a list of messages (empty if none).
+
+    A benchmark regresses when its throughput drops by more than throughput_tolerance or its peak memory
+    grows by more than memory_tolerance (relative). Benchmarks missing from either report are ignored.
+    """
+    regressions = []
+    for name, row in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if row["throughput"] < base["throughput"] * (1 - throughput_tolerance):
+            regressions.append(f"{name}: throughput {row['throughput']:.4g}/s vs baseline {base['throughput']:.4g}/s")
+        if row["peak_bytes"] > base["peak_bytes"] * (1 + memory_tolerance) + 4096:  # Slack for tiny workloads
+            regressions.append(f"{name}: peak memory {row['peak_bytes']} B vs baseline {base['peak_bytes']} B")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks risk_model.RiskModel against RiskModel_default")
+    parser.add_argument("--sizes", type=float, nargs="+", default=SIZES, help="TTG workload sizes")
+    parser.add_argument("--max-scalar", type=int, default=10 ** 4,
+                        help="largest workload run in full on the hard-coded model")
+    parser.add_argument("--startup-repeats", type=int, default=5, help="fresh interpreters per startup benchmark")
+    parser.add_argument("--raster-size", type=int, default=2000, help="side of the TTG raster of the risk map")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="baseline JSON report to compare against")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks([int(size) for size in args.sizes], args.max_scalar, startup_repeats=args.startup_repeats,
+                            raster_size=args.raster_size)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(report, baseline, args.throughput_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY"
+
+# Output arrays written next to each other, one .npy file per quantity
+OUTPUTS = {
+    "risk": np.float64,
+    "mode": np.int16,
+    "grounding": np.float64,
+}
+
+
+def output_paths(output_prefix):
+    """ Paths of the risk, mode index and grounding probability .npy files for an output prefix """
+    return {name: f"{output_prefix}_{name}.npy" for name in OUTPUTS}
+
+
+def _npy_layout(path):
+    """ Returns (dtype, length, data offset) of a 1-D .npy file without reading its data """
+    with open(path, "rb") as file:
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        if len(shape) != 1:
+            raise ValueError(f"{path} must hold a 1-D array, found shape {shape}")
+        return dtype, shape[0], file.tell()
+
+
+def _input_layout(path, raw_dtype):
+    """ Returns (dtype, length, data offset) of a .npy file or a raw binary file of raw_dtype """
+    with open(path, "rb") as file:
+        is_npy = file.read(len(NPY_MAGIC)) == NPY_MAGIC
+    if is_npy:
+        return _npy_layout(path)
+    dtype = np.dtype(raw_dtype)
+    size = os.path.getsize(path)
+    if size % dtype.itemsize:
+        raise ValueError(f"{path} size {size} is not a multiple of the {dtype} item size")
+    return dtype, size // dtype.itemsize, 0
+
+
+def _create_outputs(paths, length):
+    for name, path in paths.items():
+        array = np.lib.format.open_memmap(path, mode="w+", dtype=OUTPUTS[name], shape=(length,))
+        array.flush()
+        del array
+
+
+def evaluate_memmap(model, input_path, output_prefix, window=1 << 20, resume_offset=0, raw_dtype=np.float64,
+                    progress=None):
+    """ Evaluates a TTG file window by window into memory-mapped .npy outputs.
+
+    The input is a 1-D .npy file or a raw binary file of raw_dtype. For every TTG the optimal mode index,
+    its risk and its grounding probability are written to the files from output_paths(output_prefix).
+    Only one window of input and output is mapped at a time, so memory use does not grow with file size.
+
+    resume_offset is a byte offset into the input data (0 starts a new run and creates the outputs); a run
+    interrupted after progress(offset) was called can continue from that offset. Returns the offset reached,
+    which is the input data size once everything is written.
+    """
+    if window <= 0:
+        raise ValueError("window must be positive")
+    dtype, length, data_offset = _input_layout(input_path, raw_dtype)
+    if resume_offset % dtype.itemsize:
+        raise ValueError(f"resume_offset must be a multiple of the {dtype} item size")
+    start = resume_offset // dtype.itemsize
+    if not 0 <= start <= length:
+        raise ValueError(f"resume_offset {resume_offset} is outside the input data")
+
+    paths = output_paths(output_prefix)
+    if start == 0:
+        _create_outputs(paths, length)
+    layouts = {name: _npy_layout(path) for name, path in paths.items()}
+    for name, (out_dtype, out_length, _) in layouts.items():
+        if out_length != length or out_dtype != OUTPUTS[name]:
+            raise ValueError(f"{paths[name]} does not match the input, start again with resume_offset=0")
+
+    cost = model._grounding_cost() * 1000
+    while start < length:
+        n = min(window, length - start)
+        ttgs = np.memmap(input_path, dtype=dtype, mode="r", offset=data_offset + start * dtype.itemsize, shape=(n,))
+        outputs = {name: np.memmap(paths[name], dtype=out_dtype, mode="r+",
+                                   offset=out_offset + start * out_dtype.itemsize, shape=(n,))
+                   for name, (out_dtype, _, out_offset) in layouts.items()}
+
+        mode_indices, p_grounding = model._select_grounding_probability_batch(np.asarray(ttgs, dtype=float))
+        outputs["mode"][:] = mode_indices
+        outputs["grounding"][:] = p_grounding
+        np.multiply(p_grounding, cost, out=outputs["risk"])
+        for output in outputs.values():
+            output.flush()
+        del ttgs, outputs
+
+        start += n
+        if progress is not None:
+            progress(start * dtype.itemsize)
+    return length * dtype.itemsize
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from .instrumentation import METHODS
+from .risk_model import RiskModel, config_path
+
+# Bump when the layout of RiskModel or its plan changes, so stale artifacts are rebuilt instead of loaded
+CACHE_VERSION = 3
+
+
+def default_cache_dir():
+    """ $UTCRISK_CACHE_DIR, or utcrisk under $XDG_CACHE_HOME (~/.cache by default) """
+    directory = os.environ.get("UTCRISK_CACHE_DIR")
+    if directory:
+        return directory
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "utcrisk")
+
+
+def _artifact_path(path, fault_tree, cache_dir):
+    key = hashlib.sha256(f"{path}|{fault_tree}".encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.pickle")
+
+
+def _read_artifact(artifact, path, mtime_ns, digest, fault_tree):
+    """ The cached model state if the artifact matches the config exactly, else None """
+    try:
+        with open(artifact, "rb") as file:
+            entry = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None  # Missing, corrupt or from an incompatible version of the code
+    if entry.get("key") != (CACHE_VERSION, path, mtime_ns, digest, fault_tree):
+        return None
+    return entry["state"]
+
+
+def _write_artifact(artifact, key, model):
+    """ Atomically replaces the artifact, so concurrent starts never read a partial file """
+    state = {name: value for name, value in vars(model).items() if name not in METHODS}
+    state["instrumentation"] = None
+    directory = os.path.dirname(artifact)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump({"key": key, "state": state}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, artifact)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_model(config_filename="ship_config.json", fault_tree=None, cache_dir=None):
+    """ RiskModel of a config file, loaded from a compiled artifact when the config is unchanged.
+
+    The artifact is keyed by the config's absolute path, its mtime and the SHA-256 of its content, and holds
+    the parsed model with its compiled plan and mode schedule, so later process starts skip JSON parsing,
+    validation and the schedule search. A changed or touched config is parsed again and the artifact replaced.
+    """
+    path = os.path.abspath(config_path(config_filename))
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    with open(path, "rb") as file:
+        mtime_ns = os.fstat(file.fileno()).st_mtime_ns
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    artifact = _artifact_path(path, fault_tree, cache_dir)
+
+    state = _read_artifact(artifact, path, mtime_ns, digest, fault_tree)
+    if state is not None:
+        model = RiskModel.__new__(RiskModel)
+        model.__dict__.update(state)
+        return model
+
+    model = RiskModel.from_config(json.loads(content), fault_tree)  # The content the digest was taken of
+    model.mode_schedule()  # Cached with the model
+    try:
+        _write_artifact(artifact, (CACHE_VERSION, path, mtime_ns, digest, fault_tree), model)
+    except OSError:
+        pass  # A read-only cache only costs the speedup
+    return model
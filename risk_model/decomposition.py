@@ -0,0 +1,85 @@
+import numpy as np
+
+# Keys of the grounding cost components in the configuration, in the order of RiskModel.cost_components()
+COST_COMPONENTS = ("ship_damage", "recovery", "environment", "cargo", "infrastructure", "reputation")
+
+
+class RiskDecomposition:
+    """ Risk at every TTG broken down by mode, restoration scenario and cost component, from one evaluation.
+
+    Arrays are TTG-major: p_no_recovery, p_grounding and risk have shape (T, n_modes), and p_scenario
+    (T, n_modes, max_scenarios) holds the probability that each restoration scenario succeeds on its own,
+    zero-padded past n_scenarios[m]. Scenarios of a mode are alternatives, so the largest one dominates its
+    recovery. mode_indices is the risk-minimizing mode at every TTG and component_risk (T, n_components)
+    splits that mode's risk over component_names; costs are the components in risk units (cost * 1000).
+    """
+    __slots__ = ("mode_names", "component_names", "ttgs", "costs", "p_failure", "n_scenarios", "p_scenario",
+                 "p_no_recovery", "p_grounding", "risk", "mode_indices", "component_risk")
+
+    def __init__(self, mode_names, component_names, ttgs, costs, p_failure, n_scenarios, p_scenario, p_no_recovery,
+                 p_grounding, risk, mode_indices, component_risk):
+        self.mode_names = mode_names
+        self.component_names = component_names
+        self.ttgs = ttgs
+        self.costs = costs
+        self.p_failure = p_failure
+        self.n_scenarios = n_scenarios
+        self.p_scenario = p_scenario
+        self.p_no_recovery = p_no_recovery
+        self.p_grounding = p_grounding
+        self.risk = risk
+        self.mode_indices = mode_indices
+        self.component_risk = component_risk
+
+    @property
+    def min_risk(self):
+        """ Risk of the optimal mode at every TTG, shape (T,) """
+        return self.risk[np.arange(len(self.ttgs)), self.mode_indices]
+
+    @property
+    def dominant_scenario(self):
+        """ Most likely restoration scenario of every mode, shape (T, n_modes); -1 where none can succeed """
+        if self.p_scenario.shape[-1] == 0:
+            return np.full(self.risk.shape, -1, dtype=np.intp)
+        return np.where(self.p_scenario.max(axis=-1) > 0, self.p_scenario.argmax(axis=-1), -1)
+
+    @property
+    def dominant_component(self):
+        """ Index into component_names of the largest cost component; the same at every TTG """
+        return int(np.argmax(self.costs))
+
+    def mode_component_risk(self):
+        """ Risk of every mode split over the cost components, shape (T, n_modes, n_components) """
+        return self.p_grounding[:, :, np.newaxis] * self.costs
+
+
+def decompose_risk(model, ttgs):
+    """ Returns the RiskDecomposition of a RiskModel at the given 1-D TTGs.
+
+    The engine recovery-time probabilities are evaluated once for all modes, and each mode's recovery
+    probability is built from the same scenario probabilities that are returned, so the breakdown costs
+    about as much as compute_total_risk_batch.
+    """
+    plan = model.plan
+    ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+    n_ttgs, n_modes = len(ttgs), len(plan.modes)
+    costs = model.cost_components() * 1000
+    n_scenarios = np.array([mode.n_scenarios for mode in plan.modes], dtype=np.intp)
+    p_failure = np.array([mode.failure_probability for mode in plan.modes])
+
+    engine_probabilities = plan.engine_recovery_probabilities(ttgs)
+    p_scenario = np.zeros((n_ttgs, n_modes, int(n_scenarios.max(initial=0))))
+    p_no_recovery = np.empty((n_ttgs, n_modes))
+    for m, mode in enumerate(plan.modes):
+        p_actions = mode.action_probabilities(engine_probabilities, plan.restart_probability)
+        recovery, scenarios = mode.recovery_and_scenario_probabilities(p_actions)
+        p_no_recovery[:, m] = recovery
+        p_scenario[:, m, :mode.n_scenarios] = scenarios.T
+
+    p_grounding = p_no_recovery * p_failure
+    risk = p_grounding * (model._grounding_cost() * 1000)
+    mode_indices = np.argmin(risk, axis=1) if n_modes else np.zeros(n_ttgs, dtype=np.intp)
+    selected = p_grounding[np.arange(n_ttgs), mode_indices] if n_modes else np.zeros(n_ttgs)
+    component_risk = selected[:, np.newaxis] * costs
+    return RiskDecomposition(list(model.mode_names), COST_COMPONENTS, ttgs, costs, p_failure, n_scenarios, p_scenario,
+                             p_no_recovery, p_grounding, risk, mode_indices, component_risk)
@@ -0,0 +1,193 @@
+import numpy as np
+
+FALSE = 0
+TRUE = 1
+
+
+class _BDDBuilder:
+    """ Hash-consed reduced ordered BDD construction; variable i is tested before variable i + 1 """
+
+    def __init__(self):
+        self.node_var, self.node_low, self.node_high = [-1, -1], [FALSE, TRUE], [FALSE, TRUE]
+        self.unique = {}
+        self.cache = {}
+
+    def node(self, var, low, high):
+        if low == high:
+            return low  # The test is redundant
+        key = (var, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.node_var)
+            self.node_var.append(var)
+            self.node_low.append(low)
+            self.node_high.append(high)
+            self.unique[key] = node
+        return node
+
+    def var(self, var):
+        return self.node(var, FALSE, TRUE)
+
+    def apply(self, is_and, u, v):
+        """ u AND v (is_and) or u OR v """
+        if is_and:
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE:
+                return v
+            if v == TRUE or u == v:
+                return u
+        else:
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE:
+                return v
+            if v == FALSE or u == v:
+                return u
+        if u > v:
+            u, v = v, u  # Both operations are commutative
+        key = (is_and, u, v)
+        result = self.cache.get(key)
+        if result is None:
+            var_u, var_v = self.node_var[u], self.node_var[v]
+            var = min(var_u, var_v)
+            u_low, u_high = (self.node_low[u], self.node_high[u]) if var_u == var else (u, u)
+            v_low, v_high = (self.node_low[v], self.node_high[v]) if var_v == var else (v, v)
+            result = self.node(var, self.apply(is_and, u_low, v_low), self.apply(is_and, u_high, v_high))
+            self.cache[key] = result
+        return result
+
+    def at_least(self, k, members):
+        """ At least k of the member nodes are true """
+        # threshold[j] holds "at least j of the members seen so far", built one member at a time
+        threshold = [TRUE] + [FALSE] * k
+        for member in members:
+            for j in range(k, 0, -1):
+                threshold[j] = self.apply(False, threshold[j], self.apply(True, member, threshold[j - 1]))
+        return threshold[k] if k > 0 else TRUE
+
+    def operand(self, operand):
+        """ BDD of an event index or a (k, [event indices]) k-of-n gate """
+        if isinstance(operand, tuple):
+            k, members = operand
+            return self.at_least(k, [self.var(member) for member in members])
+        return self.var(operand)
+
+
+class RestorationBDD:
+    """ Exact probability that a restoration condition holds, for independent events.
+
+    The condition is compiled once into a reduced ordered binary decision diagram, so events shared between
+    scenarios are counted once and the cost grows with the diagram size instead of 2^n_events. Nodes are
+    grouped in levels by the event they test; a level only depends on the levels below it, so evaluation runs
+    one vectorized update per event over arrays of event probabilities.
+    """
+    __slots__ = ("n_events", "root", "node_var", "node_low", "node_high", "levels", "edges")
+
+    def __init__(self, n_events, root, node_var, node_low, node_high):
+        self.n_events = n_events
+        self.root = root
+        self.node_var = node_var
+        self.node_low = node_low
+        self.node_high = node_high
+        nodes = np.arange(2, len(node_var))
+        var = np.array(node_var[2:], dtype=np.intp)
+        low, high = np.array(node_low, dtype=np.intp), np.array(node_high, dtype=np.intp)
+        # Bottom-up: (event, nodes testing it, their low children, their high children)
+        self.levels = [(int(v), nodes[var == v], low[nodes[var == v]], high[nodes[var == v]])
+                       for v in np.unique(var)[::-1]]
+        # Per level, the edges into non-terminal children of [high..., low...] sorted by child, so the adjoint
+        # sweep scatters with np.add.reduceat: (edge order, children receiving, group offsets)
+        self.edges = []
+        for _, _, level_low, level_high in self.levels:
+            children = np.concatenate([level_high, level_low])
+            order = np.argsort(children, kind="stable")
+            order = order[children[order] > TRUE]
+            targets, offsets = np.unique(children[order], return_index=True)
+            self.edges.append((order, targets, offsets))
+
+    @property
+    def n_nodes(self):
+        return len(self.node_var)
+
+    def _values(self, p_events):
+        """ Probability of every node, shape (n_nodes, ...) for event-first p_events (n_events, ...) """
+        values = np.empty((self.n_nodes,) + p_events.shape[1:])
+        values[FALSE] = 0.0
+        values[TRUE] = 1.0
+        for var, nodes, low, high in self.levels:
+            values[nodes] = values[low] + p_events[var] * (values[high] - values[low])
+        return values
+
+    def _chunks(self, p_events, memory_budget):
+        """ Slices of the last axis that keep one node array per chunk around memory_budget bytes (cache sized) """
+        n_ttgs = p_events.shape[-1]
+        per_ttg = 8 * self.n_nodes * max(1, int(np.prod(p_events.shape[:-2])))
+        step = max(1, memory_budget // per_ttg)
+        return [slice(start, start + step) for start in range(0, max(n_ttgs, 1), step)]
+
+    def probability(self, p_events, memory_budget=4 << 20):
+        """ Probability of the condition, shape (..., T) for event probabilities (..., n_events, T) """
+        p_events = np.asarray(p_events, dtype=float)
+        result = np.empty(p_events.shape[:-2] + p_events.shape[-1:])
+        if self.root in (FALSE, TRUE):
+            result[...] = float(self.root)
+            return result
+        event_first = np.moveaxis(p_events, -2, 0)
+        for chunk in self._chunks(p_events, memory_budget):
+            result[..., chunk] = self._values(event_first[..., chunk])[self.root]
+        return result
+
+    def probability_and_gradient(self, p_events, memory_budget=4 << 20):
+        """ probability together with its derivative wrt every event probability, shape (..., n_events, T).
+
+        The derivatives come from one reverse (adjoint) sweep over the levels: the derivative wrt an event
+        sums, over the nodes testing it, the probability of reaching the node times high minus low.
+        """
+        p_events = np.asarray(p_events, dtype=float)
+        result = np.empty(p_events.shape[:-2] + p_events.shape[-1:])
+        gradient = np.zeros(p_events.shape)
+        if self.root in (FALSE, TRUE):
+            result[...] = float(self.root)
+            return result, gradient
+        event_first = np.moveaxis(p_events, -2, 0)
+        gradient_first = np.moveaxis(gradient, -2, 0)  # View, so writes land in gradient
+        for chunk in self._chunks(p_events, memory_budget):
+            p = event_first[..., chunk]
+            values = self._values(p)
+            result[..., chunk] = values[self.root]
+            adjoint = np.zeros(values.shape)
+            adjoint[self.root] = 1.0
+            for level, (order, targets, offsets) in zip(reversed(self.levels), reversed(self.edges)):
+                var, nodes, low, high = level
+                reach = adjoint[nodes]
+                gradient_first[var][..., chunk] += np.sum(reach * (values[high] - values[low]), axis=0)
+                if len(order):
+                    flow = np.concatenate([reach * p[var], reach * (1 - p[var])])[order]
+                    adjoint[targets] += np.add.reduceat(flow, offsets, axis=0)
+        return result, gradient
+
+    def probability_scalar(self, p_events):
+        """ probability for a sequence of float event probabilities, using plain floats only """
+        values = [0.0, 1.0]
+        for var, low, high in zip(self.node_var[2:], self.node_low[2:], self.node_high[2:]):
+            values.append(values[low] + p_events[var] * (values[high] - values[low]))
+        return values[self.root]
+
+
+def build_restoration_bdd(scenarios, n_events):
+    """ Compiles restoration scenarios into a RestorationBDD of "some scenario succeeds".
+
+    Each scenario is a list of terms joined by OR, each term a list of operands joined by AND, and each
+    operand an event index or a (k, [event indices]) gate that holds when at least k of the events do.
+    Event indices double as the variable order, so events should be numbered in order of first use.
+    """
+    builder = _BDDBuilder()
+    root = FALSE
+    for scenario in scenarios:
+        for term in scenario:
+            conjunction = TRUE
+            for operand in term:
+                conjunction = builder.apply(True, conjunction, builder.operand(operand))
+            root = builder.apply(False, root, conjunction)
+    return RestorationBDD(n_events, root, builder.node_var, builder.node_low, builder.node_high)
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .risk_model import RiskModel
+
+# Models loaded by this worker process, keyed by config
+_worker_models = {}
+
+
+def _config_key(config):
+    """ Hashable key of a config path or config dict """
+    if isinstance(config, dict):
+        return json.dumps(config, sort_keys=True)
+    return os.path.abspath(config)
+
+
+def _load_model(config):
+    """ Returns the worker's model for a config, loading it on first use """
+    key = _config_key(config)
+    model = _worker_models.get(key)
+    if model is None:
+        model = RiskModel.from_config(config) if isinstance(config, dict) else RiskModel(config)
+        _worker_models[key] = model
+    return model
+
+
+def _evaluate_shard(config, buffer_names, total, start, stop):
+    """ Worker task: evaluates ttgs[start:stop] and writes the results into the shared buffers """
+    began = time.perf_counter()
+    model = _load_model(config)
+    # Workers share the parent's resource tracker, and the parent unlinks the blocks once all shards are done
+    blocks = [shared_memory.SharedMemory(name=name) for name in buffer_names]
+    try:
+        ttgs, risks, modes = (np.ndarray((total,), dtype=dtype, buffer=block.buf)
+                              for dtype, block in zip((np.float64, np.float64, np.int16), blocks))
+        mode_indices, shard_risks = model.select_mso_mode_batch(ttgs[start:stop])
+        modes[start:stop] = mode_indices
+        risks[start:stop] = shard_risks
+        del ttgs, risks, modes
+    finally:
+        for block in blocks:
+            block.close()
+    return os.getpid(), stop - start, time.perf_counter() - began
+
+
+class FleetResult:
+    """ Mode indices and risks of one (config, ttg_array) job """
+    __slots__ = ("config", "mode_indices", "risks")
+
+    def __init__(self, config, mode_indices, risks):
+        self.config = config
+        self.mode_indices = mode_indices
+        self.risks = risks
+
+
+class FleetRiskEvaluator:
+    """ Evaluates (config, ttg_array) jobs for many vessels across a pool of worker processes.
+
+    Each config is a ship_config.json path or a parsed config dict. Workers keep every model they load,
+    so a config is only parsed once per worker. TTGs are handed to the workers and results returned through
+    shared memory, with large jobs split into shards of shard_size TTGs.
+    """
+
+    def __init__(self, max_workers=None, shard_size=1 << 18):
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.worker_stats = {}  # pid -> {"shards", "samples", "seconds"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def evaluate(self, jobs):
+        """ Evaluates a list of (config, ttg_array) jobs, returning one FleetResult per job in order """
+        jobs = [(config, np.ravel(np.asarray(ttgs, dtype=float))) for config, ttgs in jobs]
+        total = sum(len(ttgs) for _, ttgs in jobs)
+        if total == 0:
+            return [FleetResult(config, np.zeros(0, dtype=np.int16), np.zeros(0)) for config, _ in jobs]
+
+        blocks = [shared_memory.SharedMemory(create=True, size=total * np.dtype(dtype).itemsize)
+                  for dtype in (np.float64, np.float64, np.int16)]
+        try:
+            ttgs_buffer, risks, modes = (np.ndarray((total,), dtype=dtype, buffer=block.buf)
+                                         for dtype, block in zip((np.float64, np.float64, np.int16), blocks))
+            names = [block.name for block in blocks]
+
+            futures, bounds = [], []
+            start = 0
+            for config, ttgs in jobs:
+                ttgs_buffer[start:start + len(ttgs)] = ttgs
+                for shard_start in range(start, start + len(ttgs), self.shard_size):
+                    shard_stop = min(shard_start + self.shard_size, start + len(ttgs))
+                    futures.append(self.executor.submit(_evaluate_shard, config, names, total, shard_start, shard_stop))
+                bounds.append((start, start + len(ttgs)))
+                start += len(ttgs)
+
+            for future in futures:
+                pid, samples, seconds = future.result()
+                stats = self.worker_stats.setdefault(pid, {"shards": 0, "samples": 0, "seconds": 0.0})
+                stats["shards"] += 1
+                stats["samples"] += samples
+                stats["seconds"] += seconds
+
+            results = [FleetResult(config, modes[lower:upper].copy(), risks[lower:upper].copy())
+                       for (config, _), (lower, upper) in zip(jobs, bounds)]
+            del ttgs_buffer, risks, modes
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return results
+
+    def throughput(self):
+        """ TTGs evaluated per second of worker time, per worker pid """
+        return {pid: stats["samples"] / stats["seconds"] if stats["seconds"] else 0.0
+                for pid, stats in self.worker_stats.items()}
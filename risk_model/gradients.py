@@ -0,0 +1,80 @@
+import numpy as np
+
+from .plan import RESTART, _product_and_leave_one_out, recovery_time_probability
+
+
+class RiskGradients:
+    """ Total risk of every mode and its exact derivatives, evaluated in one pass.
+
+    risk and d_ttg have shape (n_modes, T); the engine parameter derivatives d_failure_rate, d_start_time
+    and d_restart_probability have shape (n_modes, n_engines, T), with engines in plan.engine_names order.
+    At ttg == start_time the risk jumps, and the derivatives there are the ones from the left (no recovery).
+    """
+    __slots__ = ("mode_names", "engine_names", "ttgs", "risk", "d_ttg", "d_failure_rate", "d_start_time",
+                 "d_restart_probability")
+
+    def __init__(self, mode_names, engine_names, ttgs, risk, d_ttg, d_failure_rate, d_start_time,
+                 d_restart_probability):
+        self.mode_names = mode_names
+        self.engine_names = engine_names
+        self.ttgs = ttgs
+        self.risk = risk
+        self.d_ttg = d_ttg
+        self.d_failure_rate = d_failure_rate
+        self.d_start_time = d_start_time
+        self.d_restart_probability = d_restart_probability
+
+    def select(self, mode_indices):
+        """ Risk and derivatives of one mode per TTG (e.g. the optimal one), dropping the mode axis """
+        columns = np.arange(len(self.ttgs))
+        return RiskGradients(self.mode_names, self.engine_names, self.ttgs,
+                             self.risk[mode_indices, columns], self.d_ttg[mode_indices, columns],
+                             self.d_failure_rate[mode_indices, :, columns].T,
+                             self.d_start_time[mode_indices, :, columns].T,
+                             self.d_restart_probability[mode_indices, :, columns].T)
+
+
+def compute_risk_gradients(model, ttgs):
+    """ Returns RiskGradients of the total risk of every mode at the given 1-D TTGs """
+    plan = model.plan
+    ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+    n_modes, n_engines, n_ttgs = len(plan.modes), len(plan.engine_names), len(ttgs)
+    cost = model._grounding_cost() * 1000
+
+    # Recovery-time probability q = exp(-s / ttg) of every engine, and its derivatives (zero past the cutoff)
+    q = recovery_time_probability(ttgs, plan.start_time[:, np.newaxis])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dq_dttg = np.where(q > 0, q * plan.start_time[:, np.newaxis] / ttgs ** 2, 0.0)
+        dq_dstart = np.where(q > 0, -q / ttgs, 0.0)
+
+    risk = np.zeros((n_modes, n_ttgs))
+    d_ttg = np.zeros((n_modes, n_ttgs))
+    d_failure_rate = np.zeros((n_modes, n_engines, n_ttgs))
+    d_start_time = np.zeros((n_modes, n_engines, n_ttgs))
+    d_restart_probability = np.zeros((n_modes, n_engines, n_ttgs))
+    for m, mode in enumerate(plan.modes):
+        p_actions = mode.action_probabilities(q, plan.restart_probability)
+        recovery, d_recovery = mode.recovery_probability_and_gradient(p_actions)
+        scale = mode.failure_probability * cost
+        risk[m] = scale * recovery
+
+        # Chain rule through a_i = c_i * q_e(i), where c_i is the restart probability of restart actions
+        engines = mode.engine_indices
+        is_restart = mode.action_kinds == RESTART
+        factor = np.where(is_restart, plan.restart_probability[engines], 1.0)[:, np.newaxis]
+        d_ttg[m] = scale * np.sum(d_recovery * factor * dq_dttg[engines], axis=0)
+        np.add.at(d_start_time[m], engines, scale * d_recovery * factor * dq_dstart[engines])
+        np.add.at(d_restart_probability[m], engines[is_restart], scale * d_recovery[is_restart] * q[engines[is_restart]])
+
+        # p_failure = 1 - prod_j (1 - f_e(j)), so dp_failure/df_e sums the leave-one-out products over e's actions
+        failure_engines = mode.failure_engine_indices
+        if len(failure_engines):
+            survive = 1 - plan.failure_rate[failure_engines]
+            _, leave_one_out = _product_and_leave_one_out(survive[:, np.newaxis])
+            d_p_failure = np.zeros(n_engines)
+            np.add.at(d_p_failure, failure_engines, leave_one_out[:, 0])
+            d_failure_rate[m] = d_p_failure[:, np.newaxis] * recovery * cost
+
+    return RiskGradients(list(model.mode_names), list(plan.engine_names), ttgs, risk, d_ttg, d_failure_rate,
+                         d_start_time, d_restart_probability)
+
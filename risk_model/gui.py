@@ -4,10 +4,15 @@ from tkinter import messagebox
 import json
 import os
 
+from .plotting import mode_spans, shade_modes
+from .preview import PreviewWorker
+
 ctk.set_appearance_mode("Light")  # "System", "Dark", "Light"
 ctk.set_default_color_theme("blue")  # "blue", "green", "dark-blue"
 
 class RiskAnalysisApp(ctk.CTk):
+    PREVIEW_POLL_MS = 100  # How often the form is checked for changes and finished previews are drawn
+
     def __init__(self):
         super().__init__()
         
@@ -24,6 +29,16 @@ class RiskAnalysisApp(ctk.CTk):
         self.modes = []
         self.engine_frame = None  # Placeholder for engine frame
         self.modes_frame = None  # Placeholder for modes frame
+        self.engine_entries = []
+
+        # Live risk preview, computed off the Tk main loop and polled from it
+        self.preview_worker = PreviewWorker()
+        self.preview_config = None  # JSON of the last configuration submitted for preview
+        self.preview_frame = ctk.CTkFrame(self, corner_radius=10)
+        self.preview_frame.pack(side="bottom", pady=10, padx=10, fill="both", expand=True)
+        self.create_preview_section()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(self.PREVIEW_POLL_MS, self.poll_preview)
 
 
     def create_ship_config_section(self):
@@ -244,7 +259,8 @@ class RiskAnalysisApp(ctk.CTk):
 
 
 
-    def generate_file(self):
+    def collect_config(self):
+        """ The configuration dict of the current form fields, in the ship_config.json layout """
         # Extract Ship Configuration
         ship_config = {
             "ship_model": self.ship_name_entry.get(),
@@ -290,13 +306,16 @@ class RiskAnalysisApp(ctk.CTk):
             modes.append(mode_data)  # Append mode with its scenarios to the modes list
 
         # Combine all data into one configuration
-        config_data = {
+        return {
             "ship_configuration": ship_config,
             "grouding_cost": grounding_cost,
             "engines": engines,
             "modes": modes
         }
 
+    def generate_file(self):
+        config_data = self.collect_config()
+
         # Save to JSON file
         file_path = "ship_config.json"
         with open(file_path, "w") as json_file:
@@ -306,6 +325,64 @@ class RiskAnalysisApp(ctk.CTk):
         self.output_label1.configure(text=f"Configuration file generated: {os.path.abspath(file_path)}")
 
 
+    def create_preview_section(self):
+        title = ctk.CTkLabel(self.preview_frame, text="Risk Preview", font=ctk.CTkFont(size=15, weight="bold"))
+        title.pack(pady=5)
+        self.preview_label = ctk.CTkLabel(self.preview_frame, text="Fill in the configuration to preview its risk profile",
+                                          font=ctk.CTkFont(size=12))
+        self.preview_label.pack()
+
+        # matplotlib is only needed for the preview, so the form still works without it
+        try:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        except ImportError:
+            self.preview_canvas = None
+            self.preview_label.configure(text="Install matplotlib to preview the risk profile")
+            return
+        figure = Figure(figsize=(8, 3), dpi=100)
+        self.preview_axes = figure.add_subplot()
+        self.preview_axes.set_xlabel("TTG (seconds)")
+        self.preview_axes.set_ylabel("Risk")
+        self.preview_line, = self.preview_axes.plot([], [])
+        self.preview_spans = []  # Shaded optimal-mode regions of the drawn result
+        self.preview_canvas = FigureCanvasTkAgg(figure, master=self.preview_frame)
+        self.preview_canvas.get_tk_widget().pack(fill="both", expand=True)
+
+    def poll_preview(self):
+        """ Submits the form when it changed and draws the newest finished preview, then reschedules itself """
+        config_json = json.dumps(self.collect_config(), sort_keys=True)
+        if config_json != self.preview_config:
+            self.preview_config = config_json
+            self.preview_worker.submit(json.loads(config_json))
+        result = self.preview_worker.poll()
+        if result is not None:
+            self.draw_preview(result)
+        self.after(self.PREVIEW_POLL_MS, self.poll_preview)
+
+    def draw_preview(self, result):
+        if result.error is not None:
+            self.preview_label.configure(text=f"Preview unavailable: {result.error}")
+            return
+        self.preview_label.configure(text="  ".join(f"{mode}: ({ttg_from:g}, {ttg_to:g}] s"
+                                                    for ttg_from, ttg_to, mode in result.schedule))
+        if self.preview_canvas is None:
+            return
+        # The line and the mode spans are updated in place, only the canvas is redrawn
+        self.preview_line.set_data(result.ttgs, result.risks)
+        for span in self.preview_spans:
+            span.remove()
+        spans = mode_spans(result.schedule, result.ttgs[0], result.ttgs[-1])
+        self.preview_spans = shade_modes(self.preview_axes, spans, result.mode_names)
+        self.preview_axes.relim()
+        self.preview_axes.autoscale_view()
+        self.preview_canvas.draw_idle()
+
+    def on_close(self):
+        self.preview_worker.close()
+        self.destroy()
+
+
 
 
 
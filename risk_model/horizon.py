@@ -0,0 +1,197 @@
+import numpy as np
+
+
+def _tree_size(capacity):
+    """ Number of leaves of the segment trees: the smallest power of two holding capacity samples """
+    return 1 << max(capacity - 1, 0).bit_length()
+
+
+class RollingRiskHorizon:
+    """ Per-mode risk of a predicted TTG horizon that is republished with small changes, kept up to date incrementally.
+
+    The horizon is a window of at most capacity samples in a ring buffer: the TTGs, the (n_modes, length)
+    risk matrix, the optimal mode and its risk. Updates only evaluate the samples that are new or changed,
+    and sum and max segment trees over the optimal risks, together with flags marking where the optimal
+    mode changes, keep total_risk, max_risk and the mode segmentation current at O(delta log capacity) per
+    update. Positions are logical: 0 is the oldest sample of the horizon.
+    """
+
+    def __init__(self, model, capacity, ttgs=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.model = model
+        self.mode_names = list(model.mode_names)
+        self.capacity = capacity
+        self.n_evaluated = 0  # Samples evaluated over the lifetime, for checking the incremental cost
+        self._head = 0
+        self._length = 0
+        self._ttgs = np.zeros(capacity)
+        self._risks = np.zeros((len(self.mode_names), capacity))
+        self._modes = np.zeros(capacity, dtype=np.intp)
+        self._boundary = np.zeros(capacity, dtype=bool)  # Optimal mode differs from the previous sample
+        self._n_boundaries = 0
+        self._leaves = _tree_size(capacity)
+        self._sum_tree = np.zeros(2 * self._leaves)
+        self._max_tree = np.full(2 * self._leaves, -np.inf)
+        if ttgs is not None:
+            self.advance(ttgs)
+
+    def __len__(self):
+        return self._length
+
+    def _physical(self, positions):
+        return (self._head + positions) % self.capacity
+
+    def _set_leaves(self, physical, sums, maxima):
+        """ Writes the leaves at physical positions of the sum and max trees and updates their ancestors """
+        leaves = physical + self._leaves
+        self._sum_tree[leaves] = sums
+        self._max_tree[leaves] = maxima
+        if 8 * len(leaves) > self._leaves:  # Cheaper to rebuild every level than to deduplicate the ancestors
+            size = self._leaves // 2
+            while size >= 1:
+                left, right = slice(2 * size, 4 * size, 2), slice(2 * size + 1, 4 * size, 2)
+                np.add(self._sum_tree[left], self._sum_tree[right], out=self._sum_tree[size:2 * size])
+                np.maximum(self._max_tree[left], self._max_tree[right], out=self._max_tree[size:2 * size])
+                size //= 2
+            return
+        nodes = np.unique(leaves >> 1)
+        while nodes[-1] >= 1:
+            self._sum_tree[nodes] = self._sum_tree[2 * nodes] + self._sum_tree[2 * nodes + 1]
+            self._max_tree[nodes] = np.maximum(self._max_tree[2 * nodes], self._max_tree[2 * nodes + 1])
+            nodes = np.unique(nodes >> 1)
+
+    def _update_boundaries(self, positions):
+        """ Recomputes the mode-change flags at logical positions (duplicates and out-of-range ones are ignored) """
+        positions = np.unique(positions)
+        positions = positions[(positions >= 0) & (positions < self._length)]
+        if len(positions) == 0:
+            return
+        physical = self._physical(positions)
+        flags = (self._modes[physical] != self._modes[self._physical(positions - 1)]) & (positions > 0)
+        self._n_boundaries += int(np.count_nonzero(flags)) - int(np.count_nonzero(self._boundary[physical]))
+        self._boundary[physical] = flags
+
+    def _drop(self, n, front):
+        """ Removes n samples from the front (oldest) or back of the horizon """
+        n = min(n, self._length)
+        if n <= 0:
+            return
+        positions = np.arange(n) if front else np.arange(self._length - n, self._length)
+        physical = self._physical(positions)
+        self._n_boundaries -= int(np.count_nonzero(self._boundary[physical]))
+        self._boundary[physical] = False
+        self._set_leaves(physical, 0.0, -np.inf)  # The neutral elements of sum and max
+        self._length -= n
+        if front:
+            self._head = (self._head + n) % self.capacity
+            self._update_boundaries(np.array([0]))  # The new first sample starts a segment
+
+    def _write(self, positions, ttgs):
+        """ Evaluates TTGs at logical positions, within the current length, and updates the indexes """
+        if len(positions) == 0:
+            return positions
+        physical = self._physical(positions)
+        risks = self.model.compute_total_risk_batch(ttgs)
+        modes = np.argmin(risks, axis=0)
+        self._ttgs[physical] = ttgs
+        self._risks[:, physical] = risks
+        self._modes[physical] = modes
+        min_risks = risks[modes, np.arange(len(positions))]
+        self._set_leaves(physical, min_risks, min_risks)
+        self._update_boundaries(np.concatenate([positions, positions + 1]))
+        self.n_evaluated += len(positions)
+        return positions
+
+    def advance(self, new_ttgs, shift=None):
+        """ Drops the shift oldest samples (default len(new_ttgs)) and appends new_ttgs.
+
+        Returns the logical positions that were evaluated.
+        """
+        new_ttgs = np.ravel(np.asarray(new_ttgs, dtype=float))
+        shift = len(new_ttgs) if shift is None else shift
+        if self._length - min(shift, self._length) + len(new_ttgs) > self.capacity:
+            raise ValueError(f"The horizon would exceed its capacity of {self.capacity} samples")
+        self._drop(shift, front=True)
+        start = self._length
+        self._length += len(new_ttgs)
+        return self._write(np.arange(start, self._length), new_ttgs)
+
+    def set(self, positions, ttgs):
+        """ Replaces the TTGs at logical positions, evaluating only those that differ; returns the evaluated ones """
+        positions = np.ravel(np.asarray(positions, dtype=np.intp))
+        ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+        if len(positions) and (positions.min() < 0 or positions.max() >= self._length):
+            raise IndexError(f"positions must lie within the horizon of {self._length} samples")
+        changed = self._ttgs[self._physical(positions)] != ttgs
+        return self._write(positions[changed], ttgs[changed])
+
+    def update(self, ttgs, shift=0):
+        """ Replaces the horizon by a republished one that starts shift samples later.
+
+        Samples still in the horizon are compared with the new TTGs in one vectorized pass, and only the
+        changed and appended samples are evaluated; advance and set avoid even that comparison. Returns the
+        logical positions that were evaluated.
+        """
+        ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+        if len(ttgs) > self.capacity:
+            raise ValueError(f"The horizon would exceed its capacity of {self.capacity} samples")
+        self._drop(shift, front=True)
+        self._drop(self._length - len(ttgs), front=False)
+        kept = self._length
+        changed = np.flatnonzero(self._ttgs[self._physical(np.arange(kept))] != ttgs[:kept])
+        self._length = len(ttgs)
+        positions = np.concatenate([changed, np.arange(kept, len(ttgs))])
+        return self._write(positions, ttgs[positions])
+
+    @property
+    def ttgs(self):
+        return self._ttgs[self._physical(np.arange(self._length))]
+
+    @property
+    def risks(self):
+        """ Risk of every mode at every sample, shape (n_modes, length) """
+        return self._risks[:, self._physical(np.arange(self._length))]
+
+    @property
+    def mode_indices(self):
+        """ Optimal mode index of every sample """
+        return self._modes[self._physical(np.arange(self._length))]
+
+    @property
+    def min_risks(self):
+        """ Risk of the optimal mode at every sample """
+        return self._sum_tree[self._leaves + self._physical(np.arange(self._length))]
+
+    @property
+    def total_risk(self):
+        """ Sum of the optimal risks over the horizon, read from the sum tree """
+        return float(self._sum_tree[1])
+
+    @property
+    def max_risk(self):
+        """ Largest optimal risk in the horizon (-inf if it is empty) """
+        return float(self._max_tree[1])
+
+    def argmax_risk(self):
+        """ Logical position of the largest optimal risk, found by descending the max tree (None if empty) """
+        if self._length == 0:
+            return None
+        node = 1
+        while node < self._leaves:
+            node = 2 * node if self._max_tree[2 * node] >= self._max_tree[2 * node + 1] else 2 * node + 1
+        return int((node - self._leaves - self._head) % self.capacity)
+
+    @property
+    def n_segments(self):
+        """ Number of runs of the same optimal mode """
+        return self._n_boundaries + 1 if self._length else 0
+
+    def segments(self):
+        """ (start, end, mode name) of every run of the same optimal mode, end exclusive, in horizon order """
+        physical = self._physical(np.arange(self._length))
+        starts = np.flatnonzero(self._boundary[physical])
+        starts = np.concatenate([[0], starts]) if self._length else starts
+        ends = np.append(starts[1:], self._length)
+        modes = self._modes[physical[starts]]
+        return [(int(start), int(end), self.mode_names[mode]) for start, end, mode in zip(starts, ends, modes)]
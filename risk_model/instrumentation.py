@@ -0,0 +1,190 @@
+import bisect
+import collections
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+# RiskModel methods that are timed, and the entry points among them whose TTGs are recorded
+METHODS = ("compute_machinery_failure_probability", "compute_recovery_probability",
+           "compute_recovery_probability_batch", "compute_grounding_probability", "compute_grounding_probability_batch",
+           "compute_total_risk", "compute_total_risk_batch", "select_mso_mode", "select_mso_mode_batch")
+TTG_METHODS = ("compute_total_risk", "compute_total_risk_batch", "select_mso_mode", "select_mso_mode_batch")
+
+# Upper edges of the TTG histogram buckets in seconds; the last bucket is everything above, NaN is counted apart
+TTG_EDGES = (0.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 3600.0)
+
+
+class Instrumentation:
+    """ Call counts, cumulative time and input histograms of one RiskModel's methods.
+
+    Installed by RiskModel.enable_instrumentation, which wraps the methods on that instance only, so models
+    without instrumentation run the plain methods with no overhead. Times are cumulative: a method that
+    calls another instrumented method includes its time. TTGs are recorded at the entry points in
+    TTG_METHODS, with the number of TTGs per call in power-of-two batch-size buckets.
+    """
+
+    def __init__(self):
+        self.methods = {}  # name -> [calls, seconds]
+        self.batch_sizes = collections.Counter()  # bit length of the batch size -> calls
+        self.ttg_counts = np.zeros(len(TTG_EDGES) + 1, dtype=np.int64)
+        self.ttg_nan = 0
+        self.ttg_min = np.inf
+        self.ttg_max = -np.inf
+
+    def reset(self):
+        """ Zeroes every counter and histogram; the installed wrappers keep counting into the same lists """
+        for counter in self.methods.values():
+            counter[:] = [0, 0.0]
+        self.batch_sizes.clear()
+        self.ttg_counts[:] = 0
+        self.ttg_nan = 0
+        self.ttg_min = np.inf
+        self.ttg_max = -np.inf
+
+    def wrap(self, name, method):
+        """ Returns method wrapped to update the counters (and the TTG histograms for entry points) """
+        counter = self.methods.setdefault(name, [0, 0.0])
+        records_ttgs = name in TTG_METHODS
+        perf_counter = time.perf_counter
+
+        def instrumented(*args, **kwargs):
+            began = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                counter[1] += perf_counter() - began
+                counter[0] += 1
+                if records_ttgs and args:
+                    self.record_ttgs(args[0])
+
+        instrumented.__wrapped__ = method
+        instrumented.__name__ = name
+        instrumented.__doc__ = method.__doc__
+        return instrumented
+
+    def record_ttgs(self, ttgs):
+        """ Adds the TTGs of one call to the batch-size and TTG histograms """
+        if np.isscalar(ttgs):
+            ttg = float(ttgs)
+            self.batch_sizes[1] += 1
+            if ttg != ttg:
+                self.ttg_nan += 1
+                return
+            self.ttg_counts[bisect.bisect_left(TTG_EDGES, ttg)] += 1
+            self.ttg_min = min(self.ttg_min, ttg)
+            self.ttg_max = max(self.ttg_max, ttg)
+            return
+        ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+        self.batch_sizes[len(ttgs).bit_length()] += 1
+        valid = ttgs[~np.isnan(ttgs)]
+        self.ttg_nan += len(ttgs) - len(valid)
+        if len(valid):
+            self.ttg_counts += np.bincount(np.searchsorted(TTG_EDGES, valid, side="left"),
+                                           minlength=len(self.ttg_counts))
+            self.ttg_min = min(self.ttg_min, float(valid.min()))
+            self.ttg_max = max(self.ttg_max, float(valid.max()))
+
+    def snapshot(self):
+        """ Plain dict of the counters and histograms, safe to serialize as JSON """
+        labels = [f"<={edge:g}" for edge in TTG_EDGES] + [f">{TTG_EDGES[-1]:g}"]
+        batch_sizes = {("0" if bits == 0 else f"{1 << (bits - 1)}-{(1 << bits) - 1}"): count
+                       for bits, count in sorted(self.batch_sizes.items())}
+        return {
+            "methods": {name: {"calls": calls, "seconds": seconds,
+                               "mean_us": seconds / calls * 1e6 if calls else 0.0}
+                        for name, (calls, seconds) in self.methods.items()},
+            "batch_sizes": batch_sizes,
+            "ttg_histogram": dict(zip(labels, self.ttg_counts.tolist())),
+            "ttg_nan": self.ttg_nan,
+            "ttg_range": [self.ttg_min, self.ttg_max] if self.ttg_min <= self.ttg_max else None,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+
+class ProfileCapture:
+    """ Result of a profile() window: stats is a plain dict, text the formatted report """
+    __slots__ = ("method", "stats", "text")
+
+    def __init__(self):
+        self.method = None
+        self.stats = None
+        self.text = ""
+
+
+def _function_label(code):
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+def _sample_stacks(thread_id, interval, stop, self_counts, total_counts):
+    """ Sampling loop: counts the innermost function (self) and every function on the stack (total) """
+    samples = 0
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        samples += 1
+        self_counts[_function_label(frame.f_code)] += 1
+        seen = set()
+        while frame is not None:
+            label = _function_label(frame.f_code)
+            if label not in seen:
+                seen.add(label)
+                total_counts[label] += 1
+            frame = frame.f_back
+    total_counts[None] = samples
+
+
+@contextlib.contextmanager
+def profile(method="cprofile", limit=30, interval=0.001):
+    """ Profiles the code run inside the with block.
+
+    method="cprofile" traces every call with cProfile (exact counts, noticeable overhead); "sampling" looks
+    at the calling thread's stack every interval seconds from a background thread (low overhead,
+    statistical). Yields a ProfileCapture filled in on exit with the top limit functions.
+    """
+    capture = ProfileCapture()
+    capture.method = method
+    if method == "cprofile":
+        import cProfile  # Only needed while profiling
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield capture
+        finally:
+            profiler.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream).sort_stats("cumulative")
+            stats.print_stats(limit)
+            capture.text = stream.getvalue()
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+            capture.stats = {"functions": [{"function": f"{filename}:{line}({name})", "calls": calls,
+                                            "self_seconds": self_time, "cumulative_seconds": cumulative}
+                                           for (filename, line, name), (_, calls, self_time, cumulative, _) in rows]}
+    elif method == "sampling":
+        self_counts, total_counts = collections.Counter(), collections.Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=_sample_stacks, daemon=True,
+                                   args=(threading.get_ident(), interval, stop, self_counts, total_counts))
+        sampler.start()
+        try:
+            yield capture
+        finally:
+            stop.set()
+            sampler.join()
+            samples = total_counts.pop(None, 0)
+            capture.stats = {"samples": samples, "interval": interval,
+                             "functions": [{"function": label, "self_samples": self_counts[label],
+                                            "total_samples": count}
+                                           for label, count in total_counts.most_common(limit)]}
+            capture.text = "\n".join(f"{row['total_samples']:8d} {row['self_samples']:8d}  {row['function']}"
+                                     for row in capture.stats["functions"])
+    else:
+        raise ValueError("method must be 'cprofile' or 'sampling'")
@@ -0,0 +1,118 @@
+import numpy as np
+
+from .schedule import ModeSchedule
+
+
+class RiskLUT:
+    """ Piecewise-linear lookup table of the per-mode total risk over TTG in [0, ttg_max].
+
+    Nodes are shared by all modes. Every engine start time in the range, zero included, is a node, followed
+    by the next float up, so the jump of the ttg <= recovery_time cutoff never falls inside an interpolation
+    interval.
+    TTGs below zero use the value at zero (no engine can recover there) and TTGs above ttg_max give NaN.
+    """
+
+    def __init__(self, nodes, values, mode_names, ttg_max, tol, rtol, max_error, schedule, error_ratio=np.nan):
+        self.nodes = nodes
+        self.values = values  # (n_modes, n_nodes)
+        self.mode_names = list(mode_names)
+        self.ttg_max = ttg_max
+        self.tol = tol
+        self.rtol = rtol
+        self.max_error = max_error  # Largest absolute error against the model found on the verification grid
+        self.error_ratio = error_ratio  # Largest error / (tol + rtol * |risk|) there, <= 1 where the tolerance held
+        self.schedule = schedule
+
+    @classmethod
+    def build(cls, model, ttg_max, tol, rtol=0.0, n_initial=16, max_nodes=10**7):
+        """ Samples model.compute_total_risk_batch on a grid refined until |lut - risk| <= tol + rtol * |risk|
+        at the quarter points of every interval and on a verification grid 8 times finer than the nodes.
+
+        The tolerance is a sampled estimate, not a guarantee: intervals are halved while any quarter-point
+        check fails, then the intervals holding a failing verification point are halved and both checks
+        run again, so the error between the sampled points is not bounded. The built table reports the
+        worst error on its last verification grid as max_error (absolute) and error_ratio (relative to the
+        combined tolerance, at most 1). Raises ValueError if the grid would exceed max_nodes.
+        """
+        ttg_max = float(ttg_max)
+        if ttg_max <= 0:
+            raise ValueError("ttg_max must be positive")
+        if tol <= 0 and rtol <= 0:
+            raise ValueError("tol or rtol must be positive")
+
+        start_times = np.unique(model.plan.start_time)
+        cuts = start_times[(start_times >= 0) & (start_times < ttg_max)]  # A start time of 0 jumps at 0 too
+        edges = np.unique(np.concatenate([[0.0], cuts, [ttg_max]]))
+        nodes = [np.linspace(lower, upper, n_initial) for lower, upper in zip(edges[:-1], edges[1:])]
+        nodes.append(np.nextafter(cuts, np.inf))
+        nodes = np.unique(np.concatenate(nodes))
+
+        fractions = np.array([0.25, 0.5, 0.75])
+        while True:
+            lower, upper = nodes[:-1], nodes[1:]
+            # Intervals of one float step sit on a discontinuity and are never queried inside
+            candidates = np.flatnonzero(np.nextafter(lower, np.inf) < upper)
+            checks = lower[candidates, np.newaxis] + (upper - lower)[candidates, np.newaxis] * fractions
+            values = model.compute_total_risk_batch(nodes)
+            exact = model.compute_total_risk_batch(checks)
+            interpolated = (values[:, candidates, np.newaxis] * (1 - fractions)
+                            + values[:, candidates + 1, np.newaxis] * fractions)
+            failed = np.abs(interpolated - exact) > tol + rtol * np.abs(exact)
+            failed = candidates[failed.any(axis=(0, 2))]
+            if len(failed) == 0:
+                # Quarter points pass: verify between them and go on refining where that fails
+                lut = cls(nodes, values, model.mode_names, ttg_max, tol, rtol, 0.0, model.mode_schedule())
+                verification = np.linspace(0.0, ttg_max, 8 * len(nodes) + 1)
+                exact = model.compute_total_risk_batch(verification)
+                error = np.abs(lut.risk_matrix(verification) - exact)
+                ratio = np.max(error / (tol + rtol * np.abs(exact)), axis=0)
+                if np.all(ratio <= 1):
+                    break
+                failed = np.unique(np.clip(np.searchsorted(nodes, verification[ratio > 1]) - 1, 0, len(nodes) - 2))
+            if len(nodes) + len(failed) > max_nodes:
+                raise ValueError(f"Lookup table needs more than {max_nodes} nodes for tol={tol}, rtol={rtol}")
+            nodes = np.sort(np.concatenate([nodes, 0.5 * (nodes[failed] + nodes[failed + 1])]))
+
+        lut.max_error = float(np.max(error))
+        lut.error_ratio = float(np.max(ratio))
+        return lut
+
+    def risk_matrix(self, ttgs):
+        """ Interpolated risk of every mode, shape (n_modes,) + ttgs.shape """
+        ttgs = np.asarray(ttgs, dtype=float)
+        x = np.maximum(ttgs.reshape(-1), 0.0)
+        upper = np.clip(np.searchsorted(self.nodes, x, side='left'), 1, len(self.nodes) - 1)
+        lower = upper - 1
+        weight = (x - self.nodes[lower]) / (self.nodes[upper] - self.nodes[lower])
+        risks = self.values[:, lower] * (1 - weight) + self.values[:, upper] * weight
+        risks[:, ~(x <= self.ttg_max)] = np.nan
+        return risks.reshape((len(self.mode_names),) + ttgs.shape)
+
+    def total_risk(self, ttgs, mode):
+        """ Interpolated risk of one mode, shaped like ttgs """
+        return self.risk_matrix(ttgs)[self.mode_names.index(mode)]
+
+    def select_mso_mode(self, ttgs):
+        """ Returns (mode_indices, min_risks) like RiskModel.select_mso_mode_batch, with interpolated risks """
+        ttgs = np.asarray(ttgs, dtype=float)
+        mode_indices = self.schedule.lookup(ttgs)
+        risks = self.risk_matrix(ttgs)
+        min_risks = np.take_along_axis(risks, mode_indices[np.newaxis], axis=0)[0]
+        return mode_indices, min_risks
+
+    def save(self, path):
+        """ Writes the table to a .npz file """
+        np.savez(path, nodes=self.nodes, values=self.values, mode_names=np.array(self.mode_names),
+                 ttg_max=self.ttg_max, tol=self.tol, rtol=self.rtol, max_error=self.max_error,
+                 error_ratio=self.error_ratio,
+                 breakpoints=self.schedule.breakpoints, schedule_modes=self.schedule.mode_indices)
+
+    @classmethod
+    def load(cls, path):
+        """ Reads a table written by save() """
+        with np.load(path) as data:
+            mode_names = data["mode_names"].tolist()
+            schedule = ModeSchedule(data["breakpoints"], data["schedule_modes"], mode_names)
+            error_ratio = float(data["error_ratio"]) if "error_ratio" in data.files else np.nan  # Older tables
+            return cls(data["nodes"], data["values"], mode_names, float(data["ttg_max"]), float(data["tol"]),
+                       float(data["rtol"]), float(data["max_error"]), schedule, error_ratio)
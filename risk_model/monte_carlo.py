@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from .plan import RESTART
+
+
+class MonteCarloResult:
+    """ Simulated against analytic grounding probability, per mode (rows) and TTG (columns).
+
+    The recovery part is simulated and the failure part is analytic: failure rates around 1e-9 are far too
+    small to sample, so p_grounding = failure probability * P(no recovery | failure) for both estimates.
+    """
+    __slots__ = ("mode_names", "ttgs", "n_samples", "confidence", "p_no_recovery", "ci_low", "ci_high",
+                 "analytic_p_no_recovery", "p_failure")
+
+    def __init__(self, mode_names, ttgs, n_samples, confidence, p_no_recovery, ci_low, ci_high,
+                 analytic_p_no_recovery, p_failure):
+        self.mode_names = mode_names
+        self.ttgs = ttgs
+        self.n_samples = n_samples
+        self.confidence = confidence
+        self.p_no_recovery = p_no_recovery
+        self.ci_low = ci_low
+        self.ci_high = ci_high
+        self.analytic_p_no_recovery = analytic_p_no_recovery
+        self.p_failure = p_failure
+
+    @property
+    def p_grounding(self):
+        return self.p_failure[:, np.newaxis] * self.p_no_recovery
+
+    @property
+    def p_grounding_ci(self):
+        """ (low, high) confidence bounds of p_grounding """
+        return self.p_failure[:, np.newaxis] * self.ci_low, self.p_failure[:, np.newaxis] * self.ci_high
+
+    @property
+    def analytic_p_grounding(self):
+        return self.p_failure[:, np.newaxis] * self.analytic_p_no_recovery
+
+    @property
+    def agrees(self):
+        """ True where the analytic value lies inside the confidence interval """
+        return (self.ci_low <= self.analytic_p_no_recovery) & (self.analytic_p_no_recovery <= self.ci_high)
+
+    def summary(self):
+        """ Plain dict of the comparison, one entry per mode """
+        difference = np.abs(self.p_no_recovery - self.analytic_p_no_recovery)
+        return {name: {"max_abs_difference": float(np.max(difference[i])), "agreement": float(np.mean(self.agrees[i]))}
+                for i, name in enumerate(self.mode_names)}
+
+
+def _simulate_counts(plan, ttgs, n_samples, seed, start_time_sigma, independent, chunk_size):
+    """ Counts the voyages without recovery for every mode and TTG, shape (n_modes, T) """
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((len(plan.modes), len(ttgs)), dtype=np.int64)
+    for mode_index, mode in enumerate(plan.modes):
+        if mode.n_scenarios == 0:
+            counts[mode_index] = n_samples  # Nothing can restore the mode
+            continue
+        if independent:
+            # Every action is its own event, as the analytic product over scenarios assumes
+            event_engines, event_kinds = mode.engine_indices, mode.action_kinds
+            action_events = np.arange(mode.n_actions)
+        else:
+            # The same start/restart of an engine in several scenarios is a single event
+            pairs = np.stack([mode.engine_indices, mode.action_kinds.astype(np.intp)], axis=1)
+            events, action_events = np.unique(pairs, axis=0, return_inverse=True)
+            event_engines, event_kinds = events[:, 0], events[:, 1]
+            action_events = action_events.reshape(-1)
+        nominal_start = plan.start_time[event_engines]
+        in_time = ttgs[:, np.newaxis] > nominal_start  # The analytic ttg <= recovery_time cutoff
+        restart_probability = np.where(event_kinds == RESTART, plan.restart_probability[event_engines], 1.0)
+
+        done = 0
+        while done < n_samples:
+            n = min(chunk_size, n_samples - done)
+            shape = (n, len(ttgs), len(event_engines))
+            grounding_time = rng.exponential(size=shape if independent else shape[:2] + (1,))
+            grounding_time *= ttgs[:, np.newaxis]
+            start_time = nominal_start
+            if start_time_sigma > 0:
+                start_time = nominal_start * np.exp(start_time_sigma * rng.standard_normal(shape))
+            success = (start_time < grounding_time) & in_time & (rng.random(shape) < restart_probability)
+            recovered = mode.restores(success[..., action_events])
+            counts[mode_index] += n - recovered.sum(axis=0)
+            done += n
+    return counts
+
+
+def _wilson_interval(successes, n, confidence):
+    """ Wilson score interval of a binomial proportion """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denominator = 1 + z ** 2 / n
+    centre = (p + z ** 2 / (2 * n)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return centre - half_width, centre + half_width
+
+
+def simulate_grounding_probability(model, ttgs, n_samples, seed=None, start_time_sigma=0.0, independent=True,
+                                   confidence=0.95, n_workers=1, task_size=1 << 20, memory_budget=64 << 20):
+    """ Monte Carlo estimate of P(no recovery | failure) for every mode and TTG of a RiskModel.
+
+    Each simulated voyage draws an exponential time to grounding with mean ttg, the success of restart
+    actions and optionally lognormal start times (start_time_sigma is the log standard deviation around
+    the configured start time). A scenario succeeds when all its actions finish before grounding. With
+    independent=True every action draws its own events, which is what the analytic model assumes, so the
+    analytic value should fall inside the confidence interval; independent=False shares the grounding time
+    of a voyage and the outcome of an engine across scenarios. Fault-tree modes always share an engine's
+    outcome across scenarios, as their analytic evaluation does.
+
+    Samples are split into tasks of task_size seeded from seed, so results do not depend on n_workers, and
+    each task works in chunks of about memory_budget bytes.
+    """
+    if n_samples <= 0:
+        raise ValueError("n_samples must be positive")
+    ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+    plan = model.plan
+    max_events = max([mode.n_actions for mode in plan.modes] + [1])
+    chunk_size = max(1, memory_budget // (32 * len(ttgs) * max_events))
+
+    n_tasks = -(-n_samples // task_size)
+    sizes = [min(task_size, n_samples - i * task_size) for i in range(n_tasks)]
+    seeds = np.random.SeedSequence(seed).spawn(n_tasks)
+    arguments = [(plan, ttgs, size, task_seed, start_time_sigma, independent, chunk_size)
+                 for size, task_seed in zip(sizes, seeds)]
+    if n_workers > 1 and n_tasks > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            counts = sum(executor.map(_simulate_counts, *zip(*arguments)))
+    else:
+        counts = sum(_simulate_counts(*args) for args in arguments)
+
+    ci_low, ci_high = _wilson_interval(counts, n_samples, confidence)
+    analytic = np.stack([model.compute_recovery_probability_batch(ttgs, name) for name in model.mode_names])
+    p_failure = np.array([mode.failure_probability for mode in plan.modes])
+    return MonteCarloResult(list(model.mode_names), ttgs, n_samples, confidence, counts / n_samples,
+                            ci_low, ci_high, analytic, p_failure)
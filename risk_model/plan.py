@@ -0,0 +1,372 @@
+import math
+
+import numpy as np
+
+from .fault_tree import build_restoration_bdd
+
+# Action kinds
+START = 0
+RESTART = 1
+
+# Operations that take part in a restoration scenario
+AND = "AND"
+OR = "OR"
+TERMINATE = "Terminate"
+
+
+def recovery_time_probability(ttgs, recovery_times):
+    """ Vectorized probability of recovering within the TTG, zero where ttg <= recovery_time (broadcasts) """
+    ttgs = np.asarray(ttgs, dtype=float)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        p = np.exp(-recovery_times / ttgs)
+    return np.where(ttgs <= recovery_times, 0.0, p)  # No time to recover
+
+
+def parse_action(action):
+    """ Splits an action like "Restart Engine 1" into its kind code and engine label ("Engine 1") """
+    verb, _, engine_label = action.partition(" ")
+    verb = verb.lower()
+    if verb == "restart":
+        return RESTART, engine_label
+    if verb == "start":
+        return START, engine_label
+    raise ValueError(f"Unknown action '{action}', expected 'Start <engine>' or 'Restart <engine>'")
+
+
+def _product_and_leave_one_out(x):
+    """ Product of x along axis -2, and the product of all other entries for each entry along that axis """
+    ones = np.ones(x.shape[:-2] + (1,) + x.shape[-1:])
+    prefix = np.cumprod(np.concatenate([ones, x[..., :-1, :]], axis=-2), axis=-2)
+    suffix = np.flip(np.cumprod(np.concatenate([ones, np.flip(x[..., 1:, :], axis=-2)], axis=-2), axis=-2), axis=-2)
+    return prefix[..., -1, :] * x[..., -1, :], prefix * suffix
+
+
+class ModePlan:
+    """ Compiled restoration scenarios of one machinery mode.
+
+    Recovery actions are stored flat in scenario order: engine_indices and action_kinds hold one entry per
+    action, and group_offsets the index of the first action of each scenario (the np.multiply.reduceat layout).
+    failure_engine_indices lists the engine of every action in the mode, used for the failure probability.
+    scalar_scenarios holds the same scenarios as tuples of (start_time, restart factor) for scalar evaluation.
+    """
+    __slots__ = ("name", "engine_indices", "action_kinds", "group_offsets", "failure_engine_indices",
+                 "failure_probability", "scalar_scenarios")
+
+    def __init__(self, name, engine_indices, action_kinds, group_offsets, failure_engine_indices, failure_probability,
+                 scalar_scenarios=()):
+        self.name = name
+        self.engine_indices = engine_indices
+        self.action_kinds = action_kinds
+        self.group_offsets = group_offsets
+        self.failure_engine_indices = failure_engine_indices
+        self.failure_probability = failure_probability
+        self.scalar_scenarios = scalar_scenarios
+
+    @property
+    def n_actions(self):
+        return len(self.engine_indices)
+
+    @property
+    def n_scenarios(self):
+        return len(self.group_offsets)
+
+    def action_probabilities(self, engine_probabilities, restart_probability):
+        """ Probability of each recovery action succeeding, shape (..., n_actions, T).
+
+        engine_probabilities is (..., n_engines, T) recovery-time probabilities and restart_probability
+        (..., n_engines); restart actions are scaled by the engine's restart probability.
+        """
+        p_actions = engine_probabilities[..., self.engine_indices, :]
+        is_restart = self.action_kinds == RESTART
+        if is_restart.any():
+            scale = np.where(is_restart, restart_probability[..., self.engine_indices], 1.0)
+            p_actions = p_actions * scale[..., np.newaxis]
+        return p_actions
+
+    def scenario_probabilities(self, action_probabilities):
+        """ Probability of each scenario restoring the mode, shape (..., n_scenarios, T) """
+        return np.multiply.reduceat(action_probabilities, self.group_offsets, axis=-2)
+
+    def recovery_probability(self, action_probabilities):
+        """ Probability that no scenario restores the mode before grounding, shape (..., T) """
+        return self.recovery_and_scenario_probabilities(action_probabilities)[0]
+
+    def recovery_and_scenario_probabilities(self, action_probabilities):
+        """ recovery_probability together with the scenario_probabilities it is computed from """
+        if self.n_scenarios == 0:
+            shape = action_probabilities.shape[:-2] + action_probabilities.shape[-1:]
+            return np.ones(shape), np.zeros(shape[:-1] + (0,) + shape[-1:])
+        scenario_probabilities = self.scenario_probabilities(action_probabilities)
+        return np.prod(1 - scenario_probabilities, axis=-2), scenario_probabilities
+
+    def recovery_probability_and_gradient(self, action_probabilities):
+        """ recovery_probability together with its derivative with respect to every action probability.
+
+        Returns (recovery, d_recovery) with shapes (..., T) and (..., n_actions, T). Leave-one-out products
+        are built from prefix and suffix products, so zero probabilities need no special casing.
+        """
+        recovery_shape = action_probabilities.shape[:-2] + action_probabilities.shape[-1:]
+        d_recovery = np.zeros(action_probabilities.shape)
+        if self.n_scenarios == 0:
+            return np.ones(recovery_shape), d_recovery
+
+        bounds = list(self.group_offsets) + [self.n_actions]
+        scenario_probabilities, d_scenario = [], []  # d_scenario: derivative of each scenario wrt its actions
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            scenario, d_actions = _product_and_leave_one_out(action_probabilities[..., begin:end, :])
+            scenario_probabilities.append(scenario)
+            d_scenario.append(d_actions)
+
+        recovery, d_failed = _product_and_leave_one_out(1 - np.stack(scenario_probabilities, axis=-2))
+        for k, (begin, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            d_recovery[..., begin:end, :] = -d_failed[..., k:k + 1, :] * d_scenario[k]
+        return recovery, d_recovery
+
+    def recovery_probability_scalar(self, ttg):
+        """ recovery_probability for a single TTG, using plain floats only """
+        ttg = float(ttg)
+        total = 1.0
+        for scenario in self.scalar_scenarios:
+            p_scenario = 1.0
+            for start_time, factor in scenario:
+                if ttg <= start_time:
+                    p_scenario = 0.0  # No time to recover
+                    break
+                p_scenario *= factor * math.exp(-start_time / ttg)
+            total *= 1 - p_scenario
+        return total
+
+    def restores(self, action_success):
+        """ Whether some scenario restores the mode, for boolean action outcomes (..., n_actions) """
+        return np.logical_and.reduceat(action_success, self.group_offsets, axis=-1).any(axis=-1)
+
+    def machinery_failure_probability(self, failure_rate):
+        """ Combined failure probability of the mode's engines, shape (...) for failure_rate (..., n_engines) """
+        rates = failure_rate[..., self.failure_engine_indices]
+        return 1 - np.prod(1 - rates, axis=-1)
+
+
+class FaultTreeModePlan(ModePlan):
+    """ Restoration scenarios of one mode compiled into a fault tree with AND/OR/k-of-n gates.
+
+    Here engine_indices and action_kinds list the distinct (engine, kind) events of the mode, each counted
+    once however many scenarios share it, and bdd evaluates the probability that some scenario succeeds
+    exactly. scenario_bdds hold each scenario on its own: scenarios sharing events are not independent, so
+    their probabilities describe the scenarios but do not multiply into the recovery probability. The
+    evaluation methods match ModePlan, with events in place of actions.
+    """
+    __slots__ = ("bdd", "scenario_bdds", "scalar_events")
+
+    def __init__(self, name, engine_indices, action_kinds, failure_engine_indices, failure_probability, bdd,
+                 scenario_bdds, scalar_events=()):
+        super().__init__(name, engine_indices, action_kinds, np.zeros(0, dtype=np.intp), failure_engine_indices,
+                         failure_probability)
+        self.bdd = bdd
+        self.scenario_bdds = scenario_bdds
+        self.scalar_events = scalar_events
+
+    @property
+    def n_scenarios(self):
+        return len(self.scenario_bdds)
+
+    def scenario_probabilities(self, action_probabilities):
+        shape = action_probabilities.shape[:-2] + (len(self.scenario_bdds),) + action_probabilities.shape[-1:]
+        scenario_probabilities = np.empty(shape)
+        for k, bdd in enumerate(self.scenario_bdds):
+            scenario_probabilities[..., k, :] = bdd.probability(action_probabilities)
+        return scenario_probabilities
+
+    def recovery_probability(self, action_probabilities):
+        return 1 - self.bdd.probability(action_probabilities)
+
+    def recovery_and_scenario_probabilities(self, action_probabilities):
+        return self.recovery_probability(action_probabilities), self.scenario_probabilities(action_probabilities)
+
+    def recovery_probability_and_gradient(self, action_probabilities):
+        p_restored, d_restored = self.bdd.probability_and_gradient(action_probabilities)
+        return 1 - p_restored, -d_restored
+
+    def recovery_probability_scalar(self, ttg):
+        ttg = float(ttg)
+        p_events = [0.0 if ttg <= start_time else factor * math.exp(-start_time / ttg)
+                    for start_time, factor in self.scalar_events]
+        return 1 - self.bdd.probability_scalar(p_events)
+
+    def restores(self, action_success):
+        return self.bdd.probability(np.swapaxes(action_success, -1, -2).astype(float)) > 0.5
+
+
+class EvaluationPlan:
+    """ Array-backed form of the engine and mode configuration, compiled once per RiskModel """
+    __slots__ = ("engine_names", "failure_rate", "start_time", "restart_probability", "modes", "mode_index")
+
+    def __init__(self, engine_names, failure_rate, start_time, restart_probability, modes):
+        self.engine_names = engine_names
+        self.failure_rate = failure_rate
+        self.start_time = start_time
+        self.restart_probability = restart_probability
+        self.modes = modes
+        self.mode_index = {mode.name: i for i, mode in enumerate(modes)}
+
+    def engine_recovery_probabilities(self, ttgs, start_time=None):
+        """ Recovery-time probability of every engine at every TTG, shape (..., n_engines, T) for 1-D ttgs """
+        if start_time is None:
+            start_time = self.start_time
+        return recovery_time_probability(ttgs, start_time[..., np.newaxis])
+
+    def mode_grounding_probability(self, ttgs, mode_index):
+        """ Grounding probability of a single mode at the configured engine parameters, shape (T,) """
+        mode = self.modes[mode_index]
+        engine_probabilities = self.engine_recovery_probabilities(np.asarray(ttgs, dtype=float))
+        p_actions = mode.action_probabilities(engine_probabilities, self.restart_probability)
+        return mode.failure_probability * mode.recovery_probability(p_actions)
+
+    def grounding_probability(self, ttgs, failure_rate=None, start_time=None, restart_probability=None):
+        """ Grounding probability of every mode at every TTG, shape (..., n_modes, T) for 1-D ttgs.
+
+        The engine parameters default to the configured ones; arrays with leading dimensions
+        (..., n_engines) evaluate several parameter sets at once.
+        """
+        if failure_rate is None:
+            failure_rate = self.failure_rate
+        if restart_probability is None:
+            restart_probability = self.restart_probability
+        ttgs = np.asarray(ttgs, dtype=float)
+        engine_probabilities = self.engine_recovery_probabilities(ttgs, start_time)
+        leading = np.broadcast_shapes(engine_probabilities.shape[:-2], failure_rate.shape[:-1],
+                                      restart_probability.shape[:-1])
+        p_grounding = np.empty(leading + (len(self.modes), ttgs.shape[-1]))
+        for i, mode in enumerate(self.modes):
+            p_actions = mode.action_probabilities(engine_probabilities, restart_probability)
+            p_failure = mode.machinery_failure_probability(failure_rate)
+            p_grounding[..., i, :] = np.asarray(p_failure)[..., np.newaxis] * mode.recovery_probability(p_actions)
+        return p_grounding
+
+
+def _uses_fault_tree_gates(mode_config):
+    """ True if a mode has OR operations or k-of-n gates, which only the fault-tree evaluation supports """
+    return any(scenario["operation"] == OR or isinstance(scenario["action"], list)
+               for scenario in mode_config["scenarios"])
+
+
+def _compile_sequential_mode(mode_config, engine_position, engine_map, failure_rate, start_time, restart_probability):
+    """ ModePlan of a mode whose scenarios are AND chains of independent actions """
+    engine_indices, action_kinds, group_offsets, failure_engine_indices = [], [], [], []
+    pending = []  # (engine index, kind) of the scenario being built
+    for scenario in mode_config["scenarios"]:
+        if isinstance(scenario["action"], list):
+            continue  # k-of-n gates need the fault-tree evaluation
+        kind, engine_label = parse_action(scenario["action"])
+        engine_index = engine_position.get(engine_map.get(engine_label))
+        if engine_index is None:
+            continue
+        failure_engine_indices.append(engine_index)
+
+        operation = scenario["operation"]
+        if operation not in (AND, TERMINATE):
+            continue
+        pending.append((engine_index, kind))
+        if operation == TERMINATE:
+            group_offsets.append(len(engine_indices))
+            for index, pending_kind in pending:
+                engine_indices.append(index)
+                action_kinds.append(pending_kind)
+            pending = []
+
+    failure_engine_indices = np.array(failure_engine_indices, dtype=np.intp)
+    scalar_terms = [(float(start_time[index]), float(restart_probability[index]) if kind == RESTART else 1.0)
+                    for index, kind in zip(engine_indices, action_kinds)]
+    scalar_scenarios = tuple(tuple(scalar_terms[begin:end])
+                             for begin, end in zip(group_offsets, group_offsets[1:] + [len(scalar_terms)]))
+    return ModePlan(
+        name=mode_config["mode_name"],
+        engine_indices=np.array(engine_indices, dtype=np.intp),
+        action_kinds=np.array(action_kinds, dtype=np.int8),
+        group_offsets=np.array(group_offsets, dtype=np.intp),
+        failure_engine_indices=failure_engine_indices,
+        failure_probability=float(1 - np.prod(1 - failure_rate[failure_engine_indices])),
+        scalar_scenarios=scalar_scenarios,
+    )
+
+
+def _compile_fault_tree_mode(mode_config, engine_position, engine_map, failure_rate, start_time, restart_probability):
+    """ FaultTreeModePlan of a mode; operations chain operands with AND binding tighter than OR """
+    events = {}  # (engine index, kind) -> event index, numbered in order of first use
+    failure_engine_indices = []
+
+    def event(action):
+        kind, engine_label = parse_action(action)
+        engine_index = engine_position.get(engine_map.get(engine_label))
+        if engine_index is None:
+            return None
+        failure_engine_indices.append(engine_index)
+        return events.setdefault((engine_index, kind), len(events))
+
+    scenarios, terms, operands = [], [], []
+    for scenario in mode_config["scenarios"]:
+        action = scenario["action"]
+        if isinstance(action, list):
+            members = [index for index in map(event, action) if index is not None]
+            if not members:
+                continue
+            operand = (int(scenario.get("k", len(members))), members)  # At least k of the actions
+        else:
+            operand = event(action)
+            if operand is None:
+                continue
+
+        operation = scenario["operation"]
+        if operation not in (AND, OR, TERMINATE):
+            continue
+        operands.append(operand)
+        if operation != AND:
+            terms.append(operands)
+            operands = []
+        if operation == TERMINATE:
+            scenarios.append(terms)
+            terms = []
+
+    failure_engine_indices = np.array(failure_engine_indices, dtype=np.intp)
+    event_engines = np.array([index for index, _ in events], dtype=np.intp)
+    event_kinds = np.array([kind for _, kind in events], dtype=np.int8)
+    scalar_events = tuple((float(start_time[index]), float(restart_probability[index]) if kind == RESTART else 1.0)
+                          for index, kind in events)
+    return FaultTreeModePlan(
+        name=mode_config["mode_name"],
+        engine_indices=event_engines,
+        action_kinds=event_kinds,
+        failure_engine_indices=failure_engine_indices,
+        failure_probability=float(1 - np.prod(1 - failure_rate[failure_engine_indices])),
+        bdd=build_restoration_bdd(scenarios, len(events)),
+        scenario_bdds=tuple(build_restoration_bdd([scenario], len(events)) for scenario in scenarios),
+        scalar_events=scalar_events,
+    )
+
+
+def compile_plan(engines, engine_map, modes, fault_tree=None):
+    """ Compiles the parsed engine and mode configuration of a RiskModel into an EvaluationPlan.
+
+    Actions whose engine is not configured are skipped, and actions after the last "Terminate" of a mode
+    do not form a scenario. Modes made of "AND"/"Terminate" chains can be evaluated with every action as an
+    independent event; "OR" operations and k-of-n gates (an entry whose "action" is a list of actions,
+    with "k" the number that must succeed) need a fault tree, in which the same start or restart of an
+    engine is a single event shared by all scenarios. Modes are compared with each other, so one semantics
+    applies to the whole plan: fault_tree=True compiles every mode into a fault tree, fault_tree=False
+    none (OR operations and k-of-n gates are then ignored), and the default None every mode as soon as
+    one of them has an OR operation or a k-of-n gate, and none otherwise.
+    """
+    engine_names = list(engines)
+    engine_position = {name: i for i, name in enumerate(engine_names)}
+    failure_rate = np.array([engines[name]["failure_rate"] for name in engine_names], dtype=float)
+    start_time = np.array([engines[name]["start_time"] for name in engine_names], dtype=float)
+    restart_probability = np.array([engines[name]["restart_probability"] for name in engine_names], dtype=float)
+
+    if fault_tree is None:
+        fault_tree = any(_uses_fault_tree_gates(mode_config) for mode_config in modes)
+    compile_mode = _compile_fault_tree_mode if fault_tree else _compile_sequential_mode
+    mode_plans = []
+    for mode_config in modes:
+        mode_plans.append(compile_mode(mode_config, engine_position, engine_map, failure_rate, start_time,
+                                       restart_probability))
+
+    return EvaluationPlan(engine_names, failure_rate, start_time, restart_probability, mode_plans)
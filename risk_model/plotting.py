@@ -0,0 +1,202 @@
+import numpy as np
+
+# Pixel columns assumed when the width of the axes is unknown, e.g. before the figure is shown
+DEFAULT_WIDTH = 1600
+
+
+def _pyplot():
+    """ matplotlib.pyplot, imported on first use so the package works without matplotlib """
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def axes_width(ax):
+    """ Width of the axes in pixels, the resolution decimation has to preserve """
+    width = ax.get_window_extent().width
+    return int(width) if np.isfinite(width) and width >= 1 else DEFAULT_WIDTH
+
+
+def decimate_minmax(x, y, n_bins):
+    """ Indices of the points to draw from a profile sorted by x, at most 2 * n_bins + 2 of them.
+
+    The x range is split into n_bins equal columns and the first minimum and maximum of y in every column
+    are kept, in x order, together with the first and last point. Drawn at n_bins pixels wide, the line
+    covers exactly the pixels of the full profile, so peaks and mode-switch dips are never lost.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(x)
+    if n <= 2 * n_bins + 2:
+        return np.arange(n)
+    edges = np.searchsorted(x, np.linspace(x[0], x[-1], n_bins + 1)[1:-1], side="left")
+    edges = np.unique(np.concatenate([[0], edges, [n]]))
+    indices = [[0]]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        column = y[start:stop]
+        low, high = start + int(np.argmin(column)), start + int(np.argmax(column))
+        indices.append((low, high) if low <= high else (high, low))
+    indices.append([n - 1])
+    return np.unique(np.concatenate(indices))
+
+
+def decimate_lttb(x, y, n_out):
+    """ Indices of n_out points of a profile sorted by x, chosen by Largest-Triangle-Three-Buckets.
+
+    The inner points are split into n_out - 2 buckets of equal count and from every bucket the point
+    forming the largest triangle with the previously kept point and the mean of the next bucket is kept.
+    The result follows the visual shape closely with fewer points than decimate_minmax, but single-sample
+    extremes are not guaranteed to survive.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following = slice(stop, edges[bucket + 2]) if bucket + 2 < len(edges) else slice(n - 1, n)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        # Twice the triangle areas, the factor does not change the argmax
+        areas = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous]) -
+                       (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def decimate(x, y, width, method="minmax"):
+    """ Indices of the points worth drawing at width pixels, with method "minmax" or "lttb" """
+    if method == "minmax":
+        return decimate_minmax(x, y, width)
+    if method == "lttb":
+        return decimate_lttb(x, y, 2 * width)
+    raise ValueError(f"Unknown decimation method '{method}', expected 'minmax' or 'lttb'")
+
+
+def mode_spans(schedule, x_min, x_max):
+    """ (start, end, mode name) of the pieces of a breakpoint table (ModeSchedule.rows()) within [x_min, x_max] """
+    return [(max(ttg_from, x_min), min(ttg_to, x_max), mode) for ttg_from, ttg_to, mode in schedule
+            if ttg_to > x_min and ttg_from < x_max]
+
+
+def mode_runs(x, mode_indices, mode_names):
+    """ (start, end, mode name) of every run of the same mode along a profile, split halfway between samples """
+    x, mode_indices = np.asarray(x, dtype=float), np.asarray(mode_indices)
+    if len(x) == 0:
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(mode_indices[1:] != mode_indices[:-1]) + 1])
+    bounds = np.concatenate([x[:1], (x[starts[1:]] + x[starts[1:] - 1]) / 2, x[-1:]])
+    return [(bounds[i], bounds[i + 1], mode_names[mode_indices[start]]) for i, start in enumerate(starts)]
+
+
+def shade_modes(ax, spans, mode_names, alpha=0.15):
+    """ Shades every span in its mode's color and adds a legend with one entry per mode; returns the patches """
+    colors = {mode: f"C{(index + 1) % 10}" for index, mode in enumerate(mode_names)}  # C0 is left for the line
+    patches = [ax.axvspan(start, end, alpha=alpha, color=colors.get(mode, "grey"), label=mode, linewidth=0)
+               for start, end, mode in spans]
+    if patches:
+        handles = {patch.get_label(): patch for patch in patches}
+        ax.legend(handles=list(handles.values()), loc="upper right")
+    return patches
+
+
+def plot_risk_profile(ttgs, risks, ax=None, schedule=None, mode_indices=None, mode_names=None, width=None,
+                      method="minmax"):
+    """ Plots a risk profile decimated to the pixel width of the axes, shading the optimal-mode regions.
+
+    The regions come from the mode breakpoint table schedule (model.mode_schedule().rows()) or, without
+    one, from the runs of mode_indices (indices into mode_names, e.g. from select_mso_mode_batch). Only
+    the decimated points reach matplotlib, so profiles of 10^7 points draw as fast as short ones.
+    ttgs must be sorted. Returns the Line2D of the profile.
+    """
+    ttgs, risks = np.asarray(ttgs, dtype=float), np.asarray(risks, dtype=float)
+    if ax is None:
+        ax = _pyplot().gca()
+    keep = decimate(ttgs, risks, width or axes_width(ax), method)
+    line, = ax.plot(ttgs[keep], risks[keep], color="C0")
+    if len(ttgs):
+        if schedule is not None:
+            mode_names = mode_names or list(dict.fromkeys(mode for _, _, mode in schedule))
+            shade_modes(ax, mode_spans(schedule, ttgs[0], ttgs[-1]), mode_names)
+        elif mode_indices is not None:
+            mode_names = mode_names or [str(mode) for mode in range(int(np.max(mode_indices)) + 1)]
+            shade_modes(ax, mode_runs(ttgs, mode_indices, mode_names), mode_names)
+    ax.set_xlabel("TTG (seconds)")
+    ax.set_ylabel("Risk")
+    return line
+
+
+class LiveRiskPlot:
+    """ Risk profile drawn while it is being computed or streamed, in memory bounded by the axes width.
+
+    extend() appends chunks of (x, risk) samples in increasing x order and, with mode_indices, extends
+    the shaded mode runs. The plot keeps a min/max summary of at most 4 * width points: every chunk is
+    reduced to the extremes of width columns of its own x range and, when the summary grows past the
+    bound, the summary is decimated again over the whole range, which keeps every column's extremes.
+    replace() starts over with a new profile, e.g. after a parameter change. draw() pushes the summary
+    into the existing line and spans and asks the canvas for an idle redraw, so the streaming loop never
+    waits for rendering.
+    """
+
+    def __init__(self, ax=None, mode_names=(), width=None):
+        self.ax = _pyplot().gca() if ax is None else ax
+        self.mode_names = list(mode_names)
+        self.width = width or axes_width(self.ax)
+        self.n_samples = 0  # Samples received since the last replace(), not only the ones kept
+        self.line, = self.ax.plot([], [], color="C0")
+        self.ax.set_xlabel("TTG (seconds)")
+        self.ax.set_ylabel("Risk")
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._runs = []  # [start, end, mode index] of the mode runs so far
+        self._patches = []
+
+    def __len__(self):
+        return len(self._x)
+
+    def replace(self, x=(), risks=(), mode_indices=None):
+        """ Discards the current profile and starts a new one with the given samples """
+        self._x, self._y, self._runs, self.n_samples = np.empty(0), np.empty(0), [], 0
+        self.extend(x, risks, mode_indices)
+
+    def extend(self, x, risks, mode_indices=None):
+        """ Appends samples that continue the profile in increasing x """
+        x, risks = np.ravel(np.asarray(x, dtype=float)), np.ravel(np.asarray(risks, dtype=float))
+        if len(x) != len(risks):
+            raise ValueError("x and risks must have the same length")
+        if len(x) == 0:
+            return
+        if len(self._x) and x[0] < self._x[-1]:
+            raise ValueError("Samples must continue the profile in increasing x")
+        if mode_indices is not None:
+            self._extend_runs(x, np.ravel(mode_indices))
+        self.n_samples += len(x)
+        keep = decimate_minmax(x, risks, self.width)
+        self._x = np.concatenate([self._x, x[keep]])
+        self._y = np.concatenate([self._y, risks[keep]])
+        if len(self._x) > 4 * self.width:
+            keep = decimate_minmax(self._x, self._y, self.width)
+            self._x, self._y = self._x[keep], self._y[keep]
+
+    def _extend_runs(self, x, mode_indices):
+        for start, end, mode in mode_runs(x, mode_indices, range(max(mode_indices.max() + 1, 1))):
+            if self._runs and self._runs[-1][2] == mode:
+                self._runs[-1][1] = end
+            else:
+                if self._runs:  # The previous run ends halfway to the first sample of the new one
+                    self._runs[-1][1] = start = (self._runs[-1][1] + start) / 2
+                self._runs.append([start, end, mode])
+
+    def draw(self):
+        """ Updates the line and the mode shading from the summary and requests a redraw of the canvas """
+        self.line.set_data(self._x, self._y)
+        for patch in self._patches:
+            patch.remove()
+        names = self.mode_names
+        spans = [(start, end, names[mode] if mode < len(names) else str(mode)) for start, end, mode in self._runs]
+        self._patches = shade_modes(self.ax, spans, names)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax.figure.canvas.draw_idle()
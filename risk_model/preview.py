@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from .risk_model import RiskModel
+
+
+class PreviewResult:
+    """ Risk-vs-TTG curve of one configuration, or the error that kept it from being built.
+
+    complete is False for the coarse curve published before the full-resolution one. schedule holds the
+    mode breakpoint table as ModeSchedule.rows(), (ttg_from, ttg_to, mode_name) with ttg_from exclusive.
+    """
+    __slots__ = ("generation", "ttgs", "mode_indices", "risks", "mode_names", "schedule", "complete", "error")
+
+    def __init__(self, generation, ttgs=None, mode_indices=None, risks=None, mode_names=(), schedule=(),
+                 complete=True, error=None):
+        self.generation = generation
+        self.ttgs = ttgs
+        self.mode_indices = mode_indices
+        self.risks = risks
+        self.mode_names = list(mode_names)
+        self.schedule = list(schedule)
+        self.complete = complete
+        self.error = error
+
+
+class PreviewWorker:
+    """ Computes risk previews of configuration dicts on a background thread, for interactive editors.
+
+    submit() only records the newest configuration and returns at once. The worker waits until no new
+    configuration arrived for delay seconds (debouncing), compiles the model, and evaluates
+    select_mso_mode_batch on n_points TTGs in [0, ttg_max]: first every coarse_stride-th point, published
+    as an incomplete result, then the rest in chunks of chunk_size. A submission during the computation
+    cancels it at the next chunk, so only the newest configuration is ever finished. Results are queued
+    for poll(), which a GUI calls from its own event loop (e.g. Tk's after()), and passed to on_result
+    on the worker thread if given.
+    """
+
+    def __init__(self, ttg_max=600.0, n_points=2000, delay=0.25, coarse_stride=16, chunk_size=4096,
+                 fault_tree=None, on_result=None):
+        self.ttg_max = ttg_max
+        self.n_points = n_points
+        self.delay = delay
+        self.coarse_stride = coarse_stride
+        self.chunk_size = chunk_size
+        self.fault_tree = fault_tree
+        self.on_result = on_result  # Called as on_result(result) on the worker thread
+        self.n_computed = 0  # Configurations whose preview was finished, for checking the debouncing
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._pending = None
+        self._submitted_at = 0.0
+        self._closed = False
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="PreviewWorker", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def generation(self):
+        """ Number of configurations submitted so far; results carry the generation they belong to """
+        return self._generation
+
+    def submit(self, config):
+        """ Schedules a preview of config, superseding any pending or running one; returns its generation """
+        with self._condition:
+            self._generation += 1
+            self._pending = config
+            self._submitted_at = time.monotonic()
+            self._condition.notify()
+            return self._generation
+
+    def poll(self):
+        """ Newest queued result of the current generation without blocking, or None; older ones are dropped """
+        latest = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if result.generation == self._generation:
+                latest = result
+        return latest
+
+    def close(self):
+        """ Cancels any computation and stops the worker thread """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _next(self):
+        """ Blocks until a configuration has been left unchanged for delay seconds; None once closed """
+        with self._condition:
+            while not self._closed:
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._submitted_at + self.delay - time.monotonic()
+                if remaining <= 0:
+                    config, self._pending = self._pending, None
+                    return config, self._generation
+                self._condition.wait(remaining)
+        return None
+
+    def _run(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            self._compute(*task)
+
+    def _cancelled(self, generation):
+        return self._closed or self._generation != generation
+
+    def _publish(self, result):
+        self._results.put(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def _compute(self, config, generation):
+        try:
+            model = RiskModel.from_config(config, self.fault_tree)
+            schedule = model.mode_schedule().rows()
+        except Exception as error:  # Half-filled forms are expected while editing
+            self._publish(PreviewResult(generation, error=error))
+            return
+        ttgs = np.linspace(0.0, self.ttg_max, self.n_points)
+        mode_indices = np.zeros(len(ttgs), dtype=np.intp)
+        risks = np.zeros(len(ttgs))
+
+        coarse = np.zeros(len(ttgs), dtype=bool)
+        coarse[::self.coarse_stride] = True
+        coarse[-1:] = True
+        mode_indices[coarse], risks[coarse] = model.select_mso_mode_batch(ttgs[coarse])
+        if self._cancelled(generation):
+            return
+        self._publish(PreviewResult(generation, ttgs[coarse], mode_indices[coarse], risks[coarse], model.mode_names,
+                                    schedule, complete=False))
+
+        rest = np.flatnonzero(~coarse)
+        for start in range(0, len(rest), self.chunk_size):
+            if self._cancelled(generation):
+                return
+            chunk = rest[start:start + self.chunk_size]
+            mode_indices[chunk], risks[chunk] = model.select_mso_mode_batch(ttgs[chunk])
+        if self._cancelled(generation):
+            return
+        self.n_computed += 1
+        self._publish(PreviewResult(generation, ttgs, mode_indices, risks, model.mode_names, schedule))
@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Default tile: 4096 cells, small enough for the evaluator's buffers to stay in cache, in short row bands
+TILE_SHAPE = (4, 1024)
+
+
+def raster_tiles(shape, tile_shape=TILE_SHAPE):
+    """ (row slice, column slice) of every tile of a 2-D raster, row by row; edge tiles may be smaller """
+    rows, columns = shape
+    tile_rows, tile_columns = tile_shape
+    return [(slice(row, min(row + tile_rows, rows)), slice(column, min(column + tile_columns, columns)))
+            for row in range(0, rows, tile_rows) for column in range(0, columns, tile_columns)]
+
+
+def _evaluate_tiles(model, ttgs, mask, out_risk, out_mode, tiles, tile_size):
+    """ Evaluates tiles with one RealtimeEvaluator and scratch buffers of its own, writing into the outputs """
+    evaluator = model.realtime_evaluator(tile_size)
+    buffer = np.empty(tile_size)
+    risk, mode = evaluator.allocate_outputs()
+    invalid = np.empty(tile_size, dtype=bool)
+    for rows, columns in tiles:
+        shape = (rows.stop - rows.start, columns.stop - columns.start)
+        n = shape[0] * shape[1]
+        np.copyto(buffer[:n].reshape(shape), ttgs[rows, columns], casting="same_kind")
+        if n < tile_size:
+            buffer[n:] = 0.0  # Padding of edge tiles, evaluated and dropped
+        evaluator.evaluate(buffer, risk, mode)
+
+        cells = invalid[:n].reshape(shape)
+        np.isnan(buffer[:n].reshape(shape), out=cells)
+        if mask is not None:
+            np.logical_or(cells, mask[rows, columns], out=cells)
+        tile_risk, tile_mode = out_risk[rows, columns], out_mode[rows, columns]
+        np.copyto(tile_risk, risk[:n].reshape(shape), casting="same_kind")
+        np.copyto(tile_mode, mode[:n].reshape(shape), casting="unsafe")
+        if cells.any():
+            np.copyto(tile_risk, np.nan, where=cells)
+            np.copyto(tile_mode, -1, where=cells)
+
+
+def evaluate_raster(model, ttgs, mask=None, out_risk=None, out_mode=None, tile_shape=TILE_SHAPE, n_workers=None):
+    """ Optimal mode index and its risk for every cell of a 2-D TTG raster, computed tile by tile.
+
+    ttgs may be any 2-D array, including a memory map (np.load(path, mmap_mode="r")), which is only read one
+    tile at a time. Cells where mask is True (e.g. land) or the TTG is NaN get risk NaN and mode -1.
+    out_risk (float) and out_mode (signed integer) may be preallocated arrays or memory maps of the raster
+    shape; by default float64 and int16 arrays are allocated. Tiles are spread over n_workers threads
+    (os.cpu_count() by default), each with its own RealtimeEvaluator, so the per-tile work reuses the
+    same buffers and NumPy runs the tiles in parallel outside the GIL. Returns (out_risk, out_mode).
+
+    Modes are chosen by comparing the exact risk of every mode, so they can differ from select_mso_mode
+    within the bisection tolerance of its schedule around a crossing.
+    """
+    if np.ndim(ttgs) != 2:
+        raise ValueError(f"ttgs must be a 2-D raster, found shape {np.shape(ttgs)}")
+    shape = ttgs.shape
+    if mask is not None and np.shape(mask) != shape:
+        raise ValueError(f"mask must have the raster shape {shape}")
+    if out_risk is None:
+        out_risk = np.empty(shape)
+    if out_mode is None:
+        out_mode = np.empty(shape, dtype=np.int16)
+    if out_risk.shape != shape or out_mode.shape != shape:
+        raise ValueError(f"out_risk and out_mode must have the raster shape {shape}")
+
+    tiles = raster_tiles(shape, tile_shape)
+    tile_size = min(tile_shape[0], shape[0]) * min(tile_shape[1], shape[1])
+    if not tiles or tile_size == 0:
+        return out_risk, out_mode
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tiles))
+    if n_workers == 1:
+        _evaluate_tiles(model, ttgs, mask, out_risk, out_mode, tiles, tile_size)
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(_evaluate_tiles, model, ttgs, mask, out_risk, out_mode, tiles[worker::n_workers],
+                                       tile_size)
+                       for worker in range(n_workers)]
+            for future in futures:
+                future.result()
+    return out_risk, out_mode
@@ -0,0 +1,176 @@
+import time
+
+import numpy as np
+
+from .plan import FaultTreeModePlan, RESTART
+
+_CHECKPOINT = (None, None, None, None)  # Program entry marking the end of a mode, where the deadline is checked
+
+
+class RealtimeEvaluator:
+    """ Optimal mode and risk at a fixed number of waypoints, without allocating on the steady-state path.
+
+    The model is compiled into a flat program of NumPy ufunc calls over preallocated rows of equal shape:
+    no broadcasting, casting or fancy indexing, so every call reuses the same buffers and creates no arrays.
+    evaluate() writes into caller-provided arrays (see allocate_outputs) and is meant for control loops with
+    a hard budget per tick. When budget seconds are exceeded, checked after every mode, it stops and writes
+    the fallback instead: the outputs of the last call that finished ("last"), or before any did, the
+    conservative answer of the mode with the lowest no-recovery risk and that risk as an upper bound.
+    """
+
+    def __init__(self, model, n_waypoints, budget=None, fallback="last"):
+        if fallback not in ("last", "conservative"):
+            raise ValueError("fallback must be 'last' or 'conservative'")
+        plan = model.plan
+        self.mode_names = list(model.mode_names)
+        self.n_waypoints = n_waypoints
+        self.budget = budget
+        self.fallback = fallback
+        cost = model._grounding_cost() * 1000
+        n_modes = len(plan.modes)
+
+        self._constants = {}
+        self._tiny = self._constant(1e-300)  # Floor of the TTG, small enough to act as zero yet keep s / ttg finite
+        self._safe_ttgs = np.empty(n_waypoints)
+        self._risks = np.empty((n_modes, n_waypoints))
+        self._rows = list(self._risks)
+        self._less = np.empty(n_waypoints, dtype=bool)
+        self._mode_constants = [np.array(m, dtype=np.intp) for m in range(n_modes)]
+        self._last_risk = np.empty(n_waypoints)
+        self._last_mode = np.zeros(n_waypoints, dtype=np.intp)
+        self._has_last = False
+        # (calls, deadline misses), bumped by adding unit vectors: length-1 arrays take a NumPy path that allocates
+        self._stats = np.zeros(2, dtype=np.int64)
+        self._count_call, self._count_miss = np.array([1, 0]), np.array([0, 1])
+
+        scales = np.array([mode.failure_probability * cost for mode in plan.modes])
+        self._conservative_mode = self._mode_constants[int(np.argmin(scales))] if n_modes else None
+        self._conservative_risk = np.array(scales.min() if n_modes else 0.0)
+
+        # Engine recovery-time probabilities q_e = exp(-s_e / ttg) * (ttg > s_e), one row per engine
+        program, engine_rows = [], []
+        for start_time in plan.start_time:
+            q, step = np.empty(n_waypoints), np.empty(n_waypoints)
+            program += [(np.subtract, None, self._constant(start_time), step),  # None is the TTG input
+                        (np.heaviside, step, self._constant(0.0), step),
+                        (np.divide, self._constant(-start_time), self._safe_ttgs, q),
+                        (np.exp, q, None, q),
+                        (np.multiply, q, step, q)]
+            engine_rows.append(q)
+
+        for m, mode in enumerate(plan.modes):
+            # Success probability of every action (or fault-tree event); start actions reuse the engine row
+            action_rows = []
+            for engine, kind in zip(mode.engine_indices, mode.action_kinds):
+                if kind == RESTART and plan.restart_probability[engine] != 1:
+                    row = np.empty(n_waypoints)
+                    program.append((np.multiply, engine_rows[engine], self._constant(plan.restart_probability[engine]),
+                                    row))
+                    action_rows.append(row)
+                else:
+                    action_rows.append(engine_rows[engine])
+            if isinstance(mode, FaultTreeModePlan):
+                constant = self._compile_fault_tree(mode, action_rows, self._rows[m], program)
+            else:
+                constant = self._compile_scenarios(mode, action_rows, self._rows[m], program)
+            if constant is None:
+                program.append((np.multiply, self._rows[m], self._constant(mode.failure_probability * cost),
+                                self._rows[m]))
+            else:
+                self._rows[m][...] = constant * mode.failure_probability * cost  # Same at every TTG
+            program.append(_CHECKPOINT)
+        self._program = program
+
+    def _constant(self, value):
+        """ Shared 0-d array of a constant, so ufunc calls need no scalar conversion """
+        value = float(value)
+        if value not in self._constants:
+            self._constants[value] = np.array(value)
+        return self._constants[value]
+
+    def _compile_scenarios(self, mode, action_rows, out, program):
+        """ Appends prod_k (1 - prod(actions of scenario k)) into out, returns the value if it is constant """
+        if mode.n_scenarios == 0:
+            return 1.0
+        bounds = list(mode.group_offsets) + [mode.n_actions]
+        one = self._constant(1.0)
+        for k, (begin, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            rows = action_rows[begin:end]
+            scenario = rows[0]
+            if len(rows) > 1:
+                scenario = np.empty(self.n_waypoints)
+                program.append((np.multiply, rows[0], rows[1], scenario))
+                program += [(np.multiply, scenario, row, scenario) for row in rows[2:]]
+            if k == 0:
+                program.append((np.subtract, one, scenario, out))
+            else:
+                failed = np.empty(self.n_waypoints)
+                program += [(np.subtract, one, scenario, failed), (np.multiply, out, failed, out)]
+        return None
+
+    def _compile_fault_tree(self, mode, event_rows, out, program):
+        """ Appends 1 - P(fault tree holds) into out, one row per diagram node, returns the value if constant """
+        bdd = mode.bdd
+        if bdd.root < 2:
+            return 1.0 - bdd.root
+        values = [np.zeros(self.n_waypoints), np.ones(self.n_waypoints)]
+        for var, low, high in zip(bdd.node_var[2:], bdd.node_low[2:], bdd.node_high[2:]):
+            row = np.empty(self.n_waypoints)
+            program += [(np.subtract, values[high], values[low], row),
+                        (np.multiply, row, event_rows[var], row),
+                        (np.add, row, values[low], row)]
+            values.append(row)
+        program.append((np.subtract, self._constant(1.0), values[bdd.root], out))
+        return None
+
+    def allocate_outputs(self):
+        """ Output arrays of the right shape and dtype for evaluate: (out_risk, out_mode) """
+        return np.empty(self.n_waypoints), np.empty(self.n_waypoints, dtype=np.intp)
+
+    @property
+    def n_calls(self):
+        return int(self._stats[0])
+
+    @property
+    def n_deadline_misses(self):
+        return int(self._stats[1])
+
+    def evaluate(self, ttgs, out_risk, out_mode):
+        """ Writes the optimal mode index and its risk at every TTG into out_mode and out_risk.
+
+        ttgs, out_risk and out_mode must be float64, float64 and intp arrays of shape (n_waypoints,).
+        Returns True if the result was computed, False if the deadline passed and the fallback was written.
+        """
+        began = time.perf_counter()
+        np.add(self._stats, self._count_call, out=self._stats)
+        np.maximum(ttgs, self._tiny, out=self._safe_ttgs)
+        for ufunc, x, y, out in self._program:
+            if ufunc is None:
+                if self.budget is not None and time.perf_counter() - began > self.budget:
+                    self._write_fallback(out_risk, out_mode)
+                    return False
+            elif y is None:
+                ufunc(x, out=out)
+            else:
+                ufunc(ttgs if x is None else x, y, out=out)
+
+        rows = self._rows
+        np.positive(rows[0], out=out_risk)
+        out_mode.fill(0)
+        for m in range(1, len(rows)):
+            np.less(rows[m], out_risk, out=self._less)
+            np.copyto(out_mode, self._mode_constants[m], where=self._less)
+            np.minimum(out_risk, rows[m], out=out_risk)
+        np.positive(out_risk, out=self._last_risk)
+        np.positive(out_mode, out=self._last_mode)
+        self._has_last = True
+        return True
+
+    def _write_fallback(self, out_risk, out_mode):
+        np.add(self._stats, self._count_miss, out=self._stats)
+        if self.fallback == "last" and self._has_last:
+            np.positive(self._last_risk, out=out_risk)
+            np.positive(self._last_mode, out=out_mode)
+        else:
+            np.copyto(out_risk, self._conservative_risk)
+            np.copyto(out_mode, self._conservative_mode)
@@ -0,0 +1,152 @@
+import collections
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from .risk_model import RiskModel
+
+
+class _Watched:
+    """ Config file of a path: its stat signature when last read and the digest of its content """
+    __slots__ = ("signature", "digest")
+
+    def __init__(self, signature, digest):
+        self.signature = signature
+        self.digest = digest
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RiskModelRegistry:
+    """ Compiled RiskModels of many config files, reloaded when the files change.
+
+    Models are cached by the SHA-256 of their config content, so paths with identical configs share one
+    model, in LRU order bounded by max_models and, if given, max_bytes (estimated from the pickled model).
+    A reload compiles the new model (and its mode schedule) before publishing it with a single reference
+    swap: get() keeps returning the previous model until then, and callers holding it finish their
+    evaluations undisturbed. A config that fails to load leaves the previous model in place and is
+    reported in errors and to on_error. Changes are picked up by check(), or every poll_interval seconds
+    once start_watching() runs it on a background thread.
+    """
+
+    def __init__(self, max_models=64, max_bytes=None, poll_interval=1.0, fault_tree=None, on_reload=None,
+                 on_error=None):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.fault_tree = fault_tree
+        self.on_reload = on_reload  # Called as on_reload(path, model) after a changed config is swapped in
+        self.on_error = on_error  # Called as on_error(path, exception) when a config cannot be loaded
+        self.errors = {}  # path -> last load exception
+        self._lock = threading.Lock()
+        self._models = collections.OrderedDict()  # digest -> (model, size), least recently used first
+        self._bytes = 0
+        self._watched = {}  # absolute path -> _Watched
+        self._stats = collections.Counter()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_watching()
+
+    def get(self, path):
+        """ The current model of a config path, loading it on first use """
+        path = os.path.abspath(path)
+        with self._lock:
+            watched = self._watched.get(path)
+            cached = self._models.get(watched.digest) if watched is not None else None
+            if cached is not None:
+                self._models.move_to_end(watched.digest)
+                self._stats["hits"] += 1
+                return cached[0]
+            self._stats["misses"] += 1
+        return self._load(path)
+
+    def _load(self, path):
+        """ Reads a config, compiles it unless its content is cached, and publishes it for the path """
+        signature = _signature(path)
+        with open(path, "rb") as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            cached = self._models.get(digest)
+        if cached is None:
+            model = RiskModel.from_config(json.loads(content), self.fault_tree)
+            model.mode_schedule()  # Built before publishing, so the first evaluation does not pay for it
+            cached = (model, len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)))
+            self._stats["loads"] += 1
+        with self._lock:
+            if digest in self._models:
+                cached = self._models[digest]  # Another thread compiled the same content first
+                self._models.move_to_end(digest)
+            else:
+                self._models[digest] = cached
+                self._bytes += cached[1]
+            self._watched[path] = _Watched(signature, digest)
+            self._evict()
+        self.errors.pop(path, None)
+        return cached[0]
+
+    def _evict(self):
+        """ Drops least recently used models beyond the bounds, always keeping the newest one """
+        while len(self._models) > 1 and (len(self._models) > self.max_models or
+                                         (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            _, (_, size) = self._models.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+
+    def check(self):
+        """ Reloads every watched config whose file changed, returning the reloaded paths """
+        with self._lock:
+            watched = list(self._watched.items())
+        reloaded = []
+        for path, entry in watched:
+            try:
+                if _signature(path) == entry.signature:
+                    continue
+                previous = entry.digest
+                model = self._load(path)
+            except Exception as error:
+                self.errors[path] = error
+                self._stats["errors"] += 1
+                if self.on_error is not None:
+                    self.on_error(path, error)
+                continue
+            if self._watched[path].digest != previous:  # Not just touched
+                self._stats["reloads"] += 1
+                reloaded.append(path)
+                if self.on_reload is not None:
+                    self.on_reload(path, model)
+        return reloaded
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start_watching(self):
+        """ Runs check() every poll_interval seconds on a daemon thread """
+        if self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="RiskModelRegistry watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self):
+        """ Counters (hits, misses, loads, reloads, evictions, errors) with the cache occupancy """
+        with self._lock:
+            names = ("hits", "misses", "loads", "reloads", "evictions", "errors")
+            counters = {name: self._stats[name] for name in names}
+            return {**counters, "models": len(self._models), "bytes": self._bytes, "watched": len(self._watched)}
@@ -1,20 +1,44 @@
 import json
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 
+from .plan import compile_plan, recovery_time_probability
+from .decomposition import decompose_risk
+from .gradients import compute_risk_gradients
+from .instrumentation import METHODS, Instrumentation, profile
+from .lut import RiskLUT
+from .realtime import RealtimeEvaluator
+from .schedule import compute_mode_schedule
+from .streaming import stream_risk
 
-class RiskModel:
-    def __init__(self, config_filename="ship_config.json"):
-        # Get the path to the JSON file relative to this module
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(base_dir, "data", config_filename)
+
+def config_path(config_filename):
+    """ Path of a config file; relative names are looked up in the package's data directory """
+    # Get the path to the JSON file relative to this module
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "data", config_filename)
 
 
+class RiskModel:
+    def __init__(self, config_filename="ship_config.json", fault_tree=None):
         # Load configuration from JSON file
-        with open(config_path, 'r') as file:
+        with open(config_path(config_filename), 'r') as file:
             config = json.load(file)
-        
+        self._load_config(config, fault_tree)
+
+    @classmethod
+    def from_config(cls, config, fault_tree=None):
+        """ Builds a model from an already parsed configuration dict (same layout as ship_config.json) """
+        model = cls.__new__(cls)
+        model._load_config(config, fault_tree)
+        return model
+
+    def _load_config(self, config, fault_tree=None):
+        """ Parses the configuration dict and compiles the evaluation plan.
+
+        fault_tree selects the scenario evaluation of all modes, see compile_plan: None uses the fault tree
+        if any mode has "OR" operations or k-of-n gates, True always and False never.
+        """
         # Ship configuration
         ship_config = config["ship_configuration"]
         self.ship_model = ship_config["ship_model"]
@@ -25,6 +49,7 @@ class RiskModel:
         # Grounding costs
         grounding_cost = config["grouding_cost"]
         self.cost_ship = float(grounding_cost["ship_damage"])
+        self.cost_recovery = float(grounding_cost.get("recovery", 0))  # Older configs have no recovery cost
         self.cost_environment = float(grounding_cost["environment"])
         self.cost_cargo = float(grounding_cost["cargo"])
         self.cost_infrastructure = float(grounding_cost["infrastructure"])
@@ -45,6 +70,12 @@ class RiskModel:
 
         # Machinery modes and scenarios
         self.modes = config["modes"]
+        self.mode_names = [mode["mode_name"] for mode in self.modes]
+
+        # Compile the modes into arrays once, so evaluation does no string handling
+        self.plan = compile_plan(self.engines, self.engine_map, self.modes, fault_tree)
+        self._mode_schedule = None  # Built on first use by mode_schedule()
+        self.instrumentation = None  # Set by enable_instrumentation()
 
     def compute_grounding_probability(self, ttg, mode):
         """ Computes the probability of grounding at a given waypoint for a particular mode """
@@ -62,66 +93,17 @@ class RiskModel:
     
     def compute_machinery_failure_probability(self, mode):
         """ Compute the probability of machinery failure for the given MSO mode """
-        mode_config = next((m for m in self.modes if m["mode_name"] == mode), None)
-        if not mode_config:
+        mode_index = self.plan.mode_index.get(mode)
+        if mode_index is None:
             return 0
-
-        failure_rates = []
-        for scenario in mode_config["scenarios"]:
-            action = scenario["action"]
-            engine_name = action.split(" ", 1)[-1]  # Extract "Engine 1", "Engine 2", etc.
-            mapped_engine_name = self.engine_map.get(engine_name)  # Map to actual engine name
-            if mapped_engine_name:
-                failure_rate = self.engines.get(mapped_engine_name, {}).get("failure_rate", 0)
-                failure_rates.append(failure_rate)
-
-
-    
-    
-        combined_failure_probability = 1 - np.prod([1 - rate for rate in failure_rates])
-        return combined_failure_probability
+        return self.plan.modes[mode_index].failure_probability
     
     def compute_recovery_probability(self, ttg, mode):
         """ Compute probability of recovery based on scenarios in the JSON configuration """
-        mode_config = next((m for m in self.modes if m["mode_name"] == mode), None)
-        if not mode_config:
+        mode_index = self.plan.mode_index.get(mode)
+        if mode_index is None:
             return 1  # Default to full recovery probability if mode is not found
-
-        # List to store probabilities of each restoration process within the mode
-        scenario_probabilities = []
-        temp_probability = 1  # Track combined probability for current scenario group
-
-        for scenario in mode_config["scenarios"]:
-            action = scenario["action"]
-            operation = scenario["operation"]
-            engine_name = action.split(" ", 1)[-1]
-            
-            # Map engine number to actual engine name
-            mapped_engine_name = self.engine_map.get(engine_name)
-            engine_data = self.engines.get(mapped_engine_name)
-            if not engine_data:
-                continue
-
-            # Compute probability of this action
-            # Distinguish between "start" and "restart" actions
-            if "start" in action.lower():
-                # Start actions assume a probability of 1
-                p_action = self._recovery_time_probability(ttg, engine_data["start_time"])
-            elif "restart" in action.lower():
-                # Restart actions include the restart probability
-                p_action = engine_data["restart_probability"] * self._recovery_time_probability(ttg, engine_data["start_time"])
-
-            if operation == "AND":
-                temp_probability *= p_action  # Sequential "AND" multiplies probabilities
-            elif operation == "Terminate":
-                temp_probability *= p_action  # Final action before termination
-                scenario_probabilities.append(temp_probability)  # Save this scenario's total probability
-                temp_probability = 1  # Reset for next scenario
-
-        # Compute total probability for the mode by combining all scenario probabilities
-        total_recovery_probability = np.prod([1 - p for p in scenario_probabilities])
-        # print(f'operation: {operation}, engine_data: {engine_data}, p_action {p_action} probability: {temp_probability}')
-        return total_recovery_probability
+        return self.plan.modes[mode_index].recovery_probability_scalar(ttg)
 
 
     def _recovery_time_probability(self, ttg, recovery_time):
@@ -130,14 +112,130 @@ class RiskModel:
             return 0  # No time to recover
         return np.exp(-recovery_time / ttg)
 
+    def _recovery_time_probability_batch(self, ttgs, recovery_time):
+        """ Vectorized _recovery_time_probability over an array of TTGs """
+        return recovery_time_probability(ttgs, recovery_time)
+
+    def compute_recovery_probability_batch(self, ttgs, mode):
+        """ Vectorized compute_recovery_probability, returns an array shaped like ttgs """
+        ttgs = np.asarray(ttgs, dtype=float)
+        mode_index = self.plan.mode_index.get(mode)
+        if mode_index is None:
+            return np.ones(ttgs.shape)  # Default to full recovery probability if mode is not found
+
+        mode_plan = self.plan.modes[mode_index]
+        engine_probabilities = self.plan.engine_recovery_probabilities(ttgs.reshape(-1))
+        p_actions = mode_plan.action_probabilities(engine_probabilities, self.plan.restart_probability)
+        return mode_plan.recovery_probability(p_actions).reshape(ttgs.shape)
+
+    def compute_grounding_probability_batch(self, ttgs, mode):
+        """ Vectorized compute_grounding_probability, returns an array shaped like ttgs """
+        p_failure = self.compute_machinery_failure_probability(mode)
+        return p_failure * self.compute_recovery_probability_batch(ttgs, mode)
+
+    def cost_components(self):
+        """ Grounding cost of every component in COST_COMPONENTS order, as an array """
+        return np.array([self.cost_ship, self.cost_recovery, self.cost_environment, self.cost_cargo,
+                         self.cost_infrastructure, self.cost_reputation])
+
+    def _grounding_cost(self):
+        """ Sum of the grounding cost components """
+        return (self.cost_ship + self.cost_recovery + self.cost_environment + self.cost_cargo
+                + self.cost_infrastructure + self.cost_reputation)
+
     def compute_total_risk(self, ttg, mode):
         """ Computes the total risk at a waypoint based on grounding probability and cost """
         p_grounding = self.compute_grounding_probability(ttg, mode)
-        cost = self.cost_ship + self.cost_environment + self.cost_cargo + self.cost_infrastructure + self.cost_reputation
+        cost = self._grounding_cost()
         total_risk = p_grounding * cost * 1000
         return total_risk
 
+    def compute_total_risk_batch(self, ttgs, modes=None):
+        """ Computes the total risk for every TTG and mode in one pass.
+
+        Returns an array of shape (len(modes),) + ttgs.shape, one row per mode in the order given
+        (all configured modes in configuration order by default).
+        """
+        ttgs = np.asarray(ttgs, dtype=float)
+        p_grounding = self.plan.grounding_probability(ttgs.reshape(-1))
+        if modes is not None:
+            selected = np.zeros((len(modes), ttgs.size))  # Unknown modes have no failure probability, hence no risk
+            for i, mode in enumerate(modes):
+                mode_index = self.plan.mode_index.get(mode)
+                if mode_index is not None:
+                    selected[i] = p_grounding[mode_index]
+            p_grounding = selected
+        risks = p_grounding * (self._grounding_cost() * 1000)
+        return risks.reshape((len(risks),) + ttgs.shape)
+
     def select_mso_mode(self, ttg):
         """ Selects the optimal MSO mode for a given waypoint to minimize risk and maximize efficiency """
-        risks = {mode["mode_name"]: self.compute_total_risk(ttg, mode["mode_name"]) for mode in self.modes}
-        return min(risks, key=risks.get)
\ No newline at end of file
+        return self.mode_schedule().select(ttg)
+
+    def stream_risk(self, ttg_iterable, chunk_size=65536):
+        """ Generator of RiskChunk results (risk, mode, running total, mode changes) over a TTG stream """
+        return stream_risk(self, ttg_iterable, chunk_size)
+
+    def mode_schedule(self):
+        """ Returns the ModeSchedule of TTG breakpoints where the optimal mode changes, computed once per model """
+        if self._mode_schedule is None:
+            self._mode_schedule = compute_mode_schedule(self.plan, self.mode_names)  # Risk is p_grounding times a cost
+        return self._mode_schedule
+
+    def select_mso_mode_batch(self, ttgs):
+        """ Vectorized select_mso_mode.
+
+        Returns (mode_indices, min_risks): the index into self.mode_names of the risk-minimizing
+        mode at every TTG, and the risk of that mode. The modes come from the mode_schedule() lookup,
+        so only the selected mode's risk is evaluated at each TTG.
+        """
+        mode_indices, p_grounding = self._select_grounding_probability_batch(ttgs)
+        return mode_indices, p_grounding * (self._grounding_cost() * 1000)
+
+    def compute_total_risk_gradient(self, ttgs):
+        """ Total risk of every mode with its exact derivatives wrt TTG and the engine parameters (RiskGradients) """
+        return compute_risk_gradients(self, ttgs)
+
+    def decompose_risk(self, ttgs):
+        """ RiskDecomposition of the risk at every TTG by mode, restoration scenario and cost component """
+        return decompose_risk(self, ttgs)
+
+    def _select_grounding_probability_batch(self, ttgs):
+        """ Returns (mode_indices, p_grounding) of the optimal mode at every TTG """
+        ttgs = np.asarray(ttgs, dtype=float)
+        mode_indices = self.mode_schedule().lookup(ttgs)
+        p_grounding = np.empty(ttgs.shape)
+        for mode_index in range(len(self.mode_names)):
+            selected = mode_indices == mode_index
+            if selected.any():
+                p_grounding[selected] = self.plan.mode_grounding_probability(ttgs[selected], mode_index)
+        return mode_indices, p_grounding
+
+    def realtime_evaluator(self, n_waypoints, budget=None, fallback="last"):
+        """ RealtimeEvaluator of the optimal mode and risk at n_waypoints TTGs per call, into preallocated outputs """
+        return RealtimeEvaluator(self, n_waypoints, budget, fallback)
+
+    def enable_instrumentation(self):
+        """ Starts counting calls, time and TTGs of this model's methods, returns the Instrumentation """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+            for name in METHODS:
+                setattr(self, name, self.instrumentation.wrap(name, getattr(self, name)))
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """ Restores the plain methods, returning the final snapshot (None if instrumentation was off) """
+        if self.instrumentation is None:
+            return None
+        for name in METHODS:
+            delattr(self, name)  # The instance wrapper shadowed the class method
+        snapshot, self.instrumentation = self.instrumentation.snapshot(), None
+        return snapshot
+
+    def profile(self, method="cprofile", limit=30, interval=0.001):
+        """ Context manager capturing a cProfile or sampling profile of the evaluations run inside it """
+        return profile(method, limit, interval)
+
+    def build_lut(self, ttg_max, tol, rtol=0.0):
+        """ Builds a RiskLUT of interpolated risks on [0, ttg_max], refined to tol + rtol * |risk| at sampled points """
+        return RiskLUT.build(self, ttg_max, tol, rtol)
@@ -0,0 +1,271 @@
+import bisect
+
+import numpy as np
+
+from .plan import FaultTreeModePlan
+
+
+class ModeSchedule:
+    """ Piecewise-constant optimal mode over TTG.
+
+    mode_indices[i] is the optimal mode for ttg in (breakpoints[i - 1], breakpoints[i]], with the first and
+    last pieces open towards -inf and +inf. Intervals are closed on the right because a TTG equal to a
+    start time still leaves no time to recover.
+    """
+    __slots__ = ("breakpoints", "mode_indices", "mode_names", "_breakpoint_list", "_mode_list")
+
+    def __init__(self, breakpoints, mode_indices, mode_names):
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.mode_indices = np.asarray(mode_indices, dtype=np.intp)
+        self.mode_names = list(mode_names)
+        self._breakpoint_list = self.breakpoints.tolist()
+        self._mode_list = [self.mode_names[i] for i in self.mode_indices]
+
+    def __len__(self):
+        return len(self.mode_indices)
+
+    def rows(self):
+        """ The schedule as a table of (ttg_from, ttg_to, mode_name), ttg_from exclusive and ttg_to inclusive """
+        bounds = [-np.inf] + self._breakpoint_list + [np.inf]
+        return [(bounds[i], bounds[i + 1], mode) for i, mode in enumerate(self._mode_list)]
+
+    def select(self, ttg):
+        """ Optimal mode name for a single TTG, by binary search over the breakpoints """
+        if ttg != ttg:
+            return self.mode_names[0]  # NaN risks leave the first mode selected
+        return self._mode_list[bisect.bisect_left(self._breakpoint_list, ttg)]
+
+    def lookup(self, ttgs):
+        """ Optimal mode index (into mode_names) for every TTG, shaped like ttgs """
+        ttgs = np.asarray(ttgs, dtype=float)
+        indices = self.mode_indices[np.searchsorted(self.breakpoints, ttgs, side='left')]
+        return np.where(np.isnan(ttgs), 0, indices)
+
+
+def _interval_samples(lower, upper, n_samples):
+    """ Sample points in (lower, upper], uniform in 1/ttg when the interval is positive """
+    if lower > 0:
+        # exp(-t/ttg) is smooth in 1/ttg, which also spreads the samples of the open last interval
+        u_upper = 1 / lower
+        u_lower = 0.0 if np.isinf(upper) else 1 / upper
+        u = np.linspace(u_lower, u_upper, n_samples + 1)[:-1]
+        if u_lower == 0.0:
+            u[0] = u_upper * 1e-12  # Stands in for ttg -> infinity
+        return 1 / u
+    if np.isinf(upper):
+        upper = max(abs(lower), 1.0) * 1e12
+    return np.linspace(lower, upper, n_samples + 1)[1:]
+
+
+class _ExponentialSum:
+    """ sum(c * exp(-a * u)) over {a: c}, with u = 1 / ttg: the closed form of a risk on one smooth piece.
+
+    Supports the +, - and * of floats and of other sums that the scenario and fault-tree evaluations use.
+    Exponents are sums of start times, rounded so the same sum reached in a different order is one term.
+    Raises _TooManyTerms beyond max_terms terms.
+    """
+    __slots__ = ("terms", "max_terms")
+
+    def __init__(self, terms, max_terms):
+        if len(terms) > max_terms:
+            raise _TooManyTerms()
+        self.terms = terms
+        self.max_terms = max_terms
+
+    def _wrap(self, other):
+        return other if isinstance(other, _ExponentialSum) else _ExponentialSum({0.0: float(other)}, self.max_terms)
+
+    def _combine(self, other, sign):
+        terms = dict(self.terms)
+        for exponent, coefficient in self._wrap(other).terms.items():
+            terms[exponent] = terms.get(exponent, 0.0) + sign * coefficient
+        return _ExponentialSum(terms, self.max_terms)
+
+    def __add__(self, other):
+        return self._combine(other, 1.0)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._combine(other, -1.0)
+
+    def __rsub__(self, other):
+        return self._wrap(other)._combine(self, -1.0)
+
+    def __mul__(self, other):
+        terms = {}
+        for a, c in self.terms.items():
+            for b, d in self._wrap(other).terms.items():
+                exponent = round(a + b, 9)
+                terms[exponent] = terms.get(exponent, 0.0) + c * d
+        return _ExponentialSum(terms, self.max_terms)
+
+    __rmul__ = __mul__
+
+
+class _TooManyTerms(Exception):
+    pass
+
+
+def _mode_terms(mode, lower, max_terms):
+    """ Grounding probability of a mode on the piece (lower, next start time] as an _ExponentialSum """
+    one = _ExponentialSum({0.0: 1.0}, max_terms)
+
+    def action(start_time, factor):  # Zero on the whole piece unless the engine can recover within it
+        return _ExponentialSum({round(start_time, 9): factor} if start_time <= lower else {}, max_terms)
+
+    if isinstance(mode, FaultTreeModePlan):
+        recovery = one - mode.bdd.probability_scalar([action(*event) for event in mode.scalar_events])
+    else:
+        recovery = one
+        for scenario in mode.scalar_scenarios:
+            p_scenario = one
+            for start_time, factor in scenario:
+                p_scenario = p_scenario * action(start_time, factor)
+            recovery = recovery * (one - p_scenario)
+    return recovery * mode.failure_probability
+
+
+_MAX_BISECTIONS = 400
+
+
+def _value(exponents, coefficients, u):
+    return float(np.dot(coefficients, np.exp(-exponents * u)))
+
+
+def _bisect_root(exponents, coefficients, a, b, sign_a, xtol):
+    """ Shrinks [a, b] (u values, f changing sign) around the root to a relative width of xtol; returns b """
+    for _ in range(_MAX_BISECTIONS):
+        if b - a <= xtol * b:
+            break
+        lower = max(a, b * 1e-300)
+        middle = np.sqrt(lower) * np.sqrt(b) if b > 2 * lower else 0.5 * (a + b)  # Geometric over wide ranges
+        if np.sign(_value(exponents, coefficients, middle)) == sign_a:
+            a = middle
+        else:
+            b = middle
+    return b
+
+
+
+def _sign_changes(exponents, coefficients, a, b, xtol):
+    """ Points of [a, b] where f(u) = sum(c * exp(-a * u)) changes sign, for exponents in increasing order.
+
+    By the Descartes rule of signs for exponential sums, f has at most as many real roots as its
+    coefficients have sign changes. With more than one, the roots of f are isolated by those of
+    g = d/du (exp(exponents[0] * u) * f), an exponential sum with one term less: between consecutive
+    sign changes of g the product is monotone, so it has at most one root there, bracketed by the signs.
+    """
+    signs = np.sign(coefficients)
+    n_changes = np.count_nonzero(signs[1:] != signs[:-1])
+    if n_changes == 0:
+        return []
+    critical = []
+    if n_changes > 1:
+        critical = _sign_changes(exponents[1:] - exponents[0], coefficients[1:] * (exponents[0] - exponents[1:]),
+                                 a, b, xtol)
+    points = [a] + [u for u in critical if a < u < b] + [b]
+    values = [np.sign(_value(exponents, coefficients, u)) for u in points]
+    roots = []
+    previous = None  # Index of the last point with a non-zero value
+    for k, sign in enumerate(values):
+        if sign == 0:
+            continue
+        if previous is not None and sign != values[previous]:
+            zeros = [points[i] for i in range(previous + 1, k) if values[i] == 0]
+            roots.append(zeros[0] if zeros else _bisect_root(exponents, coefficients, points[previous], points[k],
+                                                              values[previous], xtol))
+        previous = k
+    return roots
+
+
+def _exact_crossings(plan, lower, upper, max_terms, xtol):
+    """ TTGs in (lower, upper) where the risk difference of some pair of modes changes sign """
+    sums = [_mode_terms(mode, lower, max_terms).terms for mode in plan.modes]
+    u_lower = 0.0 if np.isinf(upper) else 1 / upper
+    u_upper = 1 / lower if lower > 0 else 1e300  # A start time of 0: TTGs down to 1e-300
+    crossings = []
+    for i in range(len(sums)):
+        for j in range(i + 1, len(sums)):
+            difference = {exponent: sums[i].get(exponent, 0.0) - sums[j].get(exponent, 0.0)
+                          for exponent in sums[i].keys() | sums[j].keys()}
+            scale = max([abs(c) for c in sums[i].values()] + [abs(c) for c in sums[j].values()] + [0.0])
+            exponents = np.array(sorted(e for e, c in difference.items() if abs(c) > 1e-13 * scale))
+            if len(exponents) == 0:
+                continue  # Identical risks: never a strict change, the lower mode index wins the ties
+            coefficients = np.array([difference[exponent] for exponent in exponents])
+            crossings += [1 / u for u in _sign_changes(exponents, coefficients, u_lower, u_upper, xtol) if u > 0]
+    return [ttg for ttg in crossings if lower < ttg < upper]
+
+
+def _sampled_crossings(plan, lower, upper, n_samples, xtol):
+    """ Fallback of _exact_crossings: every change of the optimal mode between samples, found by bisection """
+    samples = np.concatenate([[np.nextafter(lower, np.inf)], _interval_samples(lower, upper, n_samples)])
+    samples_modes = np.argmin(plan.grounding_probability(samples), axis=0)
+
+    def select(ttg):
+        return int(np.argmin(plan.grounding_probability(np.array([ttg]))[:, 0]))
+
+    crossings = []
+
+    def refine(lower, upper, mode_lower, mode_upper):
+        # Bisect (lower, upper] down to one change, recursing when a third mode shows up in between
+        while upper - lower > xtol * max(abs(lower), 1.0) and np.nextafter(lower, np.inf) < upper:
+            middle = 0.5 * (lower + upper)
+            mode_middle = select(middle)
+            if mode_middle == mode_lower:
+                lower = middle
+            elif mode_middle == mode_upper:
+                upper = middle
+            else:
+                refine(lower, middle, mode_lower, mode_middle)
+                lower, mode_lower = middle, mode_middle
+        crossings.append(lower)
+
+    for k in np.flatnonzero(samples_modes[1:] != samples_modes[:-1]):
+        refine(samples[k], samples[k + 1], int(samples_modes[k]), int(samples_modes[k + 1]))
+    return crossings
+
+
+def _segment_sample(lower, upper):
+    """ A TTG inside (lower, upper) at which to read the optimal mode of that segment """
+    if np.isinf(upper):
+        return 2 * max(lower, 1.0)
+    if lower > 0:
+        return np.sqrt(lower) * np.sqrt(upper)
+    return 0.5 * (lower + upper)
+
+
+def compute_mode_schedule(plan, mode_names, xtol=1e-12, max_terms=4096, n_samples=512):
+    """ Finds the TTGs where the risk-minimizing mode of an EvaluationPlan changes.
+
+    Between consecutive engine start times every mode's grounding probability is an exponential sum in
+    1 / ttg, so the optimal mode can only change at a sign change of the difference of two of them (or at
+    a start time). Those sign changes are isolated exactly for every pair of modes and located by
+    bisection to a relative tolerance of xtol, however close together they are; the optimal mode is then
+    read once inside every segment between them. A piece where some mode expands into more than max_terms
+    exponentials falls back to n_samples samples with bisection, which can miss crossings closer together
+    than the sample spacing.
+    """
+    discontinuities = np.unique(np.asarray(plan.start_time, dtype=float))
+    if len(discontinuities) == 0:
+        discontinuities = np.array([0.0])
+
+    # Every risk is constant below the smallest start time, so one sample covers that piece
+    bounds, samples = [-np.inf], [discontinuities[0] - 1.0]
+    edges = list(discontinuities) + [np.inf]
+    for lower, upper in zip(edges[:-1], edges[1:]):
+        try:
+            crossings = _exact_crossings(plan, lower, upper, max_terms, xtol)
+        except _TooManyTerms:
+            crossings = _sampled_crossings(plan, lower, upper, n_samples, xtol)
+        segment_bounds = [lower] + sorted(set(crossings)) + [upper]
+        bounds += segment_bounds[:-1]
+        samples += [_segment_sample(a, b) for a, b in zip(segment_bounds[:-1], segment_bounds[1:])]
+    samples_modes = np.argmin(plan.grounding_probability(np.array(samples)), axis=0)
+
+    # Segment k covers (bounds[k], bounds[k + 1]]; the mode only changes where consecutive segments differ
+    changes = np.flatnonzero(samples_modes[1:] != samples_modes[:-1]) + 1
+    breakpoints = [bounds[k] for k in changes]
+    modes = [int(samples_modes[0])] + [int(samples_modes[k]) for k in changes]
+    return ModeSchedule(breakpoints, modes, mode_names)
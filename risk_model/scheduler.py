@@ -0,0 +1,233 @@
+import numpy as np
+
+# Python overhead of one window of _dwell_schedule in units of element operations, for choosing the algorithm
+_WINDOW_OVERHEAD = 4096
+
+
+class TrajectorySchedule:
+    """ Mode sequence over a trajectory chosen with switching costs.
+
+    mode_indices index into mode_names, risks is the risk of the chosen mode at every waypoint,
+    switches the waypoints where the mode changes and total_cost the summed risk plus switching costs.
+    """
+    __slots__ = ("mode_names", "mode_indices", "risks", "switches", "total_cost")
+
+    def __init__(self, mode_names, mode_indices, risks, switches, total_cost):
+        self.mode_names = mode_names
+        self.mode_indices = mode_indices
+        self.risks = risks
+        self.switches = switches
+        self.total_cost = total_cost
+
+
+def _block_schedule(risks, switch_cost, memory_budget, uniform=None):
+    """ Viterbi recursion over the modes without dwell constraints, run block-parallel in min-plus algebra.
+
+    The steps are split into about sqrt(T) blocks, the transfer matrix of every block is built with the
+    blocks side by side in NumPy, a short loop over blocks chains them, and a second pass recovers the
+    modes and back pointers inside all blocks at once. Python loops run O(sqrt(T) * n_modes) times, but
+    the transfer matrices cost O(T * n_modes^3) arithmetic against O(T * n_modes^2) for the sequential
+    recursion, unless every change costs the same (uniform): then the cheapest source mode serves every
+    target and they cost O(T * n_modes^2). Returns (mode_indices, total_cost).
+    """
+    n_modes, n_steps = risks.shape
+    transition_cost = switch_cost.copy()
+    np.fill_diagonal(transition_cost, 0.0)
+    step_risks_all = risks.T  # (T, n_modes)
+
+    # Blocks of transitions x_g -> x_g+1; padding steps add no risk and let every mode stay where it is.
+    # Blocks are the last axis, so every NumPy operation runs over all blocks in contiguous memory.
+    n_transitions = n_steps - 1
+    max_blocks = max(1, memory_budget // (32 * n_modes ** 2))
+    n_blocks = max(1, min(int(np.ceil(np.sqrt(n_transitions))), max_blocks))
+    block_size = max(1, -(-n_transitions // n_blocks))
+    step_risks = np.zeros((n_blocks * block_size, n_modes))
+    step_risks[:n_transitions] = step_risks_all[1:]
+    step_risks = step_risks.reshape(n_blocks, block_size, n_modes).transpose(1, 2, 0).copy()  # (k, mode, block)
+    cost = transition_cost[:, :, np.newaxis]
+
+    # Phase 1: min-plus transfer matrix (from, to, block) of every block, one source mode at a time or, with a
+    # uniform switch cost, through the cheapest mode of every row
+    transfer = cost + step_risks[0]
+    product, candidate = np.empty_like(transfer), np.empty_like(transfer)
+    lowest = np.empty((n_modes, 1, n_blocks))
+    for k in range(1, block_size):
+        if uniform is None:
+            np.add(transfer[:, :1], cost[0], out=product)
+            for source in range(1, n_modes):
+                np.add(transfer[:, source:source + 1], cost[source], out=candidate)
+                np.minimum(product, candidate, out=product)
+        else:
+            np.min(transfer, axis=1, keepdims=True, out=lowest)
+            lowest += uniform
+            np.minimum(transfer, lowest, out=product)
+        product += step_risks[k]
+        transfer, product = product, transfer
+
+    # Phase 2: values entering every block
+    entry = np.empty((n_modes, n_blocks))
+    entry[:, 0] = step_risks_all[0]
+    for b in range(1, n_blocks):
+        entry[:, b] = np.min(entry[:, b - 1, np.newaxis] + transfer[:, :, b - 1], axis=0)
+
+    # Phase 3: back pointers inside all blocks
+    back = np.empty((block_size, n_modes, n_blocks), dtype=np.int32)
+    values, best, option = entry.copy(), np.empty_like(entry), np.empty_like(entry)
+    better = np.empty(entry.shape, dtype=bool)
+    stay, blocks = np.arange(n_modes)[:, np.newaxis], np.arange(n_blocks)
+    for k in range(block_size):
+        if uniform is None:
+            np.add(values[:1], cost[0], out=best)
+            back[k] = 0
+            for source in range(1, n_modes):
+                np.add(values[source:source + 1], cost[source], out=option)
+                np.less(option, best, out=better)
+                back[k][better] = source
+                np.minimum(best, option, out=best)
+        else:
+            source = np.argmin(values, axis=0)
+            switched = values[source, blocks] + uniform
+            np.minimum(values, switched, out=best)
+            back[k] = np.where(values <= switched, stay, source)
+        best += step_risks[k]
+        values, best = best, values
+    total_cost = float(np.min(values[:, -1]))
+
+    # Phase 4: mode at each step of a block as a function of the block's exit mode, then chain the blocks
+    origin = np.empty((block_size, n_modes, n_blocks), dtype=np.int32)
+    current = np.broadcast_to(np.arange(n_modes)[:, np.newaxis], (n_modes, n_blocks))
+    for k in range(block_size - 1, -1, -1):
+        current = back[k][current, blocks]
+        origin[k] = current
+    exits = np.empty(n_blocks, dtype=np.intp)
+    exits[-1] = np.argmin(values[:, -1])
+    for b in range(n_blocks - 1, 0, -1):
+        exits[b - 1] = origin[0, exits[b], b]
+    modes = origin[:, exits, blocks].T.reshape(-1)
+    return np.append(modes, exits[-1])[:n_steps].astype(np.intp), total_cost
+
+
+def _dwell_schedule(risks, switch_cost, dwell):
+    """ Viterbi recursion with minimum dwell, one O(n_modes^2) min-plus step per waypoint over a rolling window.
+
+    With prefix[t, j] the summed risk of mode j before step t and entering mode j at step s costing
+    entry[s, j] + prefix[s, j], the cheapest path settled in mode j at step t costs
+    prefix[t + 1, j] + best[t - dwell[j] + 1, j], where best[u, j] is the running minimum of 0 (the first
+    run) and entry[1 .. u, j]; a path may end in a run cut short, so the total is min(prefix[T] + best[T - 1]).
+    Entering j at s comes from another mode i settled at s - 1, which only depends on best[s - dwell[i]],
+    so the dwell counters reduce to a fixed lag per mode and the steps are processed in windows of
+    min(dwell) at once: the Python loop runs T / min(dwell) times. The forward pass stores the back
+    pointer of every best value, the entry step of the run it belongs to, and the runs are followed
+    backwards one Python step per run, recomputing with the same arithmetic which mode each entry came
+    from. Returns (mode_indices, total_cost).
+    """
+    n_modes, n_steps = risks.shape
+    window, lead = int(dwell.min()), int(dwell.max())
+    n_padded = -(-(n_steps - 1) // window) * window + 1  # Steps 1 .. n_padded - 1 fill whole windows
+    prefix = np.zeros((n_padded + 1, n_modes))
+    np.cumsum(risks.T, axis=0, out=prefix[1:n_steps + 1])
+    prefix[n_steps + 1:] = prefix[n_steps]  # Padding steps add no risk
+    entry_cost = np.where(np.eye(n_modes, dtype=bool), np.inf, switch_cost)
+
+    # best[lead + u] is the running minimum up to entry u, zero for u <= 0 (still in the first run);
+    # started[u] is the step of the entry attaining it (0 for the first run)
+    best = np.zeros((lead + n_padded, n_modes))
+    started = np.zeros((n_padded, n_modes), dtype=np.intp)
+    flat = best.reshape(-1)
+    lookup = (np.arange(window)[:, np.newaxis] - dwell + lead) * n_modes + np.arange(n_modes)  # best[s - dwell]
+
+    # Windows of steps as views, the running minima and run starts starting one row early with the values
+    # so far, and buffers reused by every window keep the loop at a few ufunc calls
+    def windows(array, extra=0):
+        rows, columns = array.strides
+        return np.lib.stride_tricks.as_strided(array, (n_windows, window + extra, n_modes),
+                                               (window * rows, rows, columns))
+
+    n_windows = (n_padded - 1) // window
+    prefix_windows = windows(prefix[1:])
+    best_windows, previous_windows = windows(best[lead:], 1), windows(best[lead:])
+    entry_windows = windows(best[lead + 1:])
+    started_windows = windows(started, 1)
+    step_windows = np.arange(1, n_padded).reshape(n_windows, window, 1)
+    settled = np.empty((window, n_modes))
+    candidates = np.empty((window, n_modes, n_modes))
+    dropped = np.empty((window, n_modes), dtype=bool)
+    for start, step_prefix, step_best, entries, previous, step_started, steps in zip(
+            range(n_modes, flat.size, window * n_modes), prefix_windows, best_windows, entry_windows,
+            previous_windows, started_windows, step_windows):
+        flat[start:].take(lookup, out=settled)
+        settled += step_prefix  # Cheapest settled path in every mode up to the step before
+        np.add(settled[:, :, np.newaxis], entry_cost, out=candidates)
+        np.minimum.reduce(candidates, axis=1, out=entries)
+        entries -= step_prefix
+        np.minimum.accumulate(step_best, axis=0, out=step_best)
+        np.less(entries, previous, out=dropped)  # Running minima are final now; a drop is a new best entry
+        np.multiply(dropped, steps, out=step_started[1:])
+        np.maximum.accumulate(step_started, axis=0, out=step_started)
+    final = prefix[n_steps] + best[lead + n_steps - 1]
+    total_cost = float(np.min(final))
+
+    mode, bound = int(np.argmin(final)), n_steps - 1
+    run_starts, run_modes = [], []
+    entry_columns, dwell_list, settled_lookup = list(entry_cost.T), dwell.tolist(), lookup[0]
+    while True:
+        start = int(started[max(bound, 0), mode])
+        run_starts.append(start)
+        run_modes.append(mode)
+        if start == 0:
+            break
+        settled = flat.take(settled_lookup + start * n_modes)
+        settled += prefix[start]
+        settled += entry_columns[mode]
+        mode = int(settled.argmin())  # The mode the run was entered from, as in the forward pass
+        bound = start - dwell_list[mode]
+    lengths = np.diff(np.append(run_starts[::-1], n_steps))
+    return np.repeat(np.array(run_modes[::-1], dtype=np.intp), lengths), total_cost
+
+
+def schedule_modes(risks, switch_cost, min_dwell=1, memory_budget=64 << 20):
+    """ Globally optimal mode sequence for an (n_modes, T) risk matrix.
+
+    Minimizes the summed risk plus switch_cost[i, j] for every change from mode i to mode j (a scalar
+    applies to every change), with each mode kept for at least min_dwell waypoints once entered (an int
+    or one per mode). Returns (mode_indices, total_cost).
+
+    With minimum dwells the recursion keeps one value per mode and handles the dwell as a per-mode lag
+    (_dwell_schedule): O(T * n_modes^2) arithmetic with a Python loop over T / min(min_dwell) windows.
+    Without them it runs block-parallel (_block_schedule): O(sqrt(T) * n_modes) Python iterations for
+    O(T * n_modes^2) arithmetic with a uniform switch cost, but O(T * n_modes^3) with a general matrix, and
+    memory_budget bounds its transfer matrices; the cheaper of the two is used. The recursion is sequential
+    in T: vectorizing it across blocks costs the extra factor of min-plus matrix products, and avoiding that
+    leaves a Python loop over windows. Measured on one core for 10^6 waypoints, only a scalar switch_cost
+    without dwell stays under a second for several modes: 0.17 s with 3 modes, 0.43 s with 8 and 1.3 s
+    with 16; a general matrix takes 0.2 s, 1.4 s and 14 s. With dwell every window costs about 20 us of
+    Python overhead: 2.4 s for 3 modes with min_dwell 10, 4.2 s (5 s with a matrix) for 8 modes with
+    min_dwell 5, 7 s for 3 modes with min_dwell 2, and about 17 s when a mode with min_dwell 1 sits next
+    to longer dwells, as every waypoint is then its own window.
+    """
+    risks = np.asarray(risks, dtype=float)
+    n_modes, n_steps = risks.shape
+    switch_cost = np.broadcast_to(np.asarray(switch_cost, dtype=float), (n_modes, n_modes))
+    if np.any(switch_cost < 0):
+        raise ValueError("switch costs must not be negative")
+    dwell = np.broadcast_to(np.asarray(min_dwell, dtype=np.intp), (n_modes,))
+    if np.any(dwell < 1):
+        raise ValueError("min_dwell must be at least 1")
+    if n_steps == 0:
+        return np.zeros(0, dtype=np.intp), 0.0
+    off_diagonal = switch_cost[~np.eye(n_modes, dtype=bool)]
+    uniform = float(off_diagonal[0]) if len(off_diagonal) and np.all(off_diagonal == off_diagonal[0]) else None
+    # Per-waypoint cost in element operations: block arithmetic vs a window of one step of the rolling recursion
+    block_work = n_modes ** (3 if uniform is None else 2)
+    if dwell.max() == 1 and block_work < _WINDOW_OVERHEAD + n_modes ** 2:
+        return _block_schedule(risks, np.array(switch_cost), memory_budget, uniform)
+    return _dwell_schedule(risks, switch_cost, dwell)
+
+
+def schedule_trajectory(model, ttgs, switch_cost, min_dwell=1):
+    """ TrajectorySchedule of a RiskModel over a TTG array, see schedule_modes """
+    risks = model.compute_total_risk_batch(np.ravel(np.asarray(ttgs, dtype=float)))
+    mode_indices, total_cost = schedule_modes(risks, switch_cost, min_dwell)
+    switches = np.flatnonzero(mode_indices[1:] != mode_indices[:-1]) + 1
+    return TrajectorySchedule(list(model.mode_names), mode_indices, risks[mode_indices, np.arange(len(mode_indices))],
+                              switches, total_cost)
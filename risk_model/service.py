@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import socket
+import time
+
+import numpy as np
+
+from .risk_model import RiskModel
+
+
+def _load_model(config):
+    """ RiskModel from a config path, a parsed config dict or an existing model """
+    if isinstance(config, RiskModel):
+        return config
+    if isinstance(config, dict):
+        return RiskModel.from_config(config)
+    return RiskModel(config)
+
+
+def _percentiles(values):
+    if not values:
+        return 0.0, 0.0
+    p50, p99 = np.percentile(np.fromiter(values, dtype=float), [50, 99])
+    return float(p50), float(p99)
+
+
+class RiskService:
+    """ Local risk service that coalesces concurrent requests into vectorized micro-batches.
+
+    Clients send JSON lines over a Unix socket (address is a path) or localhost TCP (address is a
+    (host, port) tuple):
+        {"id": 1, "op": "risk", "ttg": 420.0}            -> {"id": 1, "mode": "PTO", "mode_index": 0, "risk": ...}
+        {"id": 2, "op": "risk", "ttg": [420.0, 90.0]}    -> same with lists
+        {"id": 3, "op": "metrics"}                       -> {"id": 3, "metrics": {...}}
+        {"id": 4, "op": "reload", "config": "ship.json"} -> {"id": 4, "modes": [...]}
+    Requests arriving within window seconds of the first pending one (or until max_batch TTGs are
+    pending) are answered by one select_mso_mode_batch call. A reload builds the new model off the event
+    loop and swaps it in between batches, so every batch is evaluated by exactly one model.
+    """
+
+    def __init__(self, config="ship_config.json", window=0.001, max_batch=4096, history=10000):
+        self.model = _load_model(config)
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []  # (ttgs, future) waiting for the next batch
+        self._pending_size = 0
+        self._flush_handle = None
+        self._server = None
+        self._unix_path = None
+        self.n_requests = 0
+        self.n_batches = 0
+        self.latencies = collections.deque(maxlen=history)  # Seconds from request read to response written
+        self.batch_sizes = collections.deque(maxlen=history)
+
+    async def start(self, address):
+        """ Starts listening, returns the bound address (the actual port for port 0) """
+        if isinstance(address, str):
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=address)
+            self._unix_path = address
+            return address
+        self._server = await asyncio.start_server(self._handle_connection, *address)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._unix_path is not None:
+            try:
+                os.unlink(self._unix_path)  # Or the next start() on the path fails with EADDRINUSE
+            except FileNotFoundError:
+                pass
+            self._unix_path = None
+        self._flush()
+
+    def swap_model(self, model):
+        """ Replaces the served model; batches already evaluated keep their results """
+        self.model = model
+
+    async def reload(self, config):
+        """ Loads a config path or dict in a worker thread and swaps it in """
+        model = await asyncio.get_running_loop().run_in_executor(None, _load_model, config)
+        self.swap_model(model)
+        return model
+
+    async def evaluate(self, ttgs):
+        """ (mode_indices, risks, mode_names) of a TTG array, evaluated in the next micro-batch.
+
+        mode_names are those of the model that evaluated the batch, which a reload may since have replaced.
+        """
+        ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((ttgs, future))
+        self._pending_size += len(ttgs)
+        if self._pending_size >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        """ Evaluates every pending request in one vectorized call """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending, self._pending_size = self._pending, [], 0
+        if not pending:
+            return
+        model = self.model  # One model per batch, its mode names go with the indices it selected
+        try:
+            mode_indices, risks = model.select_mso_mode_batch(np.concatenate([ttgs for ttgs, _ in pending]))
+        except Exception as error:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.n_batches += 1
+        self.batch_sizes.append(len(risks))
+        start = 0
+        for ttgs, future in pending:
+            stop = start + len(ttgs)
+            if not future.done():  # The client may have gone away
+                future.set_result((mode_indices[start:stop], risks[start:stop], model.mode_names))
+            start = stop
+
+    def metrics(self):
+        """ Request and batch counters with p50/p99 latency (ms) and batch size over the recent history """
+        latency_p50, latency_p99 = _percentiles(self.latencies)
+        batch_p50, batch_p99 = _percentiles(self.batch_sizes)
+        return {"requests": self.n_requests, "batches": self.n_batches,
+                "latency_p50_ms": latency_p50 * 1000, "latency_p99_ms": latency_p99 * 1000,
+                "batch_size_p50": batch_p50, "batch_size_p99": batch_p99,
+                "batch_size_max": max(self.batch_sizes, default=0)}
+
+    async def _respond(self, request):
+        op = request.get("op", "risk")
+        if op == "risk":
+            ttg = request["ttg"]
+            mode_indices, risks, names = await self.evaluate(ttg)
+            if isinstance(ttg, list):
+                return {"mode": [names[i] for i in mode_indices], "mode_index": mode_indices.tolist(),
+                        "risk": risks.tolist()}
+            return {"mode": names[mode_indices[0]], "mode_index": int(mode_indices[0]), "risk": float(risks[0])}
+        if op == "metrics":
+            return {"metrics": self.metrics()}
+        if op == "reload":
+            model = await self.reload(request["config"])
+            return {"modes": list(model.mode_names)}
+        raise ValueError(f"Unknown op '{op}', expected 'risk', 'metrics' or 'reload'")
+
+    async def _handle_request(self, line, writer, lock):
+        began = time.perf_counter()
+        request = {}
+        try:
+            request = json.loads(line)
+            response = await self._respond(request)
+        except Exception as error:
+            response = {"error": f"{type(error).__name__}: {error}"}
+        response["id"] = request.get("id") if isinstance(request, dict) else None
+        async with lock:  # Responses of concurrent requests must not interleave
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        self.n_requests += 1
+        self.latencies.append(time.perf_counter() - began)
+
+    async def _handle_connection(self, reader, writer):
+        """ Serves one client; its requests may be pipelined and are answered as they complete """
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._handle_request(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class RiskClient:
+    """ Blocking client of a RiskService, for processes that call the model one TTG at a time """
+
+    def __init__(self, address, timeout=5.0):
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.settimeout(timeout)
+        self._socket.connect(address)
+        self._file = self._socket.makefile("rb")
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def request(self, op, **fields):
+        """ Sends one request and returns its response dict, raising RuntimeError on a service error """
+        self._next_id += 1
+        self._socket.sendall(json.dumps({"id": self._next_id, "op": op, **fields}).encode() + b"\n")
+        response = json.loads(self._file.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def risk(self, ttg):
+        """ (mode name, risk) of the optimal mode at a TTG, or lists of them for a sequence of TTGs """
+        if not np.isscalar(ttg):
+            ttg = [float(value) for value in ttg]
+        else:
+            ttg = float(ttg)
+        response = self.request("risk", ttg=ttg)
+        return response["mode"], response["risk"]
+
+    def metrics(self):
+        return self.request("metrics")["metrics"]
+
+    def reload(self, config):
+        """ Swaps the service to a config path or dict, returning its mode names """
+        return self.request("reload", config=config)["modes"]
+
+
+async def generate_load(address, n_clients=16, requests_per_client=500, ttg_range=(0.0, 1000.0), seed=None):
+    """ Closed-loop load test: n_clients connections each send single-TTG requests back to back.
+
+    Returns the request count, wall time, throughput and client-side p50/p99 latency in ms.
+    """
+    rng = np.random.default_rng(seed)
+    ttgs = rng.uniform(*ttg_range, size=(n_clients, requests_per_client))
+    latencies = []
+
+    async def client(ttg_values):
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        try:
+            for i, ttg in enumerate(ttg_values):
+                began = time.perf_counter()
+                writer.write(json.dumps({"id": i, "op": "risk", "ttg": float(ttg)}).encode() + b"\n")
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                if "error" in response:
+                    raise RuntimeError(response["error"])
+                latencies.append(time.perf_counter() - began)
+        finally:
+            writer.close()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client(values) for values in ttgs))
+    seconds = time.perf_counter() - began
+    p50, p99 = _percentiles(latencies)
+    return {"requests": len(latencies), "seconds": seconds, "throughput": len(latencies) / seconds,
+            "latency_p50_ms": p50 * 1000, "latency_p99_ms": p99 * 1000}
+
+
+def _parse_address(args):
+    return args.unix if args.unix else (args.host, args.port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local micro-batching risk service")
+    parser.add_argument("command", choices=["serve", "load"])
+    parser.add_argument("--unix", help="Unix socket path (default: TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", default="ship_config.json")
+    parser.add_argument("--window-ms", type=float, default=1.0)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = RiskService(args.config, window=args.window_ms / 1000)
+        print("Serving on", await service.start(_parse_address(args)))
+        await service.serve_forever()
+
+    if args.command == "serve":
+        asyncio.run(serve())
+    else:
+        print(json.dumps(asyncio.run(generate_load(_parse_address(args), args.clients, args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class RiskChunk:
+    """ Result of one chunk of a risk stream.
+
+    start is the position of the chunk's first TTG in the stream, mode_indices index into mode_names,
+    total_risk is the running total up to and including this chunk, and mode_changes lists
+    (position, previous_mode, new_mode) for every change of the selected mode, including one at the
+    chunk boundary.
+    """
+    __slots__ = ("start", "ttgs", "mode_indices", "risks", "total_risk", "mode_changes", "mode_names")
+
+    def __init__(self, start, ttgs, mode_indices, risks, total_risk, mode_changes, mode_names):
+        self.start = start
+        self.ttgs = ttgs
+        self.mode_indices = mode_indices
+        self.risks = risks
+        self.total_risk = total_risk
+        self.mode_changes = mode_changes
+        self.mode_names = mode_names
+
+    def __len__(self):
+        return len(self.ttgs)
+
+    @property
+    def modes(self):
+        """ Selected mode name of every TTG in the chunk """
+        return [self.mode_names[i] for i in self.mode_indices]
+
+
+def _chunks(ttg_iterable, chunk_size):
+    """ Regroups an iterable of TTG scalars and/or arrays into float arrays of chunk_size (the last may be shorter) """
+    buffer = np.empty(chunk_size)
+    filled = 0
+    for item in ttg_iterable:
+        values = np.ravel(np.asarray(item, dtype=float))
+        while len(values):
+            taken = min(chunk_size - filled, len(values))
+            buffer[filled:filled + taken] = values[:taken]
+            filled += taken
+            values = values[taken:]
+            if filled == chunk_size:
+                yield buffer.copy()
+                filled = 0
+    if filled:
+        yield buffer[:filled].copy()
+
+
+def stream_risk(model, ttg_iterable, chunk_size=65536):
+    """ Evaluates a TTG stream chunk by chunk, yielding a RiskChunk per chunk.
+
+    The iterable may yield single TTGs or arrays of them (file blocks, socket messages, simulator steps),
+    and only one chunk is held in memory at a time.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    start = 0
+    total_risk = 0.0
+    previous_mode = None
+    for ttgs in _chunks(ttg_iterable, chunk_size):
+        mode_indices, risks = model.select_mso_mode_batch(ttgs)
+        total_risk += float(risks.sum())
+
+        changes = np.flatnonzero(mode_indices[1:] != mode_indices[:-1]) + 1
+        mode_changes = [(start + int(i), model.mode_names[mode_indices[i - 1]], model.mode_names[mode_indices[i]])
+                        for i in changes]
+        if previous_mode is not None and mode_indices[0] != previous_mode:
+            mode_changes.insert(0, (start, model.mode_names[previous_mode], model.mode_names[mode_indices[0]]))
+        previous_mode = mode_indices[-1]
+
+        yield RiskChunk(start, ttgs, mode_indices, risks, total_risk, mode_changes, model.mode_names)
+        start += len(ttgs)
@@ -0,0 +1,124 @@
+import itertools
+
+import numpy as np
+
+PARAMETERS = ("failure_rate", "start_time", "restart_probability")
+
+
+def base_samples(model, n_samples=1):
+    """ n_samples copies of the model's engine parameters, as {parameter: (n_samples, n_engines) array} """
+    plan = model.plan
+    return {name: np.tile(getattr(plan, name), (n_samples, 1)) for name in PARAMETERS}
+
+
+def _engine_index(model, engine_name):
+    try:
+        return model.plan.engine_names.index(engine_name)
+    except ValueError:
+        raise ValueError(f"Unknown engine '{engine_name}', expected one of {model.plan.engine_names}") from None
+
+
+def _check_parameter(parameter):
+    if parameter not in PARAMETERS:
+        raise ValueError(f"Unknown parameter '{parameter}', expected one of {PARAMETERS}")
+
+
+def grid_samples(model, grids):
+    """ Cartesian product of parameter grids.
+
+    grids maps (engine_name, parameter) to a sequence of values; parameters not in grids keep their
+    configured value. Samples vary fastest along the last grid, so results reshape to the grid shape
+    (len(values) for each grid in order).
+    """
+    keys = list(grids)
+    for _, parameter in keys:
+        _check_parameter(parameter)
+    combinations = list(itertools.product(*(grids[key] for key in keys)))
+    samples = base_samples(model, len(combinations))
+    for column, (engine_name, parameter) in enumerate(keys):
+        samples[parameter][:, _engine_index(model, engine_name)] = [values[column] for values in combinations]
+    return samples
+
+
+def latin_hypercube_samples(model, ranges, n_samples, seed=None):
+    """ Latin hypercube samples over parameter ranges.
+
+    ranges maps (engine_name, parameter) to (low, high), or (low, high, "log") to sample uniformly in
+    log space, which suits failure rates spanning orders of magnitude.
+    """
+    rng = np.random.default_rng(seed)
+    samples = base_samples(model, n_samples)
+    for (engine_name, parameter), bounds in ranges.items():
+        _check_parameter(parameter)
+        low, high = float(bounds[0]), float(bounds[1])
+        log_scale = len(bounds) > 2 and bounds[2] == "log"
+        # One sample per stratum, strata shuffled independently per dimension
+        unit = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+        if log_scale:
+            values = np.exp(np.log(low) + unit * (np.log(high) - np.log(low)))
+        else:
+            values = low + unit * (high - low)
+        samples[parameter][:, _engine_index(model, engine_name)] = values
+    return samples
+
+
+def evaluate_sweep(model, samples, ttgs, memory_budget=256 << 20, out=None):
+    """ Total risk of every parameter sample, mode and TTG, shape (n_samples, n_modes, T).
+
+    The plan of the model is evaluated with the sampled engine parameters directly, without rebuilding a
+    RiskModel per sample, in chunks of samples sized so the intermediates stay around memory_budget bytes.
+    out may be a preallocated (e.g. memory-mapped) array for sweeps too large to hold in memory.
+    """
+    plan = model.plan
+    ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+    n_samples = len(samples["failure_rate"])
+    shape = (n_samples, len(plan.modes), len(ttgs))
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape:
+        raise ValueError(f"out must have shape {shape}")
+
+    max_actions = max([mode.n_actions for mode in plan.modes] + [1])
+    bytes_per_sample = 8 * max(len(ttgs), 1) * (len(plan.engine_names) + 3 * max_actions + len(plan.modes))
+    chunk_size = max(1, memory_budget // bytes_per_sample)
+    cost = model._grounding_cost() * 1000
+    for start in range(0, n_samples, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        p_grounding = plan.grounding_probability(ttgs, failure_rate=samples["failure_rate"][chunk],
+                                                 start_time=samples["start_time"][chunk],
+                                                 restart_probability=samples["restart_probability"][chunk])
+        np.multiply(p_grounding, cost, out=out[chunk])
+    return out
+
+
+def trajectory_risk(risks):
+    """ Default sweep metric: total risk over the TTGs with the optimal mode at each, shape (n_samples,) """
+    return risks.min(axis=1).sum(axis=-1)
+
+
+def tornado(model, ttgs, relative_step=0.1, parameters=PARAMETERS, metric=trajectory_risk):
+    """ One-at-a-time sensitivities of a risk metric to every engine parameter.
+
+    Each parameter is moved by -/+ relative_step of its value (restart probabilities are kept within [0, 1])
+    and all perturbed samples are evaluated in one sweep. Returns rows of
+    {"engine", "parameter", "low", "high", "base", "swing"} sorted by decreasing swing = |high - low|.
+    """
+    engine_names = model.plan.engine_names
+    keys = [(engine_name, parameter) for parameter in parameters for engine_name in engine_names]
+    samples = base_samples(model, 2 * len(keys) + 1)  # The last sample is the unperturbed model
+    for row, (engine_name, parameter) in enumerate(keys):
+        column = _engine_index(model, engine_name)
+        value = samples[parameter][0, column]
+        low, high = value * (1 - relative_step), value * (1 + relative_step)
+        if parameter == "restart_probability":
+            low, high = max(low, 0.0), min(high, 1.0)
+        samples[parameter][2 * row, column] = low
+        samples[parameter][2 * row + 1, column] = high
+
+    values = metric(evaluate_sweep(model, samples, ttgs))
+    base = float(values[-1])
+    rows = [{"engine": engine_name, "parameter": parameter, "low": float(values[2 * row]),
+             "high": float(values[2 * row + 1]), "base": base,
+             "swing": float(abs(values[2 * row + 1] - values[2 * row]))}
+            for row, (engine_name, parameter) in enumerate(keys)]
+    return sorted(rows, key=lambda row: row["swing"], reverse=True)
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+def _prefix_sums(values, axis=-1):
+    """ Cumulative sums with a leading zero along axis, so a range [i, j) sums to prefix[j] - prefix[i] """
+    shape = list(np.shape(values))
+    shape[axis] = 1
+    return np.concatenate([np.zeros(shape), np.cumsum(values, axis=axis)], axis=axis)
+
+
+class TrajectoryRiskIndex:
+    """ Risk of a trajectory evaluated once and indexed for range queries over its waypoints or times.
+
+    Every waypoint gets the optimal mode and its risk (as select_mso_mode_batch), and a weight equal to the
+    time it covers: half the spacing to each neighbour, so the weighted risks of the whole trajectory sum to
+    its trapezoidal time integral regardless of the sampling rate. Prefix sums answer total() and
+    total_between() in O(1) and O(log n), a sparse table of argmax positions answers max() and argmax() in
+    O(1), and per-mode prefix counts give mode_counts() and dominant_mode(). Waypoint ranges are half-open,
+    [start, stop), and every query accepts arrays of ranges, evaluated in one vectorized pass. The sparse
+    table holds log2(n) rows of n positions.
+    """
+
+    def __init__(self, model, ttgs, times=None):
+        ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+        n = len(ttgs)
+        if n == 0:
+            raise ValueError("The trajectory needs at least one waypoint")
+        times = np.arange(n, dtype=float) if times is None else np.ravel(np.asarray(times, dtype=float))
+        if len(times) != n:
+            raise ValueError("times must have one entry per TTG")
+        if np.any(np.diff(times) < 0):
+            raise ValueError("times must be non-decreasing")
+        self.mode_names = list(model.mode_names)
+        self.ttgs = ttgs
+        self.times = times
+        self.mode_indices, self.risks = model.select_mso_mode_batch(ttgs)
+
+        # Time covered by every waypoint: from the midpoint with its predecessor to the one with its successor
+        self.cell_edges = np.concatenate([times[:1], (times[1:] + times[:-1]) / 2, times[-1:]])
+        self.weights = np.diff(self.cell_edges)
+        self._weighted = _prefix_sums(self.risks * self.weights)
+        self._plain = _prefix_sums(self.risks)
+        modes = self.mode_indices == np.arange(len(self.mode_names))[:, np.newaxis]
+        self._mode_counts = _prefix_sums(modes.astype(np.int64)).astype(np.int64)  # (n_modes, n + 1)
+
+        # Sparse table: row k holds the argmax of risks[i:i + 2^k], the earliest position on ties
+        dtype = np.int32 if n < 2 ** 31 else np.intp
+        table = [np.arange(n, dtype=dtype)]
+        width = 1
+        while 2 * width <= n:
+            previous = table[-1]
+            left, right = previous[:n - 2 * width + 1], previous[width:n - width + 1]
+            row = previous.copy()
+            row[:n - 2 * width + 1] = np.where(self.risks[right] > self.risks[left], right, left)
+            table.append(row)
+            width *= 2
+        self._table = np.stack(table)
+
+    def __len__(self):
+        return len(self.ttgs)
+
+    def _ranges(self, start, stop, allow_empty=True):
+        start, stop = np.broadcast_arrays(np.asarray(start, dtype=np.intp), np.asarray(stop, dtype=np.intp))
+        if np.any(start < 0) or np.any(stop > len(self)) or np.any(stop < start):
+            raise IndexError(f"Ranges must satisfy 0 <= start <= stop <= {len(self)}")
+        if not allow_empty and np.any(stop == start):
+            raise ValueError("Ranges must not be empty")
+        return start, stop
+
+    def total(self, start=0, stop=None, weighted=True):
+        """ Risk of waypoints [start, stop): time-weighted (an integral over time) or the plain sum of risks """
+        stop = len(self) if stop is None else stop
+        start, stop = self._ranges(start, stop)
+        prefix = self._weighted if weighted else self._plain
+        return prefix[stop] - prefix[start]
+
+    def _cumulative(self, t):
+        """ Time integral of the piecewise-constant risk from the start of the trajectory to time t """
+        t = np.clip(np.asarray(t, dtype=float), self.cell_edges[0], self.cell_edges[-1])
+        cell = np.clip(np.searchsorted(self.cell_edges, t, side="right") - 1, 0, len(self) - 1)
+        return self._weighted[cell] + self.risks[cell] * (t - self.cell_edges[cell])
+
+    def total_between(self, t_start, t_stop):
+        """ Integral of the risk over the time window [t_start, t_stop], each waypoint's risk holding over its cell """
+        return self._cumulative(t_stop) - self._cumulative(t_start)
+
+    def waypoints_between(self, t_start, t_stop):
+        """ Waypoint range (start, stop) of the times in [t_start, t_stop), for the other range queries """
+        return (np.searchsorted(self.times, t_start, side="left"),
+                np.searchsorted(self.times, t_stop, side="left"))
+
+    def argmax(self, start, stop):
+        """ Position of the largest risk in every range [start, stop), the earliest on ties """
+        start, stop = self._ranges(start, stop, allow_empty=False)
+        level = np.frexp(stop - start)[1] - 1  # floor(log2(length)), exact for integers
+        left = self._table[level, start]
+        right = self._table[level, stop - (1 << level)]
+        return np.where(self.risks[right] > self.risks[left], right, left).astype(np.intp)
+
+    def max(self, start, stop):
+        """ Largest risk in every range [start, stop) """
+        return self.risks[self.argmax(start, stop)]
+
+    def mode_counts(self, start, stop):
+        """ Number of waypoints per optimal mode in every range, shape range shape + (n_modes,) """
+        start, stop = self._ranges(start, stop)
+        return np.moveaxis(self._mode_counts[:, stop] - self._mode_counts[:, start], 0, -1)
+
+    def dominant_mode(self, start, stop):
+        """ Mode index selected at the most waypoints of every range [start, stop), the first on ties """
+        return np.argmax(self.mode_counts(start, stop), axis=-1)
@@ -0,0 +1,306 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .sweep import PARAMETERS, _check_parameter, _engine_index, base_samples
+
+# Distributions of propagate_uncertainty, with the allowed lengths of their spec tuples
+DISTRIBUTIONS = {"lognormal": (3,), "beta": (3, 5), "uniform": (3,)}
+
+
+class LogHistogram:
+    """ Mergeable histograms of nonnegative values in log-spaced buckets, for quantiles with bounded relative error.
+
+    Every series (one per entry of offsets, e.g. a mode at a TTG) counts its positive values in n_bins
+    buckets (gamma^(k-1), gamma^k] for k = offset .. offset + n_bins - 1, with gamma = (1 + alpha) / (1 - alpha)
+    for relative accuracy alpha, and its zeros apart. Values outside the window are counted in the edge
+    buckets and the exact minimum and maximum clip the estimates, so quantiles within the window are off by
+    at most alpha (relative). Histograms with the same offsets merge by adding their counts.
+    """
+    __slots__ = ("relative_accuracy", "gamma", "offsets", "counts", "zeros", "minimum", "maximum")
+
+    def __init__(self, offsets, n_bins=1024, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.counts = np.zeros(self.offsets.shape + (n_bins,), dtype=np.int64)
+        self.zeros = np.zeros(self.offsets.shape, dtype=np.int64)
+        self.minimum = np.full(self.offsets.shape, np.inf)
+        self.maximum = np.full(self.offsets.shape, -np.inf)
+
+    @classmethod
+    def fitted(cls, pilot, n_bins=1024, relative_accuracy=0.01):
+        """ Empty histograms whose windows cover the positive values of pilot, shape (n,) + series shape """
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        pilot = np.asarray(pilot, dtype=float)
+        positive = pilot > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.log(pilot) / np.log(gamma)
+        low = np.min(keys, axis=0, initial=np.inf, where=positive)
+        high = np.max(keys, axis=0, initial=-np.inf, where=positive)
+        seen = np.isfinite(high)
+        fallback = high[seen].max() if seen.any() else 0.0  # Series without positive pilot values
+        low, high = np.where(seen, low, fallback), np.where(seen, high, fallback)
+        low, high = np.floor(low), np.ceil(high)
+        spare = n_bins - 1 - (high - low)
+        # Centre the pilot range in the window; if it does not fit, keep its top with a margin for larger values
+        offsets = np.where(spare >= 0, low - np.floor(spare / 2), high + n_bins // 8 - n_bins + 1)
+        return cls(offsets.astype(np.int64), n_bins, relative_accuracy)
+
+    @property
+    def n_bins(self):
+        return self.counts.shape[-1]
+
+    def empty_like(self):
+        return LogHistogram(self.offsets, self.n_bins, self.relative_accuracy)
+
+    def add(self, values):
+        """ Counts values of shape (n,) + offsets.shape """
+        values = np.asarray(values, dtype=float)
+        positive = values > 0
+        self.zeros += len(values) - np.count_nonzero(positive, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.log(values)
+        keys *= 1 / np.log(self.gamma)
+        np.ceil(keys, out=keys)
+        keys -= self.offsets
+        bins = np.clip(keys, 0, self.n_bins - 1, out=keys).astype(np.intp)
+        bins += np.arange(self.offsets.size).reshape(self.offsets.shape) * self.n_bins
+        np.add.at(self.counts.reshape(-1), bins[positive], 1)  # In place, no second array of the counts' size
+        np.minimum(self.minimum, values.min(axis=0, initial=np.inf), out=self.minimum)
+        np.maximum(self.maximum, values.max(axis=0, initial=-np.inf), out=self.maximum)
+
+    def merge(self, other):
+        """ Adds the counts of a histogram with the same offsets, returns self """
+        self.counts += other.counts
+        self.zeros += other.zeros
+        np.minimum(self.minimum, other.minimum, out=self.minimum)
+        np.maximum(self.maximum, other.maximum, out=self.maximum)
+        return self
+
+    def quantile(self, q):
+        """ Estimated q-quantiles (the lower value of the pair around the rank), shape q.shape + offsets.shape """
+        q = np.asarray(q, dtype=float)
+        cumulative = np.cumsum(self.counts, axis=-1) + self.zeros[..., np.newaxis]
+        total = cumulative[..., -1]
+        estimates = np.empty(q.shape + self.offsets.shape)
+        for index, level in np.ndenumerate(q):
+            rank = np.floor(level * np.maximum(total - 1, 0))
+            # Binary search of the first bucket whose cumulative count exceeds the rank
+            low, high = np.zeros(rank.shape, dtype=np.intp), np.full(rank.shape, self.n_bins - 1, dtype=np.intp)
+            while np.any(low < high):
+                middle = (low + high) // 2
+                below = np.take_along_axis(cumulative, middle[..., np.newaxis], axis=-1)[..., 0] <= rank
+                active = low < high
+                low, high = np.where(active & below, middle + 1, low), np.where(active & ~below, middle, high)
+            value = 2 * self.gamma ** (self.offsets + low).astype(float) / (self.gamma + 1)
+            value = np.clip(value, self.minimum, self.maximum)
+            value = np.where(rank == 0, self.minimum, np.where(rank == total - 1, self.maximum, value))  # Exact ends
+            value = np.where(rank < self.zeros, 0.0, value)
+            estimates[index] = np.where(total > 0, value, np.nan)
+        return estimates
+
+
+class UncertaintyResult:
+    """ Risk bands of every mode and of the optimal mode under sampled engine parameters.
+
+    mode_probability (n_modes, T) is the fraction of samples in which each mode is optimal, and risk_mean
+    (n_modes, T) and min_risk_mean (T,) the exact means. bands (len(percentiles), n_modes + 1, T) holds the
+    percentiles of the risk of every mode followed by the optimal mode, within the relative accuracy of the
+    histograms they were read from.
+    """
+    __slots__ = ("mode_names", "ttgs", "n_samples", "percentiles", "mode_probability", "risk_mean", "min_risk_mean",
+                 "bands")
+
+    def __init__(self, mode_names, ttgs, n_samples, percentiles, mode_probability, risk_mean, min_risk_mean, bands):
+        self.mode_names = mode_names
+        self.ttgs = ttgs
+        self.n_samples = n_samples
+        self.percentiles = percentiles
+        self.mode_probability = mode_probability
+        self.risk_mean = risk_mean
+        self.min_risk_mean = min_risk_mean
+        self.bands = bands
+
+    @property
+    def modal_mode(self):
+        """ Index of the mode most often optimal at every TTG, shape (T,) """
+        return np.argmax(self.mode_probability, axis=0)
+
+    def _rows(self, percentiles):
+        """ Rows of bands holding the given percentiles, all of them for None """
+        if percentiles is None:
+            return slice(None)
+        rows = []
+        for percentile in np.ravel(np.asarray(percentiles, dtype=float)):
+            if float(percentile) not in self.percentiles:
+                raise ValueError(f"Percentile {percentile} was not computed, pass it to propagate_uncertainty")
+            rows.append(self.percentiles.index(float(percentile)))
+        return rows
+
+    def risk_percentiles(self, percentiles=None):
+        """ Risk percentiles of every mode (all computed ones by default), shape (len(percentiles), n_modes, T) """
+        return self.bands[self._rows(percentiles), :-1]
+
+    def min_risk_percentiles(self, percentiles=None):
+        """ Percentiles of the risk of the optimal mode (all computed ones by default), shape (len(percentiles), T) """
+        return self.bands[self._rows(percentiles), -1]
+
+
+def _check_distribution(spec):
+    if not spec or spec[0] not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution in {spec}, expected one of {tuple(DISTRIBUTIONS)}")
+    if len(spec) not in DISTRIBUTIONS[spec[0]]:
+        raise ValueError(f"Wrong number of parameters in {spec}")
+
+
+def _draw(rng, spec, n):
+    """ n values of a distribution spec (see propagate_uncertainty) """
+    name = spec[0]
+    if name == "lognormal":
+        return float(spec[1]) * np.exp(float(spec[2]) * rng.standard_normal(n))
+    if name == "beta":
+        low, high = (float(spec[3]), float(spec[4])) if len(spec) == 5 else (0.0, 1.0)
+        return low + (high - low) * rng.beta(float(spec[1]), float(spec[2]), n)
+    return rng.uniform(float(spec[1]), float(spec[2]), n)
+
+
+def _resolve(model, distributions):
+    """ (parameter, engine column, spec) of every distribution, checked against the model """
+    draws = []
+    for (engine_name, parameter), spec in distributions.items():
+        _check_parameter(parameter)
+        _check_distribution(spec)
+        draws.append((parameter, _engine_index(model, engine_name), tuple(spec)))
+    return draws
+
+
+def _generators(seed_sequence, draws):
+    """ One generator per distribution, so chunks of a stream draw the same values as the whole stream.
+
+    The children are built like SeedSequence.spawn() builds them, without advancing seed_sequence, so every
+    TTG block replaying a task gets the same streams.
+    """
+    return [np.random.default_rng(np.random.SeedSequence(seed_sequence.entropy,
+                                                         spawn_key=seed_sequence.spawn_key + (index,)))
+            for index in range(len(draws))]
+
+
+def _draw_samples(base, draws, n, generators):
+    """ n parameter samples: base values (1, n_engines) with the drawn columns replaced """
+    samples = {name: np.repeat(base[name], n, axis=0) for name in PARAMETERS}
+    for (parameter, column, spec), rng in zip(draws, generators):
+        samples[parameter][:, column] = _draw(rng, spec, n)
+    np.clip(samples["restart_probability"], 0.0, 1.0, out=samples["restart_probability"])
+    return samples
+
+
+def sample_parameters(model, distributions, n_samples, seed=None):
+    """ Random engine parameter samples, as {parameter: (n_samples, n_engines) array} for sweep.evaluate_sweep """
+    draws = _resolve(model, distributions)
+    return _draw_samples(base_samples(model), draws, n_samples, _generators(np.random.SeedSequence(seed), draws))
+
+
+def _series_risks(plan, cost, ttgs, samples):
+    """ Risks of every mode followed by the optimal one, (n, n_modes + 1, T), and the optimal mode (n, T) """
+    p_grounding = plan.grounding_probability(ttgs, failure_rate=samples["failure_rate"],
+                                             start_time=samples["start_time"],
+                                             restart_probability=samples["restart_probability"])
+    risks = np.empty((len(p_grounding), len(plan.modes) + 1, len(ttgs)))
+    np.multiply(p_grounding, cost, out=risks[:, :-1])
+    optimal = np.argmin(risks[:, :-1], axis=1)
+    risks[:, -1] = np.take_along_axis(risks[:, :-1], optimal[:, np.newaxis], axis=1)[:, 0]
+    return risks, optimal
+
+
+def _pilot_extremes(plan, cost, ttgs, samples, chunk_size):
+    """ Smallest positive (0 if none) and largest risk of every series over the samples, evaluated in chunks """
+    low = np.full((len(plan.modes) + 1, len(ttgs)), np.inf)
+    high = np.zeros(low.shape)
+    for start in range(0, len(samples["failure_rate"]), chunk_size):
+        risks = _series_risks(plan, cost, ttgs, {name: values[start:start + chunk_size]
+                                                 for name, values in samples.items()})[0]
+        np.minimum(low, np.min(risks, axis=0, initial=np.inf, where=risks > 0), out=low)
+        np.maximum(high, risks.max(axis=0), out=high)
+    return np.array([np.where(np.isfinite(low), low, 0.0), high])
+
+
+def _propagate_block(plan, cost, ttgs, base, draws, sizes, seeds, pilot_seed, n_pilot, chunk_size, n_bins,
+                     relative_accuracy, levels):
+    """ Streams all samples through the plan at a block of TTGs, returns (mode counts, risk sums, quantiles).
+
+    The sample tasks are replayed from their seeds, so every block sees the same samples.
+    """
+    pilot_samples = _draw_samples(base, draws, n_pilot, _generators(pilot_seed, draws))
+    histogram = LogHistogram.fitted(_pilot_extremes(plan, cost, ttgs, pilot_samples, chunk_size), n_bins,
+                                    relative_accuracy)
+    mode_counts = np.zeros((len(plan.modes), len(ttgs)), dtype=np.int64)
+    risk_sums = np.zeros((len(plan.modes) + 1, len(ttgs)))
+    for n_samples, seed in zip(sizes, seeds):
+        generators = _generators(seed, draws)
+        for start in range(0, n_samples, chunk_size):
+            samples = _draw_samples(base, draws, min(chunk_size, n_samples - start), generators)
+            risks, optimal = _series_risks(plan, cost, ttgs, samples)
+            histogram.add(risks)
+            risk_sums += risks.sum(axis=0)
+            for mode_index in range(len(plan.modes)):
+                mode_counts[mode_index] += np.count_nonzero(optimal == mode_index, axis=0)
+    return mode_counts, risk_sums, histogram.quantile(levels)
+
+
+def propagate_uncertainty(model, distributions, ttgs, n_samples, seed=None, n_workers=1, task_size=1 << 16,
+                          memory_budget=64 << 20, percentiles=(5, 50, 95), relative_accuracy=0.01, n_bins=1024,
+                          n_pilot=256):
+    """ Propagates engine parameter distributions through the total risk of a RiskModel at 1-D TTGs.
+
+    distributions maps (engine_name, parameter) to ("lognormal", median, sigma) with sigma the log standard
+    deviation, ("beta", a, b) on [0, 1] or ("beta", a, b, low, high) scaled to [low, high], or
+    ("uniform", low, high); other parameters keep their configured values and restart probabilities are
+    clipped to [0, 1]. Returns an UncertaintyResult with the given risk percentile bands and mode probabilities.
+
+    Neither the sample x TTG risks nor the histograms of all TTGs are held at once. The TTGs are split into
+    blocks whose log-bucket histograms (relative_accuracy, n_bins buckets per series and TTG, fitted to a
+    separate pilot of n_pilot samples) take at most half of memory_budget bytes, the samples are streamed
+    into them in chunks sized to the rest, and only the percentiles are kept of every finished block. The
+    blocks run on n_workers processes, each within memory_budget. Samples are drawn in tasks of task_size
+    seeded from seed, so results do not depend on n_workers or memory_budget.
+    """
+    if n_samples <= 0:
+        raise ValueError("n_samples must be positive")
+    plan = model.plan
+    ttgs = np.ravel(np.asarray(ttgs, dtype=float))
+    cost = model._grounding_cost() * 1000
+    base, draws = base_samples(model), _resolve(model, distributions)
+    levels = np.asarray(percentiles, dtype=float) / 100
+    n_series = len(plan.modes) + 1
+    max_actions = max([mode.n_actions for mode in plan.modes] + [1])
+    # Bytes per TTG of a histogram with the cumulative counts of quantile(), and per sample and TTG of a chunk
+    histogram_bytes = 16 * n_series * (n_bins + 3)
+    sample_bytes = 8 * (len(plan.engine_names) + 3 * max_actions + 5 * n_series)
+    block_size = max(1, min(len(ttgs), memory_budget // 2 // histogram_bytes))
+    chunk_size = max(1, (memory_budget - block_size * histogram_bytes) // (block_size * sample_bytes))
+    if n_workers > 1:
+        block_size = max(1, min(block_size, -(-len(ttgs) // n_workers)))  # Smaller blocks keep every worker busy
+
+    n_tasks = -(-n_samples // task_size)
+    sizes = [min(task_size, n_samples - i * task_size) for i in range(n_tasks)]
+    *seeds, pilot_seed = np.random.SeedSequence(seed).spawn(n_tasks + 1)
+    blocks = [slice(start, start + block_size) for start in range(0, len(ttgs), block_size)]
+    arguments = [(plan, cost, ttgs[block], base, draws, sizes, seeds, pilot_seed, n_pilot, chunk_size, n_bins,
+                  relative_accuracy, levels) for block in blocks]
+    if n_workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_propagate_block, *zip(*arguments)))
+    else:
+        results = [_propagate_block(*args) for args in arguments]
+
+    mode_counts = np.zeros((len(plan.modes), len(ttgs)), dtype=np.int64)
+    risk_sums = np.zeros((n_series, len(ttgs)))
+    bands = np.empty(levels.shape + (n_series, len(ttgs)))
+    for block, (block_mode_counts, block_risk_sums, block_bands) in zip(blocks, results):
+        mode_counts[:, block] = block_mode_counts
+        risk_sums[:, block] = block_risk_sums
+        bands[..., block] = block_bands
+    risk_mean = risk_sums / n_samples
+    return UncertaintyResult(list(model.mode_names), ttgs, n_samples, [float(p) for p in np.ravel(percentiles)],
+                             mode_counts / n_samples, risk_mean[:-1], risk_mean[-1], bands)
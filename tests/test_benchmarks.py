@@ -0,0 +1,27 @@
+import copy
+import json
+import unittest
+from risk_model.benchmarks import compare_to_baseline, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_report_and_baseline(self):
+        report = run_benchmarks(sizes=(1, 1000), max_scalar=100, startup_repeats=1, raster_size=64)
+        report = json.loads(json.dumps(report))  # Machine-readable
+        self.assertEqual(report["results"]["RiskModel_default.batch_1000"]["sampled"], 100)
+        self.assertIn("risk_model.batch_1000", report["results"])
+        self.assertIn("mode_agreement", report["agreement"])
+        self.assertIn("risk_model.startup_cached", report["results"])
+        self.assertIn("risk_model.raster_64x64", report["results"])
+        self.assertEqual(compare_to_baseline(report, report), [])
+
+        baseline = copy.deepcopy(report)
+        baseline["results"]["risk_model.batch_1000"]["throughput"] *= 2
+        baseline["results"]["risk_model.batch_1000"]["peak_bytes"] = 0
+        regressions = compare_to_baseline(report, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(message.startswith("risk_model.batch_1000:") for message in regressions))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.bulk import evaluate_memmap, output_paths
+
+class TestEvaluateMemmap(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.random.default_rng(3).uniform(0, 1500, 10007)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_outputs(self, prefix):
+        mode_indices, risks = self.model.select_mso_mode_batch(self.ttgs)
+        paths = output_paths(prefix)
+        np.testing.assert_array_equal(np.load(paths["mode"]), mode_indices)
+        np.testing.assert_allclose(np.load(paths["risk"]), risks)
+        np.testing.assert_allclose(np.load(paths["grounding"]) * self.model._grounding_cost() * 1000, risks)
+
+    def test_npy_input(self):
+        input_path = os.path.join(self.directory.name, "ttg.npy")
+        np.save(input_path, self.ttgs)
+        prefix = os.path.join(self.directory.name, "out")
+        offsets = []
+        end = evaluate_memmap(self.model, input_path, prefix, window=1000, progress=offsets.append)
+        self.assertEqual(end, self.ttgs.nbytes)
+        self.assertEqual(offsets[0], 8000)
+        self.assertEqual(len(offsets), 11)
+        self.check_outputs(prefix)
+
+    def test_raw_input_resume(self):
+        input_path = os.path.join(self.directory.name, "ttg.f4")
+        self.ttgs = self.ttgs.astype(np.float32)
+        self.ttgs.tofile(input_path)
+        prefix = os.path.join(self.directory.name, "out")
+
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(offset):
+            if offset >= 12000:
+                raise Interrupted(offset)
+
+        with self.assertRaises(Interrupted) as raised:
+            evaluate_memmap(self.model, input_path, prefix, window=1000, raw_dtype=np.float32, progress=interrupt)
+        offset = raised.exception.args[0]
+        evaluate_memmap(self.model, input_path, prefix, window=1000, raw_dtype=np.float32, resume_offset=offset)
+        self.check_outputs(prefix)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+from risk_model.config_cache import load_model
+from risk_model.risk_model import RiskModel, config_path
+
+
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.config = os.path.join(self.directory, "ship_config.json")
+        shutil.copy(config_path("ship_config.json"), self.config)
+        self.ttgs = np.linspace(0, 2000, 101)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cached_model(self):
+        expected = RiskModel(self.config).compute_total_risk_batch(self.ttgs)
+        built = load_model(self.config, cache_dir=self.cache_dir)
+        (artifact,) = os.listdir(self.cache_dir)
+        cached = load_model(self.config, cache_dir=self.cache_dir)
+        self.assertIsNot(cached, built)
+        self.assertIsNotNone(cached._mode_schedule)  # Stored with the model
+        np.testing.assert_array_equal(cached.compute_total_risk_batch(self.ttgs), expected)
+        np.testing.assert_array_equal(cached.select_mso_mode_batch(self.ttgs)[0],
+                                      built.select_mso_mode_batch(self.ttgs)[0])
+
+        # A changed config is parsed again and replaces the artifact
+        with open(self.config) as file:
+            config = json.load(file)
+        config["grouding_cost"]["ship_damage"] = "200000"
+        with open(self.config, "w") as file:
+            json.dump(config, file)
+        changed = load_model(self.config, cache_dir=self.cache_dir)
+        self.assertFalse(np.allclose(changed.compute_total_risk_batch(self.ttgs), expected))
+        self.assertEqual(os.listdir(self.cache_dir), [artifact])
+
+        # A corrupt artifact is rebuilt
+        with open(os.path.join(self.cache_dir, artifact), "wb") as file:
+            file.write(b"not a pickle")
+        np.testing.assert_array_equal(load_model(self.config, cache_dir=self.cache_dir).compute_total_risk_batch(self.ttgs),
+                                      changed.compute_total_risk_batch(self.ttgs))
+
+    def test_lazy_plotting_import(self):
+        code = "import sys, risk_model.risk_model; print('matplotlib' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
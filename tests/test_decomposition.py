@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.decomposition import COST_COMPONENTS
+
+
+class TestRiskDecomposition(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.concatenate([np.linspace(0, 600, 61), [12, 35, 50, 1e6]])
+
+    def test_matches_model(self):
+        decomposition = self.model.decompose_risk(self.ttgs)
+        np.testing.assert_array_equal(decomposition.risk, self.model.compute_total_risk_batch(self.ttgs).T)
+        mode_indices, min_risks = self.model.select_mso_mode_batch(self.ttgs)
+        np.testing.assert_allclose(decomposition.min_risk, min_risks, rtol=1e-12)
+        np.testing.assert_allclose(decomposition.component_risk.sum(axis=1), min_risks, rtol=1e-12)
+        for i, mode in enumerate(self.model.mode_names):
+            np.testing.assert_allclose(decomposition.p_no_recovery[:, i],
+                                       self.model.compute_recovery_probability_batch(self.ttgs, mode), rtol=1e-12)
+
+    def test_recovery_cost_is_counted(self):
+        self.assertEqual(self.model.cost_recovery, 200000)
+        self.assertEqual(self.model._grounding_cost(), self.model.cost_components().sum())
+        decomposition = self.model.decompose_risk(self.ttgs)
+        self.assertEqual(decomposition.component_names[decomposition.dominant_component], "recovery")
+        recovery = decomposition.component_risk[:, COST_COMPONENTS.index("recovery")]
+        np.testing.assert_allclose(recovery, decomposition.min_risk * 200000 / self.model._grounding_cost())
+
+    def test_scenarios(self):
+        ttg = 100.0
+        decomposition = self.model.decompose_risk([ttg])
+        # PTI: Restart Engine 2 | Restart Engine 3 | Start Engine 1 | Restart Engine 4
+        pti = self.model.mode_names.index("PTI")
+        expected = [0.5 * np.exp(-35 / ttg), 0.5 * np.exp(-35 / ttg), np.exp(-50 / ttg), 0.8 * np.exp(-12 / ttg)]
+        self.assertEqual(decomposition.n_scenarios[pti], 4)
+        np.testing.assert_allclose(decomposition.p_scenario[0, pti, :4], expected, rtol=1e-12)
+        self.assertEqual(decomposition.dominant_scenario[0, pti], 3)
+        self.assertTrue(np.all(self.model.decompose_risk([1.0]).dominant_scenario == -1))  # Below every start time
+
+    def test_fault_tree_scenarios(self):
+        plain = self.model.decompose_risk(self.ttgs)
+        fault_tree = RiskModel(fault_tree=True).decompose_risk(self.ttgs)
+        np.testing.assert_allclose(fault_tree.p_scenario, plain.p_scenario, rtol=1e-12, atol=1e-15)
+        self.assertEqual(fault_tree.mode_component_risk().shape, (len(self.ttgs), 3, len(COST_COMPONENTS)))
+
+
+if __name__ == "__main__":
+    unittest.main()
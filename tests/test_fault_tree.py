@@ -0,0 +1,138 @@
+import itertools
+import unittest
+import numpy as np
+from risk_model.fault_tree import build_restoration_bdd
+from risk_model.monte_carlo import simulate_grounding_probability
+from risk_model.plan import FaultTreeModePlan
+from risk_model.risk_model import RiskModel
+
+
+def holds(scenarios, outcome):
+    """ Reference: evaluates the scenario expression for one boolean outcome per event """
+    def operand(op):
+        if isinstance(op, tuple):
+            k, members = op
+            return sum(outcome[m] for m in members) >= k
+        return outcome[op]
+    return any(all(operand(op) for op in term) for scenario in scenarios for term in scenario)
+
+
+def enumerate_probability(scenarios, p):
+    """ Reference: sums the probability of every event outcome satisfying the scenarios """
+    total = 0.0
+    for outcome in itertools.product([False, True], repeat=len(p)):
+        if holds(scenarios, outcome):
+            total += np.prod([p[i] if o else 1 - p[i] for i, o in enumerate(outcome)])
+    return total
+
+
+def random_scenarios(rng, n_events):
+    scenarios = []
+    for _ in range(rng.integers(1, 4)):
+        terms = []
+        for _ in range(rng.integers(1, 3)):
+            term = []
+            for _ in range(rng.integers(1, 4)):
+                if n_events > 1 and rng.random() < 0.25:
+                    members = list(rng.choice(n_events, size=rng.integers(2, n_events + 1), replace=False))
+                    term.append((int(rng.integers(1, len(members) + 1)), [int(m) for m in members]))
+                else:
+                    term.append(int(rng.integers(n_events)))
+            terms.append(term)
+        scenarios.append(terms)
+    return scenarios
+
+
+class TestFaultTree(unittest.TestCase):
+    def test_matches_enumeration(self):
+        rng = np.random.default_rng(11)
+        for _ in range(40):
+            n_events = int(rng.integers(1, 7))
+            scenarios = random_scenarios(rng, n_events)
+            bdd = build_restoration_bdd(scenarios, n_events)
+            p = rng.random((n_events, 3))
+            expected = [enumerate_probability(scenarios, p[:, t]) for t in range(3)]
+            np.testing.assert_allclose(bdd.probability(p), expected, atol=1e-12)
+            self.assertAlmostEqual(bdd.probability_scalar(list(p[:, 0])), expected[0])
+
+    def test_gradient(self):
+        rng = np.random.default_rng(4)
+        scenarios = random_scenarios(rng, 5)
+        bdd = build_restoration_bdd(scenarios, 5)
+        p = rng.random((2, 5, 4))  # Leading parameter axis
+        value, gradient = bdd.probability_and_gradient(p, memory_budget=256)  # Forces several chunks
+        np.testing.assert_allclose(value, bdd.probability(p))
+        step = 1e-6
+        for e in range(5):
+            shifted = p.copy()
+            shifted[:, e] += step
+            np.testing.assert_allclose(gradient[:, e], (bdd.probability(shifted) - value) / step, atol=1e-5)
+
+    def test_or_config(self):
+        config = {
+            "ship_configuration": {"ship_model": "Test", "length": "80", "width": "16", "mass": "70"},
+            "grouding_cost": {"ship_damage": "1", "recovery": "0", "cargo": "0", "environment": "0",
+                              "infrastructure": "0", "reputation": "0"},
+            "engines": [{"engine_name": name, "failure_rate": "1e-3", "start_time": start, "restart_probability": "0.5"}
+                        for name, start in (("ME", "50"), ("DG1", "30"), ("DG2", "30"))],
+            "modes": [
+                {"mode_name": "OR", "scenarios": [
+                    {"action": "Start Engine 2", "operation": "OR"},
+                    {"action": "Start Engine 3", "operation": "AND"},
+                    {"action": "Restart Engine 1", "operation": "Terminate"},
+                    {"action": "Start Engine 2", "operation": "Terminate"}]},
+                {"mode_name": "2oo3", "scenarios": [
+                    {"action": ["Start Engine 1", "Start Engine 2", "Start Engine 3"], "k": 2,
+                     "operation": "Terminate"}]},
+                {"mode_name": "AND", "scenarios": [
+                    {"action": "Restart Engine 1", "operation": "Terminate"},
+                    {"action": "Start Engine 2", "operation": "AND"},
+                    {"action": "Start Engine 3", "operation": "Terminate"}]},
+                {"mode_name": "SHARED", "scenarios": [
+                    {"action": "Start Engine 2", "operation": "AND"},
+                    {"action": "Start Engine 3", "operation": "Terminate"},
+                    {"action": "Start Engine 2", "operation": "Terminate"}]},
+            ],
+        }
+        model = RiskModel.from_config(config)
+        # One OR mode puts every mode under the shared-event semantics, AND-only ones included
+        self.assertTrue(all(isinstance(mode, FaultTreeModePlan) for mode in model.plan.modes))
+
+        ttgs = np.array([20.0, 40.0, 120.0])
+        a, b, c = (np.exp(-s / ttgs) * (ttgs > s) for s in (30.0, 30.0, 50.0))  # DG1 start, DG2 start, ME restart
+        c = 0.5 * c
+        # (DG1 OR (DG2 AND ME restart)) OR DG1, with the DG1 start shared
+        p_restored = a + (1 - a) * b * c
+        np.testing.assert_allclose(model.compute_recovery_probability_batch(ttgs, "OR"), 1 - p_restored)
+        self.assertAlmostEqual(model.compute_recovery_probability(120.0, "OR"), 1 - p_restored[-1])
+        me = np.exp(-50 / ttgs) * (ttgs > 50)
+        two_of_three = me * a + me * b + a * b - 2 * me * a * b
+        np.testing.assert_allclose(model.compute_recovery_probability_batch(ttgs, "2oo3"), 1 - two_of_three)
+
+        # (DG1 AND DG2) OR DG1 is DG1 with the start shared, and 1 - (1 - a * b)(1 - a) as independent actions
+        np.testing.assert_allclose(model.compute_recovery_probability_batch(ttgs, "SHARED"), 1 - a)
+        sequential = dict(config, modes=config["modes"][2:])
+        sequential_model = RiskModel.from_config(sequential)
+        self.assertFalse(any(isinstance(mode, FaultTreeModePlan) for mode in sequential_model.plan.modes))
+        np.testing.assert_allclose(sequential_model.compute_recovery_probability_batch(ttgs, "SHARED"),
+                                   (1 - a * b) * (1 - a))
+        self.assertTrue(all(isinstance(mode, FaultTreeModePlan)
+                            for mode in RiskModel.from_config(sequential, fault_tree=True).plan.modes))
+
+        # Scenarios on their own: the OR mode's first scenario is DG1 OR (DG2 AND ME restart), its second DG1
+        decomposition = model.decompose_risk(ttgs)
+        np.testing.assert_allclose(decomposition.p_scenario[:, 0, 0], p_restored)
+        np.testing.assert_allclose(decomposition.p_scenario[:, 0, 1], a)
+
+        # Without shared events the fault tree agrees with the sequential evaluation
+        risk = model.compute_total_risk_batch(ttgs)
+        np.testing.assert_allclose(sequential_model.compute_total_risk_batch(ttgs)[0], risk[2])
+        gradients = model.compute_total_risk_gradient(ttgs)
+        np.testing.assert_allclose(gradients.risk, risk)
+
+        result = simulate_grounding_probability(model, ttgs, 20000, seed=1)
+        np.testing.assert_allclose(result.p_no_recovery, result.analytic_p_no_recovery, atol=0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import json
+import os
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.fleet import FleetRiskEvaluator
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "risk_model", "data", "ship_config.json")
+
+class TestFleetRiskEvaluator(unittest.TestCase):
+    def test_jobs_match_single_process(self):
+        with open(CONFIG_PATH) as file:
+            other_config = json.load(file)
+        other_config["engines"][0]["start_time"] = "20"
+        ttgs = np.random.default_rng(7).uniform(0, 1000, 5000)
+
+        with FleetRiskEvaluator(max_workers=2, shard_size=1000) as evaluator:
+            results = evaluator.evaluate([("ship_config.json", ttgs), (other_config, ttgs[:1500]),
+                                          (os.path.abspath(CONFIG_PATH), [])])
+            stats = evaluator.worker_stats
+        self.assertEqual(sum(s["samples"] for s in stats.values()), 6500)
+        self.assertEqual(sum(s["shards"] for s in stats.values()), 7)
+
+        for result, model, samples in [(results[0], RiskModel(), ttgs),
+                                       (results[1], RiskModel.from_config(other_config), ttgs[:1500])]:
+            mode_indices, risks = model.select_mso_mode_batch(samples)
+            np.testing.assert_array_equal(result.mode_indices, mode_indices)
+            np.testing.assert_allclose(result.risks, risks)
+        self.assertEqual(len(results[2].risks), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.sweep import base_samples, evaluate_sweep
+
+class TestRiskGradients(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        # Away from the start times, where the risk jumps
+        self.ttgs = np.array([5.0, 20.0, 40.0, 70.0, 150.0, 600.0, 5000.0])
+
+    def test_values_and_ttg_derivative(self):
+        gradients = self.model.compute_total_risk_gradient(self.ttgs)
+        np.testing.assert_allclose(gradients.risk, self.model.compute_total_risk_batch(self.ttgs))
+        h = 1e-4 * self.ttgs
+        numeric = (self.model.compute_total_risk_batch(self.ttgs + h)
+                   - self.model.compute_total_risk_batch(self.ttgs - h)) / (2 * h)
+        np.testing.assert_allclose(gradients.d_ttg, numeric, rtol=1e-6, atol=1e-12)
+        np.testing.assert_array_equal(gradients.d_ttg[:, 0], 0)  # Below every start time
+
+    def test_engine_parameter_derivatives(self):
+        gradients = self.model.compute_total_risk_gradient(self.ttgs)
+        # Failure rates of ~1e-9 need a larger relative step to stay clear of rounding in 1 - rate
+        for parameter, derivative, step in [("failure_rate", gradients.d_failure_rate, 1e-2),
+                                            ("start_time", gradients.d_start_time, 1e-6),
+                                            ("restart_probability", gradients.d_restart_probability, 1e-6)]:
+            for engine in range(len(gradients.engine_names)):
+                samples = base_samples(self.model, 2)
+                h = step * samples[parameter][0, engine]
+                samples[parameter][0, engine] += h
+                samples[parameter][1, engine] -= h
+                risks = evaluate_sweep(self.model, samples, self.ttgs)
+                numeric = (risks[0] - risks[1]) / (2 * h)
+                np.testing.assert_allclose(derivative[:, engine], numeric, rtol=1e-5, atol=1e-9,
+                                           err_msg=f"{parameter} of engine {engine}")
+
+    def test_select(self):
+        gradients = self.model.compute_total_risk_gradient(self.ttgs)
+        mode_indices, risks = self.model.select_mso_mode_batch(self.ttgs)
+        selected = gradients.select(mode_indices)
+        np.testing.assert_allclose(selected.risk, risks)
+        self.assertEqual(selected.d_start_time.shape, (4, len(self.ttgs)))
+        np.testing.assert_array_equal(selected.d_start_time[:, 3],
+                                      gradients.d_start_time[mode_indices[3], :, 3])
+
+if __name__ == "__main__":
+    unittest.main()
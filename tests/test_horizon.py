@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.horizon import RollingRiskHorizon
+
+
+class TestRollingRiskHorizon(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.rng = np.random.default_rng(3)
+
+    def check(self, horizon, ttgs):
+        """ Compares the incremental state with a full evaluation of ttgs """
+        np.testing.assert_array_equal(horizon.ttgs, ttgs)
+        risks = self.model.compute_total_risk_batch(ttgs)
+        modes = np.argmin(risks, axis=0)
+        min_risks = risks[modes, np.arange(len(ttgs))]
+        np.testing.assert_array_equal(horizon.risks, risks)
+        np.testing.assert_array_equal(horizon.mode_indices, modes)
+        self.assertAlmostEqual(horizon.total_risk, min_risks.sum(), delta=1e-9 * max(min_risks.sum(), 1))
+        self.assertEqual(horizon.max_risk, min_risks.max())
+        self.assertEqual(min_risks[horizon.argmax_risk()], min_risks.max())
+        starts = np.concatenate([[0], np.flatnonzero(modes[1:] != modes[:-1]) + 1])
+        expected = [(int(start), int(end), self.model.mode_names[modes[start]])
+                    for start, end in zip(starts, np.append(starts[1:], len(ttgs)))]
+        self.assertEqual(horizon.segments(), expected)
+        self.assertEqual(horizon.n_segments, len(expected))
+
+    def test_incremental_updates(self):
+        # A slowly varying TTG profile crossing the mode boundaries, so segments appear and disappear
+        profile = 400 + 350 * np.sin(np.arange(2000) / 40)
+        horizon = RollingRiskHorizon(self.model, capacity=150, ttgs=profile[:120])
+        self.check(horizon, profile[:120])
+        start, length = 0, 120
+        for step in range(60):
+            shift = int(self.rng.integers(0, 6))
+            start, length = start + shift, int(np.clip(length + self.rng.integers(-3, 4), 1, 150))
+            ttgs = profile[start:start + length].copy()
+            changed = self.rng.choice(length, size=min(3, length), replace=False)
+            ttgs[changed] += self.rng.normal(0, 30, len(changed))
+            before = horizon.n_evaluated
+            evaluated = horizon.update(ttgs, shift)
+            self.assertEqual(horizon.n_evaluated - before, len(evaluated))
+            self.assertLessEqual(len(evaluated), 3 + shift + 3 + 3)  # Changed, appended and previously perturbed
+            self.check(horizon, ttgs)
+            profile[start:start + length] = ttgs  # The published horizon is the new truth
+
+        evaluated = horizon.advance(profile[start + length:start + length + 10])
+        self.assertEqual(len(evaluated), 10)
+        self.check(horizon, profile[start + 10:start + length + 10])
+        self.assertEqual(len(horizon.set([0, 1], horizon.ttgs[:2] + [0.0, 5.0])), 1)
+        with self.assertRaises(ValueError):
+            horizon.advance(np.ones(200), shift=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import unittest
+import numpy as np
+from risk_model.risk_model import RiskModel
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        model = RiskModel()
+        model.mode_schedule()  # Built outside the measured window, its sampling is instrumented too
+        plain = model.compute_total_risk
+        instrumentation = model.enable_instrumentation()
+        model.select_mso_mode(100.0)
+        model.compute_total_risk(100.0, "PTO")
+        model.select_mso_mode_batch(np.array([5.0, 50.0, 500.0, 5000.0, np.nan]))
+
+        snapshot = json.loads(instrumentation.to_json())
+        methods = snapshot["methods"]
+        self.assertEqual(methods["select_mso_mode"]["calls"], 1)
+        self.assertEqual(methods["compute_total_risk"]["calls"], 1)
+        self.assertEqual(methods["compute_machinery_failure_probability"]["calls"], 1)  # Nested call is counted
+        self.assertGreaterEqual(methods["compute_total_risk"]["seconds"], 0)
+        self.assertEqual(snapshot["batch_sizes"]["1-1"], 2)
+        self.assertEqual(snapshot["batch_sizes"]["4-7"], 1)
+        self.assertEqual(snapshot["ttg_histogram"]["<=10"], 1)
+        self.assertEqual(snapshot["ttg_histogram"][">3600"], 1)
+        self.assertEqual(snapshot["ttg_nan"], 1)
+        self.assertEqual(snapshot["ttg_range"], [5.0, 5000.0])
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot()["methods"]["select_mso_mode"]["calls"], 0)
+        self.assertIsNone(instrumentation.snapshot()["ttg_range"])
+        model.select_mso_mode(100.0)  # The wrappers installed before the reset still count
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot["methods"]["select_mso_mode"]["calls"], 1)
+        self.assertEqual(snapshot["batch_sizes"], {"1-1": 1})
+
+        final = model.disable_instrumentation()
+        self.assertEqual(final["methods"]["select_mso_mode"]["calls"], 1)
+        self.assertEqual(model.compute_total_risk, plain)  # Plain methods again, no overhead
+        self.assertNotIn("compute_total_risk", vars(model))
+
+    def test_profiles(self):
+        model = RiskModel()
+        ttgs = np.linspace(0, 2000, 20000)
+        with model.profile() as capture:
+            model.compute_total_risk_batch(ttgs)
+        functions = [row["function"] for row in capture.stats["functions"]]
+        self.assertTrue(any("compute_total_risk_batch" in function for function in functions))
+        with model.profile("sampling", interval=0.0005) as capture:
+            for _ in range(200):
+                model.compute_total_risk_batch(ttgs)
+        self.assertGreater(capture.stats["samples"], 0)
+        json.dumps(capture.stats)
+        with self.assertRaises(ValueError):
+            with model.profile("unknown"):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
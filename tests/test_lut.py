@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.risk_model import config_path
+from risk_model.lut import RiskLUT
+from risk_model.schedule import ModeSchedule
+
+class TestRiskLUT(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+
+    def test_error_bound(self):
+        tol, rtol = 1e-7, 1e-6
+        lut = self.model.build_lut(3600, tol, rtol)
+        ttgs = np.concatenate([np.random.default_rng(1).uniform(0, 3600, 20000), self.model.plan.start_time])
+        exact = self.model.compute_total_risk_batch(ttgs)
+        error = np.abs(lut.risk_matrix(ttgs) - exact)
+        self.assertTrue(np.all(error <= tol + rtol * np.abs(exact)))
+        self.assertLessEqual(lut.error_ratio, 1.0)
+        self.assertLessEqual(lut.max_error, tol + rtol * np.abs(exact).max())
+
+    def test_zero_start_time(self):
+        with open(config_path("ship_config.json")) as file:
+            config = json.load(file)
+        config["engines"][3]["start_time"] = "0"
+        model = RiskModel.from_config(config)
+        lut = model.build_lut(600, 1e-6)
+        # The jump at 0 is a cut with its float neighbour, rather than an interval halved towards 0
+        self.assertEqual(lut.nodes[1], np.nextafter(0.0, np.inf))
+        self.assertEqual(np.count_nonzero((lut.nodes > 0) & (lut.nodes < 1e-3)), 1)
+        ttgs = np.linspace(0, 600, 10001)[1:]
+        np.testing.assert_allclose(lut.risk_matrix(ttgs), model.compute_total_risk_batch(ttgs), atol=1e-6)
+
+    def test_verification_refines(self):
+        class Bump:
+            """ Linear risk with a narrow bump between the quarter points of the initial grid on [0, 15] """
+            mode_names = ["A"]
+            plan = type("Plan", (), {"start_time": np.array([])})
+            peak = 3 * 15 / 128  # A point of the first verification grid, 0.1 away from 0.25 and 0.5
+
+            def compute_total_risk_batch(self, ttgs):
+                ttgs = np.asarray(ttgs, dtype=float)
+                return (0.1 * ttgs + np.exp(-0.5 * ((ttgs - self.peak) / 0.01) ** 2))[np.newaxis]
+
+            def mode_schedule(self):
+                return ModeSchedule([], [0], self.mode_names)
+
+        model = Bump()
+        lut = RiskLUT.build(model, 15.0, 1e-3)
+        self.assertLessEqual(lut.error_ratio, 1.0)
+        self.assertGreater(len(lut.nodes), 16)  # Nodes added for the verification, the quarter points all pass
+        self.assertLessEqual(abs(lut.total_risk(model.peak, "A") - model.compute_total_risk_batch(model.peak)[0]),
+                             1e-3)
+
+    def test_out_of_range(self):
+        lut = self.model.build_lut(100, 1e-6)
+        risks = lut.risk_matrix([-5.0, 0.0, 150.0])
+        np.testing.assert_allclose(risks[:, 0], risks[:, 1])
+        self.assertTrue(np.all(np.isnan(risks[:, 2])))
+
+    def test_select_and_round_trip(self):
+        lut = self.model.build_lut(3600, 1e-6)
+        ttgs = np.linspace(0, 3600, 1001)
+        mode_indices, _ = lut.select_mso_mode(ttgs)
+        np.testing.assert_array_equal(mode_indices, self.model.select_mso_mode_batch(ttgs)[0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lut.npz")
+            lut.save(path)
+            loaded = RiskLUT.load(path)
+        self.assertEqual(loaded.mode_names, lut.mode_names)
+        np.testing.assert_array_equal(loaded.risk_matrix(ttgs), lut.risk_matrix(ttgs))
+        np.testing.assert_array_equal(loaded.select_mso_mode(ttgs)[0], mode_indices)
+
+if __name__ == "__main__":
+    unittest.main()
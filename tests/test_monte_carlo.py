@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.monte_carlo import simulate_grounding_probability
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.array([10.0, 40.0, 100.0, 1000.0])
+
+    def test_independent_matches_analytic(self):
+        result = simulate_grounding_probability(self.model, self.ttgs, 200000, seed=11)
+        analytic = result.analytic_p_no_recovery
+        standard_error = np.sqrt(analytic * (1 - analytic) / result.n_samples)
+        z = np.abs(result.p_no_recovery - analytic) / np.maximum(standard_error, 1e-12)
+        self.assertTrue(np.all(z < 5))
+        np.testing.assert_allclose(result.analytic_p_grounding[:, 0],
+                                   [self.model.compute_grounding_probability(10.0, m) for m in self.model.mode_names])
+        low, high = result.p_grounding_ci
+        self.assertTrue(np.all(low <= high))
+
+    def test_reproducible_across_workers(self):
+        serial = simulate_grounding_probability(self.model, self.ttgs, 30000, seed=4, task_size=10000)
+        parallel = simulate_grounding_probability(self.model, self.ttgs, 30000, seed=4, task_size=10000, n_workers=2)
+        np.testing.assert_array_equal(serial.p_no_recovery, parallel.p_no_recovery)
+
+    def test_shared_events(self):
+        result = simulate_grounding_probability(self.model, self.ttgs, 20000, seed=1, independent=False,
+                                                start_time_sigma=0.2)
+        self.assertEqual(result.p_no_recovery.shape, (3, 4))
+        # Below every start time no scenario can finish
+        np.testing.assert_array_equal(result.p_no_recovery[:, 0], 1.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from risk_model.plan import compile_plan, parse_action, START, RESTART
+
+ENGINES = {
+    "ME": {"failure_rate": 1e-3, "start_time": 50.0, "restart_probability": 0.4},
+    "DG": {"failure_rate": 2e-3, "start_time": 30.0, "restart_probability": 0.5},
+}
+ENGINE_MAP = {"Engine 1": "ME", "Engine 2": "DG"}
+
+class TestPlan(unittest.TestCase):
+    def test_parse_action(self):
+        self.assertEqual(parse_action("Restart Engine 1"), (RESTART, "Engine 1"))
+        self.assertEqual(parse_action("Start Engine 12"), (START, "Engine 12"))
+        with self.assertRaises(ValueError):
+            parse_action("Stop Engine 1")
+
+    def test_scenario_groups(self):
+        modes = [{"mode_name": "A", "scenarios": [
+            {"action": "Restart Engine 1", "operation": "Terminate"},
+            {"action": "Start Engine 2", "operation": "AND"},
+            {"action": "Start Engine 9", "operation": "AND"},  # Unknown engine, skipped
+            {"action": "Start Engine 1", "operation": "Terminate"},
+            {"action": "Start Engine 2", "operation": "AND"},  # Never terminated
+        ]}]
+        plan = compile_plan(ENGINES, ENGINE_MAP, modes)
+        mode = plan.modes[0]
+        np.testing.assert_array_equal(mode.engine_indices, [0, 1, 0])
+        np.testing.assert_array_equal(mode.action_kinds, [RESTART, START, START])
+        np.testing.assert_array_equal(mode.group_offsets, [0, 1])
+        self.assertAlmostEqual(mode.failure_probability, 1 - (1 - 1e-3) ** 2 * (1 - 2e-3) ** 2)
+
+        ttg = 100.0
+        p_restart = 0.4 * np.exp(-50 / ttg)
+        p_pair = np.exp(-30 / ttg) * np.exp(-50 / ttg)
+        p_grounding = plan.grounding_probability(np.array([ttg, 20.0]))
+        self.assertAlmostEqual(p_grounding[0, 0], mode.failure_probability * (1 - p_restart) * (1 - p_pair))
+        self.assertAlmostEqual(p_grounding[0, 1], mode.failure_probability)
+
+    def test_parameter_sets_broadcast(self):
+        modes = [{"mode_name": "A", "scenarios": [{"action": "Restart Engine 1", "operation": "Terminate"}]}]
+        plan = compile_plan(ENGINES, ENGINE_MAP, modes)
+        start_time = np.array([[50.0, 30.0], [10.0, 30.0]])
+        p_grounding = plan.grounding_probability(np.array([40.0, 100.0]), start_time=start_time)
+        self.assertEqual(p_grounding.shape, (2, 1, 2))
+        np.testing.assert_allclose(p_grounding[0, 0], plan.grounding_probability(np.array([40.0, 100.0]))[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+from risk_model.plotting import LiveRiskPlot, decimate_lttb, decimate_minmax, mode_runs, mode_spans, plot_risk_profile
+from risk_model.risk_model import RiskModel
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+except ImportError:
+    Figure = None
+
+
+class TestDecimation(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.linspace(0, 2000, 200001)
+        self.mode_indices, self.risks = self.model.select_mso_mode_batch(self.ttgs)
+
+    def test_minmax_keeps_column_extremes(self):
+        keep = decimate_minmax(self.ttgs, self.risks, 100)
+        self.assertLessEqual(len(keep), 202)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertEqual((keep[0], keep[-1]), (0, len(self.ttgs) - 1))
+        columns = np.minimum((self.ttgs / 20).astype(int), 99)
+        for column in (0, 3, 50, 99):
+            inside = columns == column
+            kept = keep[columns[keep] == column]
+            self.assertEqual(self.risks[kept].max(), self.risks[inside].max())
+            self.assertEqual(self.risks[kept].min(), self.risks[inside].min())
+        np.testing.assert_array_equal(decimate_minmax(self.ttgs[:50], self.risks[:50], 100), np.arange(50))
+
+    def test_lttb_and_mode_regions(self):
+        keep = decimate_lttb(self.ttgs, self.risks, 300)
+        self.assertEqual(len(keep), 300)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        # The step at the shortest start time is kept within one bucket
+        step = np.argmax(np.abs(np.diff(self.risks)))
+        self.assertLessEqual(np.min(np.abs(keep - step)), len(self.ttgs) // 298)
+
+        rows = self.model.mode_schedule().rows()
+        crossing = rows[0][1]
+        self.assertEqual(mode_spans(rows, 0.0, 2000.0),
+                         [(0.0, crossing, rows[0][2]), (crossing, 2000.0, rows[1][2])])
+        runs = mode_runs(self.ttgs, self.mode_indices, self.model.mode_names)
+        self.assertEqual([mode for _, _, mode in runs], [mode for _, _, mode in rows])
+        self.assertAlmostEqual(runs[0][1], crossing, delta=0.01)
+
+    @unittest.skipIf(Figure is None, "matplotlib is not installed")
+    def test_plots(self):
+        ax = Figure().add_subplot()
+        line = plot_risk_profile(self.ttgs, self.risks, ax, schedule=self.model.mode_schedule().rows(), width=200)
+        self.assertLessEqual(len(line.get_xdata()), 402)
+        self.assertEqual(len(ax.patches), 2)
+
+        live = LiveRiskPlot(Figure().add_subplot(), self.model.mode_names, width=50)
+        for chunk in np.array_split(np.arange(len(self.ttgs)), 40):
+            live.extend(self.ttgs[chunk], self.risks[chunk], self.mode_indices[chunk])
+        live.draw()
+        self.assertEqual(live.n_samples, len(self.ttgs))
+        self.assertLessEqual(len(live), 200)
+        self.assertEqual(live.line.get_ydata().max(), self.risks.max())
+        self.assertEqual(live.line.get_ydata().min(), self.risks.min())
+        self.assertEqual(len(live.ax.patches), 2)
+        with self.assertRaises(ValueError):
+            live.extend([0.0], [1.0])  # Goes back in x
+        live.replace(self.ttgs[:10], self.risks[:10])
+        self.assertEqual(len(live), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
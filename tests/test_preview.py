@@ -0,0 +1,55 @@
+import copy
+import json
+import time
+import unittest
+import numpy as np
+from risk_model.preview import PreviewWorker
+from risk_model.risk_model import RiskModel, config_path
+
+
+def wait_for(worker, complete=True, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None and (result.complete or not complete):
+            return result
+        time.sleep(0.01)
+    raise AssertionError("No preview within the timeout")
+
+
+class TestPreviewWorker(unittest.TestCase):
+    def setUp(self):
+        with open(config_path("ship_config.json")) as file:
+            self.config = json.load(file)
+
+    def test_preview_matches_model(self):
+        with PreviewWorker(ttg_max=300.0, n_points=500, delay=0.0, chunk_size=100) as worker:
+            generation = worker.submit(self.config)
+            result = wait_for(worker)
+        self.assertEqual(result.generation, generation)
+        self.assertIsNone(result.error)
+        model = RiskModel.from_config(self.config)
+        mode_indices, risks = model.select_mso_mode_batch(np.linspace(0.0, 300.0, 500))
+        np.testing.assert_array_equal(result.mode_indices, mode_indices)
+        np.testing.assert_allclose(result.risks, risks)
+        self.assertEqual(result.schedule, model.mode_schedule().rows())
+
+    def test_debounce_and_errors(self):
+        with PreviewWorker(n_points=200, delay=0.2) as worker:
+            for ship_damage in ("1", "10", "100", "1000"):
+                config = copy.deepcopy(self.config)
+                config["grouding_cost"]["ship_damage"] = ship_damage
+                worker.submit(config)
+            result = wait_for(worker)
+            self.assertEqual(worker.n_computed, 1)  # Only the last of the quick edits was evaluated
+            self.assertEqual(result.generation, worker.generation)
+
+            self.config["grouding_cost"]["ship_damage"] = ""  # A field still being typed
+            worker.submit(self.config)
+            result = wait_for(worker)
+        self.assertIsInstance(result.error, ValueError)
+        self.assertIsNone(result.risks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.raster import evaluate_raster, raster_tiles
+
+
+class TestRaster(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.random.default_rng(0).uniform(0, 1500, (37, 53))
+        self.ttgs[3, 4] = np.nan
+        self.mask = np.zeros(self.ttgs.shape, dtype=bool)
+        self.mask[10:20, :7] = True  # Land
+
+    def test_matches_model(self):
+        risk, mode = evaluate_raster(self.model, self.ttgs, self.mask, tile_shape=(8, 16), n_workers=1)
+        self.assertEqual((risk.dtype, mode.dtype), (np.float64, np.int16))
+        invalid = self.mask | np.isnan(self.ttgs)
+        np.testing.assert_array_equal(np.isnan(risk), invalid)
+        np.testing.assert_array_equal(mode[invalid], -1)
+        decomposition = self.model.decompose_risk(self.ttgs[~invalid])
+        np.testing.assert_array_equal(mode[~invalid], decomposition.mode_indices)
+        np.testing.assert_allclose(risk[~invalid], decomposition.min_risk, rtol=1e-12)
+        self.assertEqual(len(raster_tiles(self.ttgs.shape, (8, 16))), 5 * 4)
+
+        threaded = evaluate_raster(self.model, self.ttgs, self.mask, tile_shape=(8, 16), n_workers=3)
+        np.testing.assert_array_equal(threaded[0], risk)
+        np.testing.assert_array_equal(threaded[1], mode)
+
+    def test_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ttg.npy")
+            np.save(path, self.ttgs.astype(np.float32))
+            ttgs = np.load(path, mmap_mode="r")
+            out_risk = np.lib.format.open_memmap(os.path.join(directory, "risk.npy"), mode="w+", dtype=np.float32,
+                                                 shape=ttgs.shape)
+            out_mode = np.lib.format.open_memmap(os.path.join(directory, "mode.npy"), mode="w+", dtype=np.int8,
+                                                 shape=ttgs.shape)
+            self.assertIs(evaluate_raster(self.model, ttgs, out_risk=out_risk, out_mode=out_mode)[0], out_risk)
+            expected_risk, expected_mode = evaluate_raster(self.model, np.asarray(ttgs, dtype=float))
+            np.testing.assert_allclose(out_risk, expected_risk, rtol=1e-6)
+            np.testing.assert_array_equal(out_mode, expected_mode)
+            del ttgs, out_risk, out_mode
+        with self.assertRaises(ValueError):
+            evaluate_raster(self.model, self.ttgs, mask=self.mask[:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import tracemalloc
+import unittest
+import numpy as np
+from risk_model.risk_model import RiskModel
+
+
+class TestRealtimeEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.ttgs = np.concatenate([np.random.default_rng(8).uniform(0, 1500, 4093), [0.0, 35.0, 50.0]])
+
+    def test_matches_batch(self):
+        for fault_tree in (None, True):
+            model = RiskModel(fault_tree=fault_tree)
+            evaluator = model.realtime_evaluator(len(self.ttgs))
+            out_risk, out_mode = evaluator.allocate_outputs()
+            self.assertTrue(evaluator.evaluate(self.ttgs, out_risk, out_mode))
+            risks = model.compute_total_risk_batch(self.ttgs)
+            np.testing.assert_allclose(out_risk, risks.min(axis=0), rtol=1e-12)
+            np.testing.assert_array_equal(out_mode, risks.argmin(axis=0))
+
+    def test_no_allocation(self):
+        evaluator = RiskModel().realtime_evaluator(len(self.ttgs))
+        out_risk, out_mode = evaluator.allocate_outputs()
+        for _ in range(10):
+            evaluator.evaluate(self.ttgs, out_risk, out_mode)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            for _ in range(500):
+                evaluator.evaluate(self.ttgs, out_risk, out_mode)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        # Interpreter and ufunc bookkeeping only: a single temporary array would take 8 * 4096 bytes
+        self.assertLess(peak - start, 1024)
+        grown = [stat for stat in after.compare_to(before, "filename") if stat.count_diff > 0
+                 and not stat.traceback[0].filename.endswith(("test_realtime.py", "tracemalloc.py"))]
+        self.assertEqual(grown, [])
+        self.assertLess(current - start, 256)  # The snapshots and the counters read above
+
+    def test_deadline_fallback(self):
+        model = RiskModel()
+        evaluator = model.realtime_evaluator(len(self.ttgs), budget=0.0)
+        out_risk, out_mode = evaluator.allocate_outputs()
+        self.assertFalse(evaluator.evaluate(self.ttgs, out_risk, out_mode))
+        no_recovery = np.array([mode.failure_probability for mode in model.plan.modes]) * model._grounding_cost() * 1000
+        np.testing.assert_array_equal(out_risk, no_recovery.min())  # Conservative before any result
+        np.testing.assert_array_equal(out_mode, no_recovery.argmin())
+
+        evaluator.budget = None
+        self.assertTrue(evaluator.evaluate(self.ttgs, out_risk, out_mode))
+        expected_risk, expected_mode = out_risk.copy(), out_mode.copy()
+        evaluator.budget = 0.0
+        self.assertFalse(evaluator.evaluate(self.ttgs[::-1].copy(), out_risk, out_mode))
+        np.testing.assert_array_equal(out_risk, expected_risk)  # Last valid result
+        np.testing.assert_array_equal(out_mode, expected_mode)
+        self.assertEqual((evaluator.n_calls, evaluator.n_deadline_misses), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
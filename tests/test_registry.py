@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+from risk_model.registry import RiskModelRegistry
+from risk_model.risk_model import config_path
+
+
+class TestRiskModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(config_path("ship_config.json")) as file:
+            self.config = json.load(file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, ship_damage="100000", content=None):
+        path = os.path.join(self.directory, name)
+        if content is None:
+            self.config["grouding_cost"]["ship_damage"] = ship_damage
+            content = json.dumps(self.config)
+        previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        with open(path, "w") as file:
+            file.write(content)
+        os.utime(path, ns=(previous + 10 ** 9, previous + 10 ** 9))  # A visible change even on coarse clocks
+        return path
+
+    def test_cache_reload_and_eviction(self):
+        registry = RiskModelRegistry(max_models=2)
+        first, same = self.write("a.json"), self.write("b.json")
+        model = registry.get(first)
+        self.assertIs(registry.get(first), model)
+        self.assertIs(registry.get(same), model)  # Same content, same model
+        self.assertEqual(registry.stats()["loads"], 1)
+
+        ttgs = np.array([100.0, 500.0])
+        risk = model.compute_total_risk_batch(ttgs)
+        self.write("a.json", ship_damage="200000")
+        self.assertEqual(registry.check(), [first])
+        reloaded = registry.get(first)
+        self.assertIsNot(reloaded, model)
+        self.assertTrue(np.all(reloaded.compute_total_risk_batch(ttgs) > risk))
+        np.testing.assert_array_equal(model.compute_total_risk_batch(ttgs), risk)  # Held models are untouched
+        self.assertIs(registry.get(same), model)
+
+        self.write("a.json", content="{ not json")
+        self.assertEqual(registry.check(), [])
+        self.assertIn(first, registry.errors)
+        self.assertIs(registry.get(first), reloaded)  # The last good model stays in service
+
+        registry.get(self.write("c.json", ship_damage="300000"))
+        stats = registry.stats()
+        self.assertEqual((stats["models"], stats["evictions"]), (2, 1))
+        self.assertIsNot(registry.get(same), model)  # Evicted, so loaded again
+
+    def test_watcher(self):
+        reloads = []
+        path = self.write("a.json")
+        with RiskModelRegistry(poll_interval=0.02, on_reload=lambda path, model: reloads.append(path)) as registry:
+            registry.start_watching()
+            model = registry.get(path)
+            self.write("a.json", ship_damage="200000")
+            deadline = time.monotonic() + 5
+            while registry.get(path) is model and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(reloads, [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from risk_model import RiskModel
 
 class TestRiskModel(unittest.TestCase):
@@ -6,5 +7,41 @@ class TestRiskModel(unittest.TestCase):
         model = RiskModel()
         self.assertIsNotNone(model)
 
+    def test_batch_matches_scalar(self):
+        model = RiskModel()
+        ttgs = np.concatenate([np.linspace(0, 600, 301), [12, 35, 50, 1e6]])
+        risks = model.compute_total_risk_batch(ttgs)
+        self.assertEqual(risks.shape, (len(model.mode_names), len(ttgs)))
+        for i, mode in enumerate(model.mode_names):
+            expected = [model.compute_total_risk(ttg, mode) for ttg in ttgs]
+            np.testing.assert_allclose(risks[i], expected, rtol=1e-12, atol=0)
+
+    def test_select_mso_mode_batch(self):
+        model = RiskModel()
+        ttgs = np.linspace(0, 600, 301)
+        mode_indices, min_risks = model.select_mso_mode_batch(ttgs)
+        for ttg, index, risk in zip(ttgs, mode_indices, min_risks):
+            mode = model.select_mso_mode(ttg)
+            self.assertEqual(model.mode_names[index], mode)
+            self.assertAlmostEqual(risk, model.compute_total_risk(ttg, mode), places=9)
+
+    def test_restart_uses_restart_probability(self):
+        model = RiskModel()
+        ttg = 100.0
+        # PTI: Restart Engine 2 | Restart Engine 3 | Start Engine 1 | Restart Engine 4, all terminated
+        p_dg = 0.5 * np.exp(-35 / ttg)
+        p_me = np.exp(-50 / ttg)
+        p_hsg = 0.8 * np.exp(-12 / ttg)
+        expected = (1 - p_dg) * (1 - p_dg) * (1 - p_me) * (1 - p_hsg)
+        self.assertAlmostEqual(model.compute_recovery_probability(ttg, "PTI"), expected, places=12)
+
+    def test_unknown_mode(self):
+        model = RiskModel()
+        self.assertEqual(model.compute_machinery_failure_probability("XYZ"), 0)
+        self.assertEqual(model.compute_recovery_probability(10.0, "XYZ"), 1)
+        risks = model.compute_total_risk_batch([10.0, 100.0], modes=["XYZ", "PTO"])
+        np.testing.assert_array_equal(risks[0], 0)
+        self.assertGreater(risks[1, 1], 0)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.plan import compile_plan
+from risk_model.schedule import compute_mode_schedule
+
+def random_plan(rng):
+    n_engines = int(rng.integers(2, 6))
+    engines = {f"E{i}": {"failure_rate": rng.uniform(1e-4, 1e-2), "start_time": float(rng.integers(1, 100)),
+                         "restart_probability": rng.uniform(0.1, 0.9)} for i in range(n_engines)}
+    engine_map = {f"Engine {i + 1}": f"E{i}" for i in range(n_engines)}
+    modes = []
+    for m in range(int(rng.integers(2, 6))):
+        scenarios = [{"action": f"{rng.choice(['Start', 'Restart'])} Engine {rng.integers(1, n_engines + 1)}",
+                      "operation": str(rng.choice(["AND", "Terminate"]))} for _ in range(int(rng.integers(1, 6)))]
+        scenarios[-1]["operation"] = "Terminate"
+        modes.append({"mode_name": f"M{m}", "scenarios": scenarios})
+    return compile_plan(engines, engine_map, modes)
+
+class TestModeSchedule(unittest.TestCase):
+    def test_default_config(self):
+        model = RiskModel()
+        rows = model.mode_schedule().rows()
+        self.assertEqual(rows[0][0], -np.inf)
+        self.assertEqual(rows[-1][1], np.inf)
+        for ttg in [0, 12, 35, 50, 100, 600, 5000]:
+            risks = {mode: model.compute_total_risk(ttg, mode) for mode in model.mode_names}
+            self.assertEqual(model.select_mso_mode(ttg), min(risks, key=risks.get))
+
+    def test_matches_argmin(self):
+        rng = np.random.default_rng(0)
+        for _ in range(25):
+            plan = random_plan(rng)
+            schedule = compute_mode_schedule(plan, [mode.name for mode in plan.modes])
+            ttgs = np.concatenate([np.linspace(-5, 300, 5001), plan.start_time,
+                                   np.nextafter(plan.start_time, np.inf), np.geomspace(1, 1e9, 1000)])
+            risks = plan.grounding_probability(ttgs)
+            looked_up = schedule.lookup(ttgs)
+            best = np.argmin(risks, axis=0)
+            columns = np.arange(len(ttgs))
+            # Any disagreement must be a numerical tie between the two modes
+            np.testing.assert_allclose(risks[looked_up, columns], risks[best, columns], rtol=1e-7, atol=0)
+
+    def test_close_crossings(self):
+        # B/A's grounding-probability ratio has a minimum near ttg = 61.466 on the piece above 44 s; the failure
+        # rates put A just below it there, so A is optimal between two crossings 0.004 s apart
+        start_times, restart = [15.0, 18.0, 29.0, 44.0], [0.75, 0.3, 0.85, 0.7]
+        failure_rates = [1e-3, 0.0, 0.0, 1e-3 * 0.6491170875905555 * (1 + 1e-10)]
+        engines = {f"E{i}": {"failure_rate": failure_rates[i], "start_time": start_times[i],
+                             "restart_probability": restart[i]} for i in range(4)}
+        engine_map = {f"Engine {i + 1}": f"E{i}" for i in range(4)}
+        modes = [{"mode_name": "A", "scenarios": [{"action": "Restart Engine 1", "operation": "Terminate"}]},
+                 {"mode_name": "B", "scenarios": [{"action": "Restart Engine 2", "operation": "Terminate"},
+                                                  {"action": "Restart Engine 3", "operation": "AND"},
+                                                  {"action": "Restart Engine 4", "operation": "Terminate"}]}]
+        plan = compile_plan(engines, engine_map, modes)
+        schedule = compute_mode_schedule(plan, ["A", "B"])
+        self.assertEqual([mode for _, _, mode in schedule.rows()], ["B", "A", "B", "A", "B"])
+        self.assertLess(schedule.breakpoints[3] - schedule.breakpoints[2], 0.01)
+        ttgs = np.linspace(61.4, 61.6, 200001)
+        np.testing.assert_array_equal(schedule.lookup(ttgs), np.argmin(plan.grounding_probability(ttgs), axis=0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.scheduler import _block_schedule, _dwell_schedule, schedule_modes, schedule_trajectory
+
+def path_cost(risks, switch_cost, path):
+    cost = risks[path, np.arange(len(path))].sum()
+    changes = np.flatnonzero(path[1:] != path[:-1])
+    return cost + switch_cost[path[changes], path[changes + 1]].sum()
+
+def dwell_respected(path, min_dwell):
+    runs = np.split(path, np.flatnonzero(np.diff(path)) + 1)
+    # The first run counts as settled, the last may be cut short by the end of the trajectory
+    return all(len(run) >= min_dwell[run[0]] for run in runs[1:-1])
+
+def brute_force(risks, switch_cost, min_dwell):
+    """ Reference Viterbi with a Python loop over waypoints """
+    n_modes, n_steps = risks.shape
+    states = [(j, k) for j in range(n_modes) for k in range(1, min_dwell[j] + 1)]
+    values = {s: (risks[s[0], 0] if s[1] == min_dwell[s[0]] else np.inf) for s in states}
+    for t in range(1, n_steps):
+        new = {s: np.inf for s in states}
+        for (i, k), value in values.items():
+            stay = (i, min(k + 1, min_dwell[i]))
+            new[stay] = min(new[stay], value + risks[i, t])
+            if k == min_dwell[i]:
+                for j in range(n_modes):
+                    if j != i:
+                        new[(j, 1)] = min(new[(j, 1)], value + switch_cost[i, j] + risks[j, t])
+        values = new
+    return min(values.values())
+
+class TestScheduleModes(unittest.TestCase):
+    def test_matches_reference(self):
+        rng = np.random.default_rng(5)
+        for trial in range(60):
+            n_modes, n_steps = int(rng.integers(2, 5)), int(rng.integers(1, 60))
+            risks = rng.random((n_modes, n_steps))
+            switch_cost = rng.random((n_modes, n_modes)) * 0.5
+            if trial % 3 == 1:  # Free switches, where staying and re-entering a mode tie
+                switch_cost[:] = 0
+            elif trial % 3 == 2:  # Coarse values, so that paths tie
+                risks, switch_cost = np.round(risks * 4) / 4, np.round(switch_cost * 4) / 4
+            np.fill_diagonal(switch_cost, 0)
+            min_dwell = rng.integers(1, 4, n_modes)
+            path, total_cost = schedule_modes(risks, switch_cost, min_dwell)
+            self.assertEqual(len(path), n_steps)
+            self.assertAlmostEqual(total_cost, brute_force(risks, switch_cost, min_dwell))
+            self.assertAlmostEqual(path_cost(risks, switch_cost, path), total_cost)
+            self.assertTrue(dwell_respected(path, min_dwell))
+
+        risks = np.array([[.85, .94, .02, .12, .36, .09], [.6, .26, .26, .29, .1, .74]])
+        path, total_cost = schedule_modes(risks, 0.0, [2, 2])
+        np.testing.assert_array_equal(path, [1, 1, 0, 0, 0, 0])
+        self.assertAlmostEqual(total_cost, 1.45)
+
+    def test_long_dwell_and_both_recursions(self):
+        rng = np.random.default_rng(7)
+        for trial in range(20):
+            n_modes, n_steps = int(rng.integers(2, 6)), int(rng.integers(1, 120))
+            risks = rng.random((n_modes, n_steps))
+            switch_cost = rng.random((n_modes, n_modes)) * 0.3
+            min_dwell = rng.integers(2, 12, n_modes)  # Windows of several steps, lags longer than a window
+            path, total_cost = schedule_modes(risks, switch_cost, min_dwell)
+            self.assertAlmostEqual(total_cost, brute_force(risks, switch_cost, min_dwell))
+            self.assertAlmostEqual(path_cost(risks, switch_cost, path), total_cost)
+            self.assertTrue(dwell_respected(path, min_dwell))
+
+            # Both recursions, with a general, a uniform, a zero and a tied switch cost
+            ones = np.ones(n_modes, dtype=np.intp)
+            uniform = float(rng.random() * 0.3)
+            coarse = np.round(risks * 4) / 4
+            for costs, scalar, step_risks in ((switch_cost, None, risks),
+                                              (np.full((n_modes, n_modes), uniform), uniform, risks),
+                                              (np.zeros((n_modes, n_modes)), 0.0, risks),
+                                              (np.full((n_modes, n_modes), 0.25), 0.25, coarse)):
+                no_dwell = brute_force(step_risks, costs, ones)
+                for (path, total_cost), dwell, expected in (
+                        (_block_schedule(step_risks, costs, 1 << 10, scalar), ones, no_dwell),
+                        (_dwell_schedule(step_risks, costs, ones), ones, no_dwell),
+                        (_dwell_schedule(step_risks, costs, min_dwell), min_dwell,
+                         brute_force(step_risks, costs, min_dwell)),
+                        (schedule_modes(step_risks, scalar if scalar is not None else costs, min_dwell), min_dwell,
+                         brute_force(step_risks, costs, min_dwell))):
+                    self.assertAlmostEqual(total_cost, expected)
+                    self.assertAlmostEqual(path_cost(step_risks, costs, path), total_cost)
+                    self.assertTrue(dwell_respected(path, dwell))
+
+    def test_zero_switch_cost_is_greedy(self):
+        risks = np.random.default_rng(2).random((3, 1000))
+        path, total_cost = schedule_modes(risks, 0.0)
+        np.testing.assert_array_equal(path, np.argmin(risks, axis=0))
+        self.assertAlmostEqual(total_cost, risks.min(axis=0).sum())
+
+    def test_trajectory_flapping_removed(self):
+        model = RiskModel()
+        ttgs = 657.5 + 5 * np.sin(np.arange(2000))  # Hovers around the PTO/MEC breakpoint
+        greedy = model.select_mso_mode_batch(ttgs)[0]
+        self.assertGreater(np.count_nonzero(np.diff(greedy)), 100)
+        schedule = schedule_trajectory(model, ttgs, switch_cost=1.0)
+        self.assertEqual(len(schedule.switches), 0)
+        self.assertAlmostEqual(schedule.total_cost, schedule.risks.sum())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from risk_model.risk_model import RiskModel
+from risk_model.service import RiskClient, RiskService, generate_load
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "risk_model", "data", "ship_config.json")
+
+
+class TestRiskService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.model = RiskModel()
+        self.service = RiskService(self.model, window=0.005)
+        self.address = await self.service.start(("127.0.0.1", 0))
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def test_micro_batching(self):
+        result = await generate_load(self.address, n_clients=8, requests_per_client=25, seed=0)
+        self.assertEqual(result["requests"], 200)
+        metrics = self.service.metrics()
+        self.assertEqual(metrics["requests"], 200)
+        self.assertLess(metrics["batches"], 200)  # Concurrent requests were coalesced
+        self.assertGreater(metrics["batch_size_max"], 1)
+        self.assertGreater(metrics["latency_p99_ms"], 0)
+
+    async def test_client_and_reload(self):
+        ttgs = [30.0, 400.0, 1200.0]
+        mode_indices, risks = self.model.select_mso_mode_batch(np.array(ttgs))
+
+        def use_client():
+            with RiskClient(self.address) as client:
+                modes, served = client.risk(ttgs)
+                single = client.risk(400.0)
+                with open(CONFIG_PATH) as file:
+                    config = json.load(file)
+                for key in config["grouding_cost"]:
+                    config["grouding_cost"][key] = str(2 * float(config["grouding_cost"][key]))
+                client.reload(config)
+                _, doubled = client.risk(ttgs)
+                with self.assertRaises(RuntimeError):
+                    client.request("unknown")
+                return modes, served, single, doubled
+
+        modes, served, single, doubled = await asyncio.to_thread(use_client)
+        self.assertEqual(modes, [self.model.mode_names[i] for i in mode_indices])
+        np.testing.assert_allclose(served, risks)
+        self.assertEqual(single, (modes[1], served[1]))
+        np.testing.assert_allclose(doubled, 2 * risks)
+
+    async def test_reload_during_batch(self):
+        with open(CONFIG_PATH) as file:
+            config = json.load(file)
+        config["modes"] = [dict(config["modes"][-1], mode_name="Renamed")]
+        task = asyncio.create_task(self.service._respond({"op": "risk", "ttg": [30.0, 1200.0]}))
+        await asyncio.sleep(0)  # The request is pending in the next batch
+        self.service._flush()
+        self.service.swap_model(RiskModel.from_config(config))  # Reloaded before the response is built
+        response = await task
+        mode_indices, _ = self.model.select_mso_mode_batch(np.array([30.0, 1200.0]))
+        self.assertEqual(response["mode"], [self.model.mode_names[i] for i in mode_indices])
+
+    async def test_unix_socket_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "risk.sock")
+            for _ in range(2):  # close() removes the socket file, so the path can be bound again
+                service = RiskService(self.model)
+                await service.start(path)
+                await service.close()
+                self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+
+class TestStreamRisk(unittest.TestCase):
+    def test_matches_batch(self):
+        model = RiskModel()
+        ttgs = np.concatenate([np.linspace(0, 1000, 2500), np.linspace(1000, 0, 2500)])
+        mode_indices, risks = model.select_mso_mode_batch(ttgs)
+
+        # Mixed scalars and arrays of uneven size
+        source = [ttgs[:7]] + list(ttgs[7:20]) + np.array_split(ttgs[20:], 9)
+        chunks = list(model.stream_risk(source, chunk_size=1000))
+        self.assertEqual([len(chunk) for chunk in chunks], [1000] * 5)
+        self.assertEqual(chunks[2].start, 2000)
+        np.testing.assert_array_equal(np.concatenate([c.mode_indices for c in chunks]), mode_indices)
+        np.testing.assert_allclose(np.concatenate([c.risks for c in chunks]), risks)
+        self.assertAlmostEqual(chunks[-1].total_risk, risks.sum(), places=6)
+
+        events = [event for chunk in chunks for event in chunk.mode_changes]
+        expected = np.flatnonzero(np.diff(mode_indices)) + 1
+        self.assertEqual([event[0] for event in events], list(expected))
+        for position, previous, new in events:
+            self.assertEqual(previous, model.mode_names[mode_indices[position - 1]])
+            self.assertEqual(new, model.mode_names[mode_indices[position]])
+
+    def test_short_stream(self):
+        model = RiskModel()
+        chunks = list(model.stream_risk(iter([10.0, 20.0]), chunk_size=8))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].modes, [model.select_mso_mode(10.0), model.select_mso_mode(20.0)])
+        self.assertEqual(list(model.stream_risk([], chunk_size=8)), [])
+
+if __name__ == "__main__":
+    unittest.main()
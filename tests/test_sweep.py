@@ -0,0 +1,50 @@
+import json
+import os
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.sweep import base_samples, evaluate_sweep, grid_samples, latin_hypercube_samples, tornado
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "risk_model", "data", "ship_config.json")
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.linspace(0, 800, 161)
+
+    def test_grid_matches_rebuilt_models(self):
+        grids = {("ME", "start_time"): [20.0, 50.0, 80.0], ("HSG", "restart_probability"): [0.2, 0.8]}
+        samples = grid_samples(self.model, grids)
+        risks = evaluate_sweep(self.model, samples, self.ttgs, memory_budget=1)  # One sample per chunk
+        self.assertEqual(risks.shape, (6, 3, len(self.ttgs)))
+
+        with open(CONFIG_PATH) as file:
+            config = json.load(file)
+        config["engines"][0]["start_time"] = "80"
+        config["engines"][3]["restart_probability"] = "0.2"
+        rebuilt = RiskModel.from_config(config)
+        np.testing.assert_allclose(risks.reshape(3, 2, 3, -1)[2, 0], rebuilt.compute_total_risk_batch(self.ttgs))
+
+    def test_base_and_latin_hypercube(self):
+        risks = evaluate_sweep(self.model, base_samples(self.model, 2), self.ttgs)
+        np.testing.assert_allclose(risks[1], self.model.compute_total_risk_batch(self.ttgs))
+
+        samples = latin_hypercube_samples(self.model, {("ME", "failure_rate"): (1e-10, 1e-8, "log"),
+                                                       ("DG1", "start_time"): (10, 60)}, 50, seed=0)
+        strata = np.floor((samples["start_time"][:, 1] - 10) / 50 * 50)
+        np.testing.assert_array_equal(np.sort(strata), np.arange(50))
+        self.assertTrue(np.all((samples["failure_rate"][:, 0] >= 1e-10) & (samples["failure_rate"][:, 0] <= 1e-8)))
+        np.testing.assert_array_equal(samples["start_time"][:, 0], 50.0)
+        with self.assertRaises(ValueError):
+            grid_samples(self.model, {("ME", "mass"): [1.0]})
+
+    def test_tornado(self):
+        rows = tornado(self.model, self.ttgs)
+        self.assertEqual(len(rows), 12)
+        swings = [row["swing"] for row in rows]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        base = self.model.select_mso_mode_batch(self.ttgs)[1].sum()
+        self.assertAlmostEqual(rows[0]["base"], base, places=6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.trajectory_index import TrajectoryRiskIndex
+
+
+class TestTrajectoryRiskIndex(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        rng = np.random.default_rng(7)
+        self.ttgs = rng.uniform(0, 800, 333)
+        self.times = np.cumsum(rng.uniform(0.5, 2.0, 333))
+        self.index = TrajectoryRiskIndex(self.model, self.ttgs, self.times)
+        start = rng.integers(0, 333, 500)
+        self.start, self.stop = start, start + rng.integers(1, 334 - start)
+
+    def test_range_queries_match_brute_force(self):
+        index = self.index
+        mode_indices, risks = self.model.select_mso_mode_batch(self.ttgs)
+        np.testing.assert_array_equal(index.risks, risks)
+        weighted = risks * index.weights
+        ranges = list(zip(self.start, self.stop))
+        np.testing.assert_allclose(index.total(self.start, self.stop), [weighted[i:j].sum() for i, j in ranges])
+        np.testing.assert_allclose(index.total(self.start, self.stop, weighted=False),
+                                   [risks[i:j].sum() for i, j in ranges])
+        np.testing.assert_array_equal(index.argmax(self.start, self.stop),
+                                      [i + np.argmax(risks[i:j]) for i, j in ranges])
+        np.testing.assert_array_equal(index.max(self.start, self.stop), [risks[i:j].max() for i, j in ranges])
+        counts = [np.bincount(mode_indices[i:j], minlength=3) for i, j in ranges]
+        np.testing.assert_array_equal(index.mode_counts(self.start, self.stop), counts)
+        np.testing.assert_array_equal(index.dominant_mode(self.start, self.stop), np.argmax(counts, axis=1))
+        with self.assertRaises(ValueError):
+            index.argmax(5, 5)
+        with self.assertRaises(IndexError):
+            index.total(0, 334)
+
+    def test_time_integral(self):
+        index = self.index
+        # The whole trajectory is the trapezoidal integral, independent of how densely it is sampled
+        self.assertAlmostEqual(index.total(), np.trapezoid(index.risks, self.times), delta=1e-6 * index.total())
+        ttgs = np.full(1000, 300.0)
+        coarse = TrajectoryRiskIndex(self.model, ttgs[:11], np.linspace(0, 100, 11))
+        fine = TrajectoryRiskIndex(self.model, ttgs, np.linspace(0, 100, 1000))
+        self.assertAlmostEqual(coarse.total(), fine.total(), delta=1e-9 * fine.total())
+
+        t_start, t_stop = self.times[10] + 0.3, self.times[200] - 0.1
+        edges, risks = index.cell_edges, index.risks
+        grid = np.linspace(t_start, t_stop, 200001)
+        values = risks[np.clip(np.searchsorted(edges, grid, side="right") - 1, 0, len(risks) - 1)]
+        np.testing.assert_allclose(index.total_between(t_start, t_stop), np.trapezoid(values, grid), rtol=1e-3)
+        np.testing.assert_allclose(index.total_between([t_start, t_stop], [t_stop, t_stop]),
+                                   [index.total_between(t_start, t_stop), 0.0])
+        start, stop = index.waypoints_between(self.times[10], self.times[20])
+        self.assertEqual((start, stop), (10, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
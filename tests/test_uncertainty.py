@@ -0,0 +1,77 @@
+import tracemalloc
+import unittest
+import numpy as np
+from risk_model import RiskModel
+from risk_model.uncertainty import LogHistogram, propagate_uncertainty, sample_parameters
+
+DISTRIBUTIONS = {("ME", "failure_rate"): ("lognormal", 3e-9, 1.0), ("DG1", "start_time"): ("uniform", 20, 50),
+                 ("HSG", "restart_probability"): ("beta", 8, 2)}
+
+
+class TestUncertainty(unittest.TestCase):
+    def setUp(self):
+        self.model = RiskModel()
+        self.ttgs = np.linspace(0, 1000, 51)
+
+    def test_histogram_quantiles(self):
+        rng = np.random.default_rng(0)
+        values = rng.lognormal(0, 1, size=(4000, 2, 5))
+        values[:100, 0, 0] = 0
+        histogram = LogHistogram.fitted(values[:200], n_bins=512, relative_accuracy=0.01)
+        histogram.add(values[:1500])
+        other = histogram.empty_like()
+        other.add(values[1500:])
+        histogram.merge(other)
+        levels = np.array([0.0, 0.05, 0.5, 0.95, 1.0])
+        expected = np.quantile(values, levels, axis=0, method="lower")
+        np.testing.assert_allclose(histogram.quantile(levels), expected, rtol=0.01, atol=0)
+
+    def test_point_distributions_match_model(self):
+        plan = self.model.plan
+        point = {(engine, "start_time"): ("uniform", start_time, start_time)
+                 for engine, start_time in zip(plan.engine_names, plan.start_time)}
+        result = propagate_uncertainty(self.model, point, self.ttgs, 500, seed=0)
+        risks = self.model.compute_total_risk_batch(self.ttgs)
+        np.testing.assert_allclose(result.risk_mean, risks, rtol=1e-12)
+        np.testing.assert_allclose(result.risk_percentiles((5, 95)), [risks, risks], rtol=0.01)
+        mode_indices, min_risks = self.model.select_mso_mode_batch(self.ttgs)
+        np.testing.assert_array_equal(result.modal_mode, mode_indices)
+        np.testing.assert_array_equal(result.mode_probability.max(axis=0), 1.0)
+        np.testing.assert_allclose(result.min_risk_percentiles((50,))[0], min_risks, rtol=0.01)
+
+    def test_bands_and_workers(self):
+        serial = propagate_uncertainty(self.model, DISTRIBUTIONS, self.ttgs, 3000, seed=2, task_size=1000,
+                                       memory_budget=1 << 20)
+        parallel = propagate_uncertainty(self.model, DISTRIBUTIONS, self.ttgs, 3000, seed=2, task_size=1000,
+                                         memory_budget=1 << 20, n_workers=2)
+        np.testing.assert_array_equal(serial.bands, parallel.bands)
+        np.testing.assert_allclose(serial.mode_probability.sum(axis=0), 1.0)
+        low, median, high = serial.min_risk_percentiles()
+        self.assertTrue(np.all(low <= median) and np.all(median <= high) and np.any(low < high))
+
+        samples = sample_parameters(self.model, DISTRIBUTIONS, 1000, seed=5)
+        self.assertTrue(np.all((samples["start_time"][:, 1] >= 20) & (samples["start_time"][:, 1] <= 50)))
+        np.testing.assert_array_equal(samples["start_time"][:, 0], 50.0)
+        with self.assertRaises(ValueError):
+            sample_parameters(self.model, {("ME", "failure_rate"): ("gamma", 1, 2)}, 10)
+
+    def test_memory_budget(self):
+        ttgs = np.linspace(0, 1000, 2000)  # Histograms of all TTGs at once would take about 50 MB
+        budget = 4 << 20
+        tracemalloc.start()
+        try:
+            result = propagate_uncertainty(self.model, DISTRIBUTIONS, ttgs, 300, seed=3, memory_budget=budget)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 2 * budget)
+        unbounded = propagate_uncertainty(self.model, DISTRIBUTIONS, ttgs, 300, seed=3, memory_budget=1 << 30)
+        np.testing.assert_array_equal(result.bands, unbounded.bands)
+        np.testing.assert_array_equal(result.mode_probability, unbounded.mode_probability)
+        np.testing.assert_allclose(result.risk_mean, unbounded.risk_mean, rtol=1e-12)
+        with self.assertRaises(ValueError):
+            result.risk_percentiles((25,))
+
+
+if __name__ == "__main__":
+    unittest.main()